@@ -0,0 +1,28 @@
+# ruff: noqa
+"""
+ASGI config for WebTask Scheduler project.
+
+It exposes the ASGI callable as a module-level variable named ``application``, served by
+uvicorn. With TIMER_ASYNC_VIEWS set, the timer endpoints are async views that do not tie
+up a thread while they wait on the database, the cache or the countdown stream.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/dev/howto/deployment/asgi/
+
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from django.core.asgi import get_asgi_application
+
+# This allows easy placement of apps within the interior
+# webtask_scheduler directory.
+BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(BASE_DIR / "webtask_scheduler"))
+# If DJANGO_SETTINGS_MODULE is unset, default to the production settings
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+# This application object is used by any ASGI server configured to use this file.
+application = get_asgi_application()
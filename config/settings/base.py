@@ -56,6 +56,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 ROOT_URLCONF = "config.urls"
 # https://docs.djangoproject.com/en/dev/ref/settings/#wsgi-application
 WSGI_APPLICATION = "config.wsgi.application"
+# https://docs.djangoproject.com/en/dev/ref/settings/#asgi-application
+ASGI_APPLICATION = "config.asgi.application"
 
 # APPS
 # ------------------------------------------------------------------------------
@@ -296,6 +298,21 @@ CELERY_WORKER_SEND_TASK_EVENTS = True
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std-setting-task_send_sent_event
 CELERY_TASK_SEND_SENT_EVENT = True
 CELERY_IMPORTS = ("webtask_scheduler.scheduler.tasks",)
+# https://docs.celeryq.dev/en/stable/userguide/periodic-tasks.html#entries
+CELERY_BEAT_SCHEDULE = {
+    "maintain-timer-partitions": {
+        "task": "webtask_scheduler.scheduler.tasks.maintain_timer_partitions",
+        "schedule": 60 * 60,
+    },
+    "expire-idempotency-keys": {
+        "task": "webtask_scheduler.scheduler.tasks.expire_idempotency_keys",
+        "schedule": 60 * 60,
+    },
+    "expire-payloads": {
+        "task": "webtask_scheduler.scheduler.tasks.expire_payloads",
+        "schedule": 60 * 60,
+    },
+}
 
 
 # django-allauth
@@ -349,3 +366,95 @@ SPECTACULAR_SETTINGS = {
 DOMAIN = env.str("DJANGO_DOMAIN", default="webtask-scheduler.com")
 USE_SSL = env.bool("DJANGO_USE_SSL", default=False)
 BASE_SITE_URL = "{}://{}".format("https" if USE_SSL else "http", DOMAIN)
+
+# Scheduler
+# ------------------------------------------------------------------------------
+REDIS_URL = env("REDIS_URL", default=CELERY_BROKER_URL)
+# Where `manage.py run_timer_dispatcher` finds due timers: "database" claims the pending rows of the
+# Timer table with SELECT ... FOR UPDATE SKIP LOCKED, "redis" also indexes them in a Redis sorted set
+# and pops them from there.
+TIMER_DISPATCH_BACKEND = env.str("TIMER_DISPATCH_BACKEND", default="database")
+# Maximum number of due timers the dispatcher pops per round trip.
+TIMER_DISPATCH_BATCH_SIZE = env.int("TIMER_DISPATCH_BATCH_SIZE", default=1000)
+# Maximum number of seconds the dispatcher sleeps between two polls.
+TIMER_DISPATCH_POLL_INTERVAL = env.float("TIMER_DISPATCH_POLL_INTERVAL", default=0.05)
+# Seconds ahead of their run time the dispatcher publishes timers, with an ETA the Celery worker fires them at.
+# Covers the broker and worker pickup latency, a timer can no longer be moved or canceled once published.
+TIMER_DISPATCH_LOOKAHEAD_SECONDS = env.float("TIMER_DISPATCH_LOOKAHEAD_SECONDS", default=0.5)
+# Number of shards timers are split into by ID, each fired by the dispatcher holding its lease.
+# Changing it with the redis backend requires rebuilding the timer wheel, see rebuild_timer_wheel.
+TIMER_DISPATCH_SHARDS = env.int("TIMER_DISPATCH_SHARDS", default=1)
+# Timers found more than this many seconds past their run time, after an outage of the dispatchers, are left to the
+# catch-up sweeper, which replays them oldest first at TIMER_CATCHUP_RATE instead of all at once. Lower bound of
+# the max lateness of timers, see CatchUpSweeper.
+TIMER_CATCHUP_AFTER_SECONDS = env.int("TIMER_CATCHUP_AFTER_SECONDS", default=60)
+# Maximum number of overdue timers replayed per second by the catch-up sweeper, over all dispatchers.
+TIMER_CATCHUP_RATE = env.float("TIMER_CATCHUP_RATE", default=100)
+# Maximum number of timers a user may set per TIMER_USER_QUOTA_PERIOD seconds, 0 for no limit. Anonymous requests
+# are not limited, they cannot be told apart. Overridden per user by UserQuota.
+TIMER_USER_QUOTA = env.int("TIMER_USER_QUOTA", default=100000)
+TIMER_USER_QUOTA_PERIOD = env.int("TIMER_USER_QUOTA_PERIOD", default=24 * 60 * 60)
+# Seconds the quota and dispatch weight of a user are cached for, so UserQuota changes apply after at most that long.
+TIMER_USER_QUOTA_CACHE_SECONDS = env.int("TIMER_USER_QUOTA_CACHE_SECONDS", default=60)
+# Seconds a dispatcher keeps its shard leases without renewing them, so the failover delay of a dead dispatcher.
+TIMER_DISPATCH_LEASE_TTL = env.float("TIMER_DISPATCH_LEASE_TTL", default=10)
+# Serve set timer, get timer and the timer stream with the async views, for the ASGI deployment (config/asgi.py).
+TIMER_ASYNC_VIEWS = env.bool("TIMER_ASYNC_VIEWS", default=False)
+# Maximum size in bytes of the JSON body of a timer request, stored compressed apart from the timer, see Payload.
+TIMER_PAYLOAD_MAX_BYTES = env.int("TIMER_PAYLOAD_MAX_BYTES", default=512 * 1024)
+# Maximum number of timers accepted by a single bulk timer request.
+TIMER_BULK_MAX_SIZE = env.int("TIMER_BULK_MAX_SIZE", default=10000)
+# Seconds a timer's cached run time outlives the timer itself, see TimerCache.
+TIMER_CACHE_GRACE_SECONDS = env.int("TIMER_CACHE_GRACE_SECONDS", default=60)
+# Timers due sooner than this many seconds are published straight to the broker with an ETA
+# instead of waiting for the scheduler. Keep it well below the Redis broker visibility timeout
+# (one hour by default). Set to 0 to disable the fast path.
+TIMER_ETA_THRESHOLD_SECONDS = env.int("TIMER_ETA_THRESHOLD_SECONDS", default=60)
+# Outbound webhook delivery, see webtask_scheduler.scheduler.delivery.DeliveryEngine.
+# Every worker process shares one pooled keep-alive HTTP client bounded by these limits.
+TIMER_HTTP_TIMEOUT = env.float("TIMER_HTTP_TIMEOUT", default=10)
+TIMER_HTTP_MAX_CONNECTIONS = env.int("TIMER_HTTP_MAX_CONNECTIONS", default=500)
+TIMER_HTTP_MAX_CONNECTIONS_PER_HOST = env.int("TIMER_HTTP_MAX_CONNECTIONS_PER_HOST", default=50)
+TIMER_HTTP_KEEPALIVE_TIMEOUT = env.float("TIMER_HTTP_KEEPALIVE_TIMEOUT", default=30)
+# Where the results of webhook deliveries are kept: "timer" records a compact outcome (status code, duration,
+# body digest, attempts) on the Timer row only, "backend" also stores the response in CELERY_RESULT_BACKEND.
+TIMER_DELIVERY_RESULTS = env.str("TIMER_DELIVERY_RESULTS", default="timer")
+# Maximum number of timers firing in the same tick that are delivered by one batch task.
+TIMER_DELIVERY_CHUNK_SIZE = env.int("TIMER_DELIVERY_CHUNK_SIZE", default=100)
+# Per-host throttling of outbound webhooks shared by all workers through Redis, see HostThrottle.
+TIMER_HOST_THROTTLE = env.bool("TIMER_HOST_THROTTLE", default=True)
+# Sustained requests per second and burst size allowed for a single host.
+TIMER_HOST_RATE_LIMIT = env.float("TIMER_HOST_RATE_LIMIT", default=50)
+TIMER_HOST_BURST = env.int("TIMER_HOST_BURST", default=100)
+# Maximum number of requests in flight to a single host across all workers.
+TIMER_HOST_MAX_CONCURRENCY = env.int("TIMER_HOST_MAX_CONCURRENCY", default=20)
+# Backoff applied to a host answering 429/503 without Retry-After, doubled on every consecutive answer.
+TIMER_HOST_BACKOFF_BASE = env.float("TIMER_HOST_BACKOFF_BASE", default=1)
+TIMER_HOST_BACKOFF_MAX = env.float("TIMER_HOST_BACKOFF_MAX", default=300)
+# Failed deliveries are retried with a jittered exponential backoff (TIMER_RETRY_BACKOFF_BASE seconds doubled
+# per attempt, capped at TIMER_RETRY_BACKOFF_MAX) until a timer runs out of attempts and becomes a dead letter.
+TIMER_RETRY_MAX_ATTEMPTS = env.int("TIMER_RETRY_MAX_ATTEMPTS", default=5)
+# Upper bound of the attempts a single timer may ask for.
+TIMER_RETRY_MAX_ATTEMPTS_LIMIT = env.int("TIMER_RETRY_MAX_ATTEMPTS_LIMIT", default=10)
+TIMER_RETRY_BACKOFF_BASE = env.int("TIMER_RETRY_BACKOFF_BASE", default=2)
+TIMER_RETRY_BACKOFF_MAX = env.int("TIMER_RETRY_BACKOFF_MAX", default=600)
+# Retries run on their own queue, served by a dedicated worker, so a retry storm cannot delay on-time deliveries.
+TIMER_RETRY_QUEUE = env.str("TIMER_RETRY_QUEUE", default="webhook-retries")
+# The Timer table is partitioned by day of run time on PostgreSQL, see TimerPartitionManager.
+# Partitions are created this many days ahead of time.
+TIMER_PARTITION_PREMAKE_DAYS = env.int("TIMER_PARTITION_PREMAKE_DAYS", default=7)
+# Days of timer history kept after their run time, older partitions (or rows) are removed.
+TIMER_RETENTION_DAYS = env.int("TIMER_RETENTION_DAYS", default=30)
+# Detach expired partitions instead of dropping them, so they can be archived out of band.
+TIMER_RETENTION_ARCHIVE = env.bool("TIMER_RETENTION_ARCHIVE", default=False)
+# Seconds an Idempotency-Key of set timer requests is remembered, retries within it get the original timer back.
+TIMER_IDEMPOTENCY_KEY_TTL = env.int("TIMER_IDEMPOTENCY_KEY_TTL", default=24 * 60 * 60)
+# Publish the outcome of every timer on Redis pub/sub for the countdown streams, see TimerEvents.
+TIMER_EVENTS = env.bool("TIMER_EVENTS", default=True)
+# Seconds between two countdown events of a timer stream.
+TIMER_STREAM_TICK_SECONDS = env.float("TIMER_STREAM_TICK_SECONDS", default=1)
+# Seconds a timer stream stays open before the client has to reconnect, bounding idle connections.
+TIMER_STREAM_MAX_SECONDS = env.int("TIMER_STREAM_MAX_SECONDS", default=300)
+# Bearer token Prometheus scrapes /metrics with, see MetricsView. Admin users can read the metrics without it,
+# nobody else can while it is empty.
+METRICS_TOKEN = env.str("METRICS_TOKEN", default="")
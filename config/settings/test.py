@@ -36,3 +36,6 @@ TEMPLATES[0]["OPTIONS"]["debug"] = True  # type: ignore[index]
 MEDIA_URL = "http://media.testserver"
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Unit tests run without Redis, tests covering the throttle and the timer events enable them explicitly.
+TIMER_HOST_THROTTLE = False
+TIMER_EVENTS = False
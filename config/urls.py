@@ -7,6 +7,8 @@ from django.urls import path
 from drf_spectacular.views import SpectacularAPIView
 from drf_spectacular.views import SpectacularSwaggerView
 
+from webtask_scheduler.scheduler.views import MetricsView
+
 urlpatterns = [
     # Django Admin, use {% url 'admin:index' %}
     path(settings.ADMIN_URL, admin.site.urls),
@@ -27,6 +29,11 @@ urlpatterns += [
     ),
 ]
 
+# Prometheus metrics
+urlpatterns += [
+    path("metrics", MetricsView.as_view(), name="metrics"),
+]
+
 if settings.DEBUG:
     if "debug_toolbar" in settings.INSTALLED_APPS:
         import debug_toolbar
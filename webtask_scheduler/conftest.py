@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    """Timer IDs are reused between tests once the database is rolled back, so never share cached timers."""
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,37 @@
+from django.contrib import admin
+
+from webtask_scheduler.scheduler.models import DeadLetter
+from webtask_scheduler.scheduler.models import Payload
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.models import UserQuota
+
+
+@admin.register(Timer)
+class TimerAdmin(admin.ModelAdmin):
+    list_display = ["id", "url", "run_at", "status", "attempts", "status_code", "lateness_ms", "completed_at"]
+    list_filter = ["status"]
+    search_fields = ["url", "=user_id"]
+    date_hierarchy = "run_at"
+
+
+@admin.register(DeadLetter)
+class DeadLetterAdmin(admin.ModelAdmin):
+    list_display = ["id", "task_id", "url", "attempts", "status_code", "created_at", "replayed_at"]
+    list_filter = ["status_code", "replayed_at"]
+    search_fields = ["url"]
+    readonly_fields = ["task_id", "url", "attempts", "status_code", "error", "created_at", "replayed_at"]
+
+
+@admin.register(Payload)
+class PayloadAdmin(admin.ModelAdmin):
+    list_display = ["id", "method", "size", "created_at"]
+    list_filter = ["method"]
+    exclude = ["body"]
+    readonly_fields = ["method", "headers", "size", "created_at"]
+
+
+@admin.register(UserQuota)
+class UserQuotaAdmin(admin.ModelAdmin):
+    list_display = ["user", "max_timers", "weight"]
+    search_fields = ["user__email"]
+    raw_id_fields = ["user"]
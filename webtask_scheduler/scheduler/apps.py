@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SchedulerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "webtask_scheduler.scheduler"
+
+    def ready(self):
+        import webtask_scheduler.scheduler.signals  # noqa: F401
@@ -0,0 +1,178 @@
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import HttpRequest
+from django.http import HttpResponse
+from django.http import JsonResponse
+from django.http import StreamingHttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from webtask_scheduler.scheduler.models import IdempotencyKey
+from webtask_scheduler.scheduler.quotas import QuotaExceededError
+from webtask_scheduler.scheduler.quotas import user_id_of
+from webtask_scheduler.scheduler.serializers import RescheduleTimerInputSerializer
+from webtask_scheduler.scheduler.serializers import SetTimerInputSerializer
+from webtask_scheduler.scheduler.serializers import SetTimerOutputSerializer
+from webtask_scheduler.scheduler.services import TimerNotPendingError
+from webtask_scheduler.scheduler.services import TimerService
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTimerView(View):
+    """
+    Base of the async timer views served under ASGI when TIMER_ASYNC_VIEWS is set.
+
+    They answer like their DRF counterparts in views.py, without a DRF request cycle: DRF views
+    are sync and would hold a worker thread for every request. Like the DRF views, they allow
+    access without authentication, identify the caller with the DRF authenticators, and enforce
+    CSRF for session authenticated requests only.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Like APIView, leave CSRF to the session authentication, so token authenticated clients need no CSRF token.
+        # csrf_exempt wraps coroutine views in a sync function on Django 4.2, so the flag is set directly.
+        view.csrf_exempt = True
+        # ATOMIC_REQUESTS does not support async views, services open their own transactions.
+        return transaction.non_atomic_requests(view)
+
+    @staticmethod
+    def authenticate(request: HttpRequest) -> int | None:
+        """
+        Return the ID of the user the DRF authenticators identify, None for an anonymous request.
+
+        Raises AuthenticationFailed for a bad token, and PermissionDenied for a session
+        authenticated request without a valid CSRF token.
+        """
+        authenticators = [authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        return user_id_of(Request(request, authenticators=authenticators).user)
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        try:
+            # The authenticators query the database.
+            self.user_id: int | None = await sync_to_async(self.authenticate)(request)
+        except (exceptions.AuthenticationFailed, exceptions.PermissionDenied) as e:
+            # The DRF views answer 403 too, their first authenticator sends no WWW-Authenticate header.
+            return self.detail(str(e.detail), status.HTTP_403_FORBIDDEN)
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def parse(request: HttpRequest) -> dict:
+        """
+        Return the data of a JSON or form encoded request body, raising ValueError when it is malformed JSON.
+        """
+        if request.content_type == "application/json":
+            data = json.loads(request.body or b"{}")
+            if not isinstance(data, dict):
+                raise ValueError("Expected a JSON object")
+            return data
+        return request.POST.dict()
+
+    @staticmethod
+    def detail(message: str, status_code: int) -> JsonResponse:
+        return JsonResponse({"detail": message}, status=status_code)
+
+
+class SetTimerAsyncView(AsyncTimerView):
+    """
+    Async version of SetTimerAPIView, inserting the timer with the async ORM.
+    """
+
+    async def post(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        try:
+            data: dict = self.parse(request)
+        except ValueError as e:
+            return self.detail(f"JSON parse error - {e}", status.HTTP_400_BAD_REQUEST)
+        input_serializer = SetTimerInputSerializer(data=data, context={"request": request})
+        if not input_serializer.is_valid():
+            return JsonResponse(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        idempotency_key: str | None = request.headers.get("Idempotency-Key") or None
+        if idempotency_key and len(idempotency_key) > IdempotencyKey._meta.get_field("key").max_length:
+            return self.detail("Idempotency-Key header is too long.", status.HTTP_400_BAD_REQUEST)
+        svc = TimerService()
+        try:
+            data = await svc.aset(
+                **input_serializer.validated_data, user_id=self.user_id, idempotency_key=idempotency_key
+            )
+        except QuotaExceededError as e:
+            response: JsonResponse = self.detail(str(e), status.HTTP_429_TOO_MANY_REQUESTS)
+            response["Retry-After"] = str(e.retry_after)
+            return response
+        headers: dict = {"Idempotent-Replayed": "true"} if data.get("replayed") else {}
+        return JsonResponse(SetTimerOutputSerializer(data).data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+class GetTimerAsyncView(AsyncTimerView):
+    """
+    Async version of GetTimerAPIView, reading the timer from the async cache client and the async ORM.
+
+    Rescheduling and canceling update the timer in a transaction, which the async ORM does not
+    support yet, so they run in a worker thread.
+    """
+
+    async def get(self, request: HttpRequest, task_id: str, *args, **kwargs) -> JsonResponse:
+        svc = TimerService()
+        try:
+            data: dict = await svc.aget(task_id, user_id=self.user_id)
+        except ValueError as e:
+            return self.detail(str(e), status.HTTP_404_NOT_FOUND)
+        return JsonResponse(SetTimerOutputSerializer(data).data, status=status.HTTP_200_OK)
+
+    async def patch(self, request: HttpRequest, task_id: str, *args, **kwargs) -> JsonResponse:
+        try:
+            data: dict = self.parse(request)
+        except ValueError as e:
+            return self.detail(f"JSON parse error - {e}", status.HTTP_400_BAD_REQUEST)
+        input_serializer = RescheduleTimerInputSerializer(data=data, context={"request": request})
+        if not input_serializer.is_valid():
+            return JsonResponse(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        svc = TimerService()
+        try:
+            data = await sync_to_async(transaction.atomic(svc.reschedule))(
+                task_id=task_id, user_id=self.user_id, **input_serializer.validated_data
+            )
+        except TimerNotPendingError as e:
+            return self.detail(str(e), status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return self.detail(str(e), status.HTTP_404_NOT_FOUND)
+        return JsonResponse(SetTimerOutputSerializer(data).data, status=status.HTTP_200_OK)
+
+    async def delete(self, request: HttpRequest, task_id: str, *args, **kwargs) -> HttpResponse:
+        svc = TimerService()
+        try:
+            await sync_to_async(transaction.atomic(svc.cancel))(task_id=task_id, user_id=self.user_id)
+        except TimerNotPendingError as e:
+            return self.detail(str(e), status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return self.detail(str(e), status.HTTP_404_NOT_FOUND)
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+class StreamTimerAsyncView(AsyncTimerView):
+    """
+    Async version of StreamTimerAPIView.
+
+    Each stream waits for the outcome of its timer on the event loop, so a single process
+    follows thousands of timers instead of one per worker thread.
+    """
+
+    async def get(self, request: HttpRequest, task_id: str, *args, **kwargs) -> HttpResponse:
+        svc = TimerService()
+        try:
+            events = await svc.astream(task_id, user_id=self.user_id)
+        except ValueError as e:
+            return self.detail(str(e), status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(events, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Stop nginx from buffering the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
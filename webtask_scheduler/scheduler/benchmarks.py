@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+from celery.exceptions import Retry
+from django.urls import reverse
+
+from webtask_scheduler.scheduler.delivery import close_engine
+from webtask_scheduler.scheduler.models import DeadLetter
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.tasks import send_request_to_url
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    """
+    Return the nearest-rank ``p``th percentile of ``values``.
+    """
+    if not values:
+        return None
+    ordered: list[float] = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    """
+    Summarize the latencies (in seconds) of the successful operations of a phase, in milliseconds.
+    """
+
+    def ms(value: float | None) -> float | None:
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_per_second": round(len(latencies) / elapsed, 3) if elapsed else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+    }
+
+
+class StubWebhookServer:
+    """
+    Local stand-in for the webhook receivers, answering on ``/hook/<key>``.
+
+    Every answer is delayed by ``latency`` seconds and a ``error_rate`` share of them are
+    500 errors. The first time each key was received is recorded to measure firing lateness.
+    """
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 0, latency: float = 0, error_rate: float = 0, public_host: str = ""
+    ) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.public_host: str = public_host or host
+        self.latency: float = latency
+        self.error_rate: float = error_rate
+        self.received: dict[str, float] = {}
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="stub-webhook-server", daemon=True)
+        self._runner: web.AppRunner | None = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.received.setdefault(request.match_info["key"], time.time())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if random.random() < self.error_rate:  # noqa: S311
+            return web.Response(status=500, text="simulated error")
+        return web.Response(text="ok")
+
+    async def _start(self) -> None:
+        app = web.Application()
+        app.add_routes([web.post("/hook/{key}", self._handle)])
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]
+
+    def start(self) -> "StubWebhookServer":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return self
+
+    def url(self, key: str | int) -> str:
+        return f"http://{self.public_host}:{self.port}/hook/{key}"
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.public_host}:{self.port}/"
+
+    def stop(self) -> None:
+        if self._runner is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+class TimerAPIBenchmark:
+    """
+    Drive SetTimerAPIView and GetTimerAPIView of a running deployment at a given concurrency.
+
+    Each timer calls the stub webhook server back after ``delay`` seconds, and the time it
+    arrives there minus the ``run_at`` of its Timer row is its firing lateness. The Timer rows
+    are read from the database this process is configured with, which must be the one of the
+    deployment under test.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        server: StubWebhookServer,
+        timers: int,
+        concurrency: int,
+        delay: int,
+        fire_timeout: float,
+    ) -> None:
+        self.base_url: str = base_url.rstrip("/")
+        self.server = server
+        self.timers: int = timers
+        self.concurrency: int = concurrency
+        self.delay: int = delay
+        self.fire_timeout: float = fire_timeout
+
+    async def _request(
+        self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, method: str, url: str, **kwargs
+    ):
+        async with semaphore:
+            started_at: float = time.monotonic()
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    body: dict = await response.json()
+                    if response.status >= 400:
+                        return None, body
+                    return time.monotonic() - started_at, body
+            except (aiohttp.ClientError, TimeoutError, ValueError) as e:
+                return None, {"error": str(e) or e.__class__.__name__}
+
+    async def _run_phase(self, requests: list[tuple[str, str, dict]]) -> tuple[dict, list[dict | None]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            started_at: float = time.monotonic()
+            results = await asyncio.gather(
+                *(self._request(session, semaphore, method, url, **kwargs) for method, url, kwargs in requests)
+            )
+            elapsed: float = time.monotonic() - started_at
+        latencies: list[float] = [latency for latency, _ in results if latency is not None]
+        bodies: list[dict | None] = [body if latency is not None else None for latency, body in results]
+        return summarize(latencies, len(results) - len(latencies), elapsed), bodies
+
+    def _wait_for_timers(self, keys: list[str]) -> None:
+        deadline: float = time.time() + self.delay + self.fire_timeout
+        while time.time() < deadline and any(key not in self.server.received for key in keys):
+            time.sleep(0.1)
+
+    def _firing(self, task_ids: dict[str, int]) -> dict:
+        self._wait_for_timers(list(task_ids))
+        run_at: dict[int, float] = {
+            task_id: value.timestamp()
+            for task_id, value in Timer.objects.filter(id__in=task_ids.values()).values_list("id", "run_at")
+        }
+        lateness: list[float] = [
+            self.server.received[key] - run_at[task_id]
+            for key, task_id in task_ids.items()
+            if key in self.server.received and task_id in run_at
+        ]
+        summary: dict = summarize(lateness, len(task_ids) - len(lateness), 0)
+        del summary["elapsed_seconds"], summary["throughput_per_second"]
+        summary["missing"] = summary.pop("errors")
+        summary["max_ms"] = round(max(lateness) * 1000, 3) if lateness else None
+        return summary
+
+    def run(self) -> dict:
+        set_url: str = self.base_url + reverse("api:scheduler:timer")
+        keys: list[str] = [f"{time.time_ns()}-{i}" for i in range(self.timers)]
+        set_summary, bodies = asyncio.run(
+            self._run_phase(
+                [
+                    (
+                        "POST",
+                        set_url,
+                        {"json": {"hours": 0, "minutes": 0, "seconds": self.delay, "web_url": self.server.url(key)}},
+                    )
+                    for key in keys
+                ]
+            )
+        )
+        task_ids: dict[str, int] = {key: body["task_id"] for key, body in zip(keys, bodies, strict=True) if body}
+        logger.info(f"Set {len(task_ids)} timers at {set_summary['throughput_per_second']} timers/s")
+
+        get_summary, _ = asyncio.run(
+            self._run_phase(
+                [
+                    ("GET", self.base_url + reverse("api:scheduler:timer", kwargs={"task_id": task_id}), {})
+                    for task_id in task_ids.values()
+                ]
+            )
+        )
+        return {"set_timer": set_summary, "get_timer": get_summary, "firing": self._firing(task_ids)}
+
+
+class DeliveryBenchmark:
+    """
+    Run ``send_request_to_url`` in process against the stub webhook server at a given concurrency.
+
+    Each delivery gets a single attempt, and the dead letters of the simulated errors are
+    removed once the run is over. Per-host throttling is only applied when ``throttle`` is set.
+    """
+
+    def __init__(self, server: StubWebhookServer, deliveries: int, concurrency: int, throttle: bool = False) -> None:
+        self.server = server
+        self.deliveries: int = deliveries
+        self.concurrency: int = concurrency
+        self.throttle: bool = throttle
+
+    def _deliver(self, key: str) -> float | None:
+        started_at: float = time.monotonic()
+        try:
+            result: str | dict = send_request_to_url(self.server.url(key), max_attempts=1, host_throttle=self.throttle)
+        except Retry:
+            # Only raised when the host is throttled.
+            return None
+        if isinstance(result, dict):
+            return None
+        return time.monotonic() - started_at
+
+    def run(self) -> dict:
+        keys: list[str] = [f"delivery-{time.time_ns()}-{i}" for i in range(self.deliveries)]
+        started_at: float = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results: list[float | None] = list(executor.map(self._deliver, keys))
+        elapsed: float = time.monotonic() - started_at
+        close_engine()
+        DeadLetter.objects.filter(task_id=None, url__startswith=self.server.base_url).delete()
+        latencies: list[float] = [latency for latency in results if latency is not None]
+        return {"delivery": summarize(latencies, len(results) - len(latencies), elapsed)}
+
+
+# Metrics compared between runs: where they are found, and whether higher values are better.
+COMPARED_METRICS: list[tuple[str, str, bool]] = [
+    ("set_timer", "p95_ms", False),
+    ("set_timer", "throughput_per_second", True),
+    ("get_timer", "p95_ms", False),
+    ("get_timer", "throughput_per_second", True),
+    ("firing", "p95_ms", False),
+    ("delivery", "p95_ms", False),
+    ("delivery", "throughput_per_second", True),
+]
+# Failures compared between runs, as a share of the operations of their phase.
+COMPARED_FAILURES: list[tuple[str, str]] = [
+    ("set_timer", "errors"),
+    ("get_timer", "errors"),
+    ("firing", "missing"),
+    ("delivery", "errors"),
+]
+
+
+def side_by_side(results: dict, other: dict) -> dict:
+    """
+    Return the ratio of every compared metric of ``other`` to the one of ``results``, keyed by ``phase.metric``.
+    """
+    ratios: dict = {}
+    for phase, metric, _ in COMPARED_METRICS:
+        current: float | None = results.get(phase, {}).get(metric)
+        compared: float | None = other.get(phase, {}).get(metric)
+        if current and compared is not None:
+            ratios[f"{phase}.{metric}"] = round(compared / current, 3)
+    return ratios
+
+
+def failure_share(summary: dict, key: str) -> float | None:
+    """
+    Return the share of the operations of a phase counted under ``key``, its errors or missing timers.
+    """
+    failures: int | None = summary.get(key)
+    if failures is None:
+        return None
+    total: int = summary.get("count", 0) + failures
+    return failures / total if total else 0.0
+
+
+def compare_metrics(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    regressions: list[str] = []
+    for phase, metric, higher_is_better in COMPARED_METRICS:
+        previous: float | None = baseline.get(phase, {}).get(metric)
+        # Phases skipped in either run, and baselines without a reference value, have nothing to compare.
+        if phase not in results or not previous:
+            continue
+        current: float | None = results[phase].get(metric)
+        if current is None:
+            # No operation of the phase succeeded.
+            regressions.append(f"{phase}.{metric} is missing: {previous} -> {current}")
+            continue
+        change: float = (previous - current) / previous if higher_is_better else (current - previous) / previous
+        if change > max_regression:
+            regressions.append(f"{phase}.{metric} regressed by {change:.1%}: {previous} -> {current}")
+    return regressions
+
+
+def compare_failures(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    regressions: list[str] = []
+    for phase, key in COMPARED_FAILURES:
+        if phase not in results or phase not in baseline:
+            continue
+        current: float | None = failure_share(results[phase], key)
+        previous: float | None = failure_share(baseline[phase], key)
+        if current is None or previous is None:
+            continue
+        # A baseline without failures tolerates none.
+        if current > previous * (1 + max_regression):
+            regressions.append(f"{phase}.{key} rose from {previous:.1%} to {current:.1%} of the operations")
+    return regressions
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    """
+    Return a description of every metric of ``results`` worse than ``baseline`` by more than ``max_regression``.
+
+    ``max_regression`` is a ratio, 0.1 tolerates metrics 10% worse than the baseline. A metric the
+    baseline has but ``results`` lack, because no operation of its phase succeeded, is a regression,
+    and so is a share of errors or missing timers higher than the one of the baseline.
+    """
+    return compare_metrics(results, baseline, max_regression) + compare_failures(results, baseline, max_regression)
@@ -0,0 +1,84 @@
+import datetime as dt
+import logging
+
+import pytz
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class TimerCache:
+    """
+    Read-through cache of timer run times and owners, keyed by task ID.
+
+    The run time is stored with the user owning the timer, which lets the remaining time be
+    computed and access be checked without touching the database. The run time does change:
+    every writer of a timer's run time or status must refresh or drop its entry once its
+    transaction commits. Rescheduling drops it, and the dispatcher drops the entries of the
+    timers it publishes, advances to their next occurrence, skips or expires. Canceling drops
+    them, and deleting a timer drops its entry from the post_delete signal.
+    """
+
+    key_prefix = "scheduler:timer"
+
+    def _key(self, task_id: int | str) -> str:
+        return f"{self.key_prefix}:{task_id}:run_at"
+
+    def _timeout(self, run_at: dt.datetime, time_now: dt.datetime) -> int:
+        # Keep the entry until the timer fires plus a grace period, then let it expire on its own.
+        time_left_in_seconds = max((run_at - time_now).total_seconds(), 0)
+        return int(time_left_in_seconds) + settings.TIMER_CACHE_GRACE_SECONDS
+
+    def _run_at(self, value: tuple[float, int | None] | None, user_id: int | None) -> dt.datetime | None:
+        """
+        Return the run time of a cached ``(timestamp, owner)``, None when ``user_id`` may not access the timer.
+
+        The owner check is left to the database then, so a timer of another user looks like a missing one.
+        """
+        if value is None:
+            return None
+        timestamp, owner = value
+        if owner is not None and owner != user_id:
+            return None
+        return dt.datetime.fromtimestamp(timestamp, tz=pytz.utc)
+
+    def get(self, task_id: int | str, user_id: int | None = None) -> dt.datetime | None:
+        return self._run_at(cache.get(self._key(task_id)), user_id)
+
+    async def aget(self, task_id: int | str, user_id: int | None = None) -> dt.datetime | None:
+        return self._run_at(await cache.aget(self._key(task_id)), user_id)
+
+    def get_many(self, task_ids: list[int], user_id: int | None = None) -> dict[int, dt.datetime]:
+        keys: dict[str, int] = {self._key(task_id): task_id for task_id in task_ids}
+        run_at_times: dict[int, dt.datetime | None] = {
+            keys[key]: self._run_at(value, user_id) for key, value in cache.get_many(list(keys)).items()
+        }
+        return {task_id: run_at for task_id, run_at in run_at_times.items() if run_at is not None}
+
+    def set(self, task_id: int | str, run_at: dt.datetime, time_now: dt.datetime, owner: int | None = None) -> None:
+        cache.set(self._key(task_id), (run_at.timestamp(), owner), timeout=self._timeout(run_at, time_now))
+
+    async def aset(
+        self, task_id: int | str, run_at: dt.datetime, time_now: dt.datetime, owner: int | None = None
+    ) -> None:
+        await cache.aset(self._key(task_id), (run_at.timestamp(), owner), timeout=self._timeout(run_at, time_now))
+
+    def set_many(self, timers: dict[int, tuple[dt.datetime, int | None]], time_now: dt.datetime) -> None:
+        """
+        Cache the ``(run_at, owner)`` of many timers by task ID.
+        """
+        # Group by timeout so a batch costs one round trip per distinct expiry instead of one per timer.
+        by_timeout: dict[int, dict[str, tuple[float, int | None]]] = {}
+        for task_id, (run_at, owner) in timers.items():
+            timeout = self._timeout(run_at, time_now)
+            by_timeout.setdefault(timeout, {})[self._key(task_id)] = (run_at.timestamp(), owner)
+        for timeout, values in by_timeout.items():
+            cache.set_many(values, timeout=timeout)
+
+    def delete(self, task_id: int | str) -> None:
+        logger.debug(f"Invalidating cached run time of task with ID {task_id}")
+        cache.delete(self._key(task_id))
+
+    def delete_many(self, task_ids: list[int]) -> None:
+        cache.delete_many([self._key(task_id) for task_id in task_ids])
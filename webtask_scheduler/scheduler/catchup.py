@@ -0,0 +1,112 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from webtask_scheduler.scheduler.events import TimerEvents
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.timer_wheel import DueTimer
+
+logger = logging.getLogger(__name__)
+
+
+class CatchUpSweeper:
+    """
+    Replay the timers missed while the dispatchers were down, at a bounded rate.
+
+    Dispatchers only fire the timers due within the last TIMER_CATCHUP_AFTER_SECONDS. Older ones,
+    left behind by an outage, are handed to the sweeper, which releases them oldest first at
+    TIMER_CATCHUP_RATE per second instead of in one burst that would flood the workers and the
+    webhook hosts. The rate is split evenly between the dispatch shards, so it holds whatever
+    the number of dispatchers sharing them.
+
+    A timer later than its ``max_lateness_seconds`` follows its ``lateness_policy`` instead of firing.
+    """
+
+    def __init__(self, rate: float | None = None, after: float | None = None, shards: int | None = None) -> None:
+        self.after: float = after or settings.TIMER_CATCHUP_AFTER_SECONDS
+        # Timers replayed per second and shard, with a burst of one second of it.
+        self.rate: float = (rate or settings.TIMER_CATCHUP_RATE) / (shards or settings.TIMER_DISPATCH_SHARDS)
+        self.burst: float = max(self.rate, 1)
+        self._tokens: dict[int, float] = {}
+        self._refilled_at: dict[int, float] = {}
+
+    def overdue_before(self, now: float) -> float:
+        """
+        Return the UNIX timestamp timers due before are left to the sweeper.
+        """
+        return now - self.after
+
+    def _refill(self, shard: int) -> float:
+        now: float = time.monotonic()
+        tokens: float = self._tokens.get(shard, self.burst)
+        if shard in self._refilled_at:
+            tokens = min(tokens + (now - self._refilled_at[shard]) * self.rate, self.burst)
+        self._tokens[shard] = tokens
+        self._refilled_at[shard] = now
+        return tokens
+
+    def allowance(self, shard: int) -> int:
+        """
+        Return how many overdue timers of ``shard`` may be replayed right now.
+        """
+        return int(self._refill(shard))
+
+    def spend(self, shard: int, count: int) -> None:
+        self._tokens[shard] -= count
+
+    def wait(self, shard: int) -> float:
+        """
+        Return the seconds until the next overdue timer of ``shard`` may be replayed.
+        """
+        return max(1 - self._refill(shard), 0) / self.rate
+
+    def triage(self, overdue: list[DueTimer], now: float) -> tuple[list[DueTimer], list[DueTimer], list[DueTimer]]:
+        """
+        Split overdue timers into the ones to fire, to skip and to expire according to their lateness policy.
+
+        Skipped timers are recurring timers that wait for their next occurrence, one-off timers
+        have none and expire instead.
+        """
+        policies: dict[int, tuple[int, str]] = {
+            task_id: (max_lateness_seconds, lateness_policy)
+            for task_id, max_lateness_seconds, lateness_policy in Timer.objects.filter(
+                id__in=[timer.task_id for timer in overdue], max_lateness_seconds__isnull=False
+            ).values_list("id", "max_lateness_seconds", "lateness_policy")
+        }
+        fire: list[DueTimer] = []
+        skip: list[DueTimer] = []
+        expire: list[DueTimer] = []
+        for timer in overdue:
+            max_lateness_seconds, lateness_policy = policies.get(timer.task_id, (None, Timer.LatenessPolicy.FIRE))
+            if (
+                max_lateness_seconds is None
+                or lateness_policy == Timer.LatenessPolicy.FIRE
+                or now - timer.run_at <= max_lateness_seconds
+            ):
+                fire.append(timer)
+            elif lateness_policy == Timer.LatenessPolicy.SKIP and timer.recurring:
+                skip.append(timer)
+            else:
+                expire.append(timer)
+        return fire, skip, expire
+
+    def expire(self, timers: list[DueTimer]) -> None:
+        """
+        End timers that were too late to fire with the expired status.
+        """
+        expire_timers([timer.task_id for timer in timers])
+
+
+def expire_timers(task_ids: list[int]) -> None:
+    """
+    End timers that were too late to fire with the expired status, whether still pending or already queued.
+    """
+    Timer.objects.filter(id__in=task_ids, status__in=[Timer.Status.PENDING, Timer.Status.QUEUED]).update(
+        status=Timer.Status.EXPIRED, completed_at=timezone.now(), error="Later than its max lateness"
+    )
+    logger.warning(f"Expired {len(task_ids)} timers later than their max lateness")
+    if settings.TIMER_EVENTS:
+        transaction.on_commit(lambda: TimerEvents().publish_fired(Timer.objects.filter(id__in=task_ids)))
@@ -0,0 +1,14 @@
+from functools import cache
+
+import redis
+from django.conf import settings
+
+
+@cache
+def get_redis() -> redis.Redis:
+    """
+    Return the process wide Redis client used by the scheduler.
+
+    redis-py connection pools detect forks, so the client is safe to share with Celery prefork workers.
+    """
+    return redis.Redis.from_url(settings.REDIS_URL)
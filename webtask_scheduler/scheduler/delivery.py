@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import zlib
+from collections.abc import AsyncIterator
+from email.utils import parsedate_to_datetime
+from typing import NamedTuple
+
+import aiohttp
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from multidict import CIMultiDict
+
+logger = logging.getLogger(__name__)
+
+# Bytes of compressed body decompressed at a time while a body is streamed to its request.
+BODY_CHUNK_SIZE = 64 * 1024
+
+
+class WebhookRequest(NamedTuple):
+    """
+    The method, headers and gzip compressed JSON body of a webhook request, see Payload.
+    """
+
+    method: str
+    headers: dict[str, str]
+    body: bytes | None
+    size: int
+
+
+async def stream_body(compressed: bytes) -> AsyncIterator[bytes]:
+    """
+    Yield the decompressed body of a request chunk by chunk, so a large body is never held whole in memory.
+    """
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    view = memoryview(compressed)
+    for start in range(0, len(view), BODY_CHUNK_SIZE):
+        data: bytes = view[start : start + BODY_CHUNK_SIZE]
+        while data:
+            chunk: bytes = decompressor.decompress(data, BODY_CHUNK_SIZE)
+            if chunk:
+                yield chunk
+            data = decompressor.unconsumed_tail
+    if rest := decompressor.flush():
+        yield rest
+
+
+class DeliveryResult(NamedTuple):
+    url: str
+    status_code: int | None
+    text: str | None
+    error: str | None
+    elapsed: float
+    retry_after: float | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Return the number of seconds a ``Retry-After`` header asks to wait, given as seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0)
+
+
+class DeliveryEngine:
+    """
+    Deliver webhooks from an asyncio event loop running in a background thread.
+
+    The loop owns a single pooled aiohttp session, so connections are kept alive and
+    reused across deliveries, and per-host limits apply to everything the process sends.
+    Synchronous callers such as Celery tasks hand their requests over with ``deliver``
+    or ``deliver_many`` and many of them can be in flight at once.
+    """
+
+    def __init__(
+        self,
+        max_connections: int | None = None,
+        max_connections_per_host: int | None = None,
+        timeout: float | None = None,
+        keepalive_timeout: float | None = None,
+    ) -> None:
+        self.max_connections: int = max_connections or settings.TIMER_HTTP_MAX_CONNECTIONS
+        self.max_connections_per_host: int = max_connections_per_host or settings.TIMER_HTTP_MAX_CONNECTIONS_PER_HOST
+        self.timeout: float = timeout or settings.TIMER_HTTP_TIMEOUT
+        self.keepalive_timeout: float = keepalive_timeout or settings.TIMER_HTTP_KEEPALIVE_TIMEOUT
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="delivery-engine", daemon=True)
+        self._thread.start()
+        self._session: aiohttp.ClientSession = self.run(self._create_session())
+
+    async def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    def run(self, coroutine):
+        """
+        Run a coroutine on the engine loop and block until it returns.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def adeliver(self, url: str, request: WebhookRequest | None = None) -> DeliveryResult:
+        """
+        Send ``request`` to ``url``, an empty POST request when there is none.
+        """
+        method: str = "POST"
+        headers: CIMultiDict | None = None
+        data: AsyncIterator[bytes] | None = None
+        if request is not None:
+            method = request.method
+            headers = CIMultiDict(request.headers)
+            if request.body is not None:
+                headers.setdefault("Content-Type", "application/json")
+                # The length is known upfront, so the streamed body is not sent with chunked encoding.
+                headers["Content-Length"] = str(request.size)
+                data = stream_body(request.body)
+        started_at: float = time.monotonic()
+        try:
+            async with self._session.request(method, url, headers=headers, data=data) as response:
+                # Receivers may not answer in their declared charset, undecodable bytes are replaced.
+                text: str = await response.text(errors="replace")
+                error: str | None = None
+                if response.status >= 400:
+                    error = f"{response.status} Error: {response.reason} for url: {url}"
+                return DeliveryResult(
+                    url,
+                    response.status,
+                    text,
+                    error,
+                    time.monotonic() - started_at,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+        except (aiohttp.ClientError, TimeoutError) as e:
+            error = str(e) or e.__class__.__name__
+            return DeliveryResult(url, None, None, error, time.monotonic() - started_at)
+        except Exception as e:
+            # Anything else, such as a header aiohttp refuses to send, fails this delivery alone and not its batch.
+            logger.exception(f"Failed to deliver the webhook of {url}")
+            return DeliveryResult(url, None, None, f"{e.__class__.__name__}: {e}", time.monotonic() - started_at)
+
+    async def adeliver_many(
+        self, urls: list[str], requests: list[WebhookRequest | None] | None = None
+    ) -> list[DeliveryResult]:
+        return await asyncio.gather(
+            *(self.adeliver(url, request) for url, request in zip(urls, requests or [None] * len(urls), strict=True))
+        )
+
+    def deliver(self, url: str, request: WebhookRequest | None = None) -> DeliveryResult:
+        return self.run(self.adeliver(url, request))
+
+    def deliver_many(
+        self, urls: list[str], requests: list[WebhookRequest | None] | None = None
+    ) -> list[DeliveryResult]:
+        """
+        Deliver every URL concurrently, with the request of the same index if any, and return the results in order.
+        """
+        return self.run(self.adeliver_many(urls, requests))
+
+    def close(self) -> None:
+        self.run(self._session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+_engine: DeliveryEngine | None = None
+_engine_pid: int | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> DeliveryEngine:
+    """
+    Return the delivery engine of the current process.
+
+    Event loops and sockets do not survive a fork, so every prefork worker child lazily
+    builds its own engine the first time it delivers something.
+    """
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is None or _engine_pid != os.getpid():
+            _engine = DeliveryEngine()
+            _engine_pid = os.getpid()
+        return _engine
+
+
+@worker_process_shutdown.connect
+def close_engine(**kwargs) -> None:
+    global _engine
+    if _engine is not None and _engine_pid == os.getpid():
+        logger.info("Closing the delivery engine")
+        _engine.close()
+        _engine = None
@@ -0,0 +1,343 @@
+import datetime as dt
+import logging
+import math
+import time
+from collections import defaultdict
+
+import pytz
+from celery import current_app
+from django.conf import settings
+from django.db import close_old_connections
+from django.db import transaction
+
+from webtask_scheduler.scheduler.cache import TimerCache
+from webtask_scheduler.scheduler.catchup import CatchUpSweeper
+from webtask_scheduler.scheduler.metrics import observe_dispatch
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.quotas import TimerQuotas
+from webtask_scheduler.scheduler.recurrence import next_run_at
+from webtask_scheduler.scheduler.shards import ShardLeases
+from webtask_scheduler.scheduler.tasks import send_request_to_url
+from webtask_scheduler.scheduler.tasks import send_requests_to_urls
+from webtask_scheduler.scheduler.timer_queue import DatabaseTimerQueue
+from webtask_scheduler.scheduler.timer_wheel import DueTimer
+from webtask_scheduler.scheduler.timer_wheel import RedisTimerWheel
+
+logger = logging.getLogger(__name__)
+
+
+def publish_deliveries(timers: list[tuple], eta: dt.datetime | None = None) -> None:
+    """
+    Publish the deliveries of ``(task_id, url, max_attempts, run_at, payload_id)`` timers over one broker connection.
+
+    ``run_at`` is the UNIX timestamp the timer was due at, used to measure its firing lateness.
+    ``payload_id`` is None for timers sending an empty POST request.
+
+    Timers are grouped into chunks of TIMER_DELIVERY_CHUNK_SIZE, each delivered concurrently
+    by one ``send_requests_to_urls`` task. A lone timer keeps using ``send_request_to_url``.
+    """
+    chunk_size: int = settings.TIMER_DELIVERY_CHUNK_SIZE
+    with current_app.producer_or_acquire() as producer:
+        for start in range(0, len(timers), chunk_size):
+            chunk: list[tuple] = timers[start : start + chunk_size]
+            if len(chunk) == 1:
+                task_id, url, max_attempts, run_at, payload_id = chunk[0]
+                send_request_to_url.apply_async(
+                    args=[url],
+                    kwargs={
+                        "task_id": task_id,
+                        "max_attempts": max_attempts,
+                        "run_at": run_at,
+                        "payload_id": payload_id,
+                    },
+                    eta=eta,
+                    producer=producer,
+                )
+            else:
+                send_requests_to_urls.apply_async(args=[[list(timer) for timer in chunk]], eta=eta, producer=producer)
+
+
+class TimerDispatcher:
+    """
+    Fire timers as soon as they are due.
+
+    Due timers are popped in batches from the Redis timer wheel or claimed from the Timer table,
+    depending on TIMER_DISPATCH_BACKEND, and published to the workers. The matching Timer
+    rows are marked queued with one UPDATE per batch. Both backends hand each timer to a
+    single dispatcher, so any number of them can run at once.
+
+    Recurring timers are not marked queued: their row is advanced to the next occurrence in
+    the same step and they are put back in the Redis timer wheel, so they wait for it like
+    any pending timer.
+
+    Due timers are popped by deficit round-robin over their tenants, the users who set them: every
+    round, each tenant with due timers is served up to its quantum of TIMER_DISPATCH_BATCH_SIZE times
+    its UserQuota weight before the next one. Workers take the published timers in order, so a
+    burst of one tenant only delays the timers of the others by a round rather than by the whole burst.
+
+    Timers overdue by more than TIMER_CATCHUP_AFTER_SECONDS, after an outage, are not fired in
+    one go but replayed at a bounded rate after the on-time ones, see CatchUpSweeper. The rate is
+    shared between the tenants by weight as well.
+
+    With TIMER_DISPATCH_SHARDS above one, timers are split by ID into shards and every
+    dispatcher only fires the shards it holds a lease on, see ShardLeases. Dispatchers can
+    then be added or removed at any time, the shards are rebalanced between the live ones.
+    """
+
+    def __init__(self, batch_size: int | None = None, poll_interval: float | None = None) -> None:
+        self.queue: RedisTimerWheel | DatabaseTimerQueue = (
+            RedisTimerWheel() if settings.TIMER_DISPATCH_BACKEND == "redis" else DatabaseTimerQueue()
+        )
+        self.cache = TimerCache()
+        self.batch_size: int = batch_size or settings.TIMER_DISPATCH_BATCH_SIZE
+        self.poll_interval: float = poll_interval or settings.TIMER_DISPATCH_POLL_INTERVAL
+        self.lookahead: float = settings.TIMER_DISPATCH_LOOKAHEAD_SECONDS
+        self.leases: ShardLeases | None = ShardLeases() if settings.TIMER_DISPATCH_SHARDS > 1 else None
+        self.sweeper = CatchUpSweeper()
+        self.quotas = TimerQuotas()
+        # Last tenant of each shard served by the sweeper, the next catch-up starts after it.
+        self._caught_up: dict[int, int] = {}
+        self._running = False
+
+    def owned_shards(self) -> list[int]:
+        """
+        Return the shards this dispatcher may fire, renewing its leases when they are due for it.
+        """
+        if self.leases is None:
+            return [0]
+        if self.leases.refresh_due:
+            self.leases.refresh()
+        return sorted(self.leases.owned) if self.leases.valid else []
+
+    def dispatch_once(self) -> int:
+        """
+        Publish every timer of the owned shards that is due right now and return how many were dispatched.
+
+        Overdue timers the catch-up rate allows are handled after the on-time ones and counted as well.
+        """
+        # The dispatcher is a long running process, so drop connections the database may have closed.
+        close_old_connections()
+        return sum(self._dispatch_shard(shard) + self._catch_up_shard(shard) for shard in self.owned_shards())
+
+    def _dispatch_shard(self, shard: int) -> int:
+        """
+        Publish the due timers of ``shard`` by deficit round-robin over their tenants and return how many were.
+
+        Timers all cost the same, so no deficit carries over from a round to the next: a tenant using less
+        than its quantum has no timer due left.
+        """
+        dispatched = 0
+        while True:
+            now: float = time.time()
+            tenants: list[int] = self.queue.due_tenants(
+                now + self.lookahead, shard, since=self.sweeper.overdue_before(now)
+            )
+            if not tenants:
+                return dispatched
+            weights: dict[int, int] = self.quotas.weights(tenants)
+            backlogged = False
+            for tenant in tenants:
+                quantum: int = self.batch_size * weights[tenant]
+                while quantum > 0:
+                    if self.leases is not None and not self.leases.valid:
+                        # The lease may have been taken over meanwhile, leave the rest of the shard to its new owner.
+                        return dispatched
+                    limit: int = min(quantum, self.batch_size)
+                    popped: int = self._dispatch_batch(shard, tenant, limit)
+                    dispatched += popped
+                    quantum -= popped
+                    if popped < limit:
+                        break
+                # A tenant that used up its quantum may have more timers due, which wait for the next round.
+                backlogged = backlogged or quantum == 0
+            if not backlogged:
+                return dispatched
+
+    def _dispatch_batch(self, shard: int, tenant: int, limit: int) -> int:
+        # Claim, publish and mark a batch queued in one transaction: a failure before the commit
+        # releases the claimed rows, so a timer is only lost once it was handed to the broker.
+        with transaction.atomic():
+            now: float = time.time()
+            due: list[DueTimer] = self.queue.pop_due(
+                now=now + self.lookahead,
+                limit=limit,
+                shard=shard,
+                since=self.sweeper.overdue_before(now),
+                tenant=tenant,
+            )
+            if not due:
+                return 0
+            try:
+                self._publish(due)
+            except Exception:
+                # Put the batch back so a broker hiccup delays the timers instead of losing them.
+                self._put_back(due)
+                raise
+        return len(due)
+
+    def _catch_up_shard(self, shard: int) -> int:
+        """
+        Handle the oldest overdue timers of ``shard`` the catch-up rate allows and return how many were handled.
+
+        Every tenant with overdue timers gets a share of the allowance by weight, at least one timer, starting
+        after the tenant served last so small shares still go round.
+        """
+        limit: int = min(self.sweeper.allowance(shard), self.batch_size)
+        if limit < 1 or (self.leases is not None and not self.leases.valid):
+            return 0
+        tenants: list[int] = sorted(self.queue.due_tenants(self.sweeper.overdue_before(time.time()), shard))
+        if not tenants:
+            return 0
+        last: int = self._caught_up.get(shard, -1)
+        tenants = [tenant for tenant in tenants if tenant > last] + [tenant for tenant in tenants if tenant <= last]
+        weights: dict[int, int] = self.quotas.weights(tenants)
+        total_weight: int = sum(weights.values())
+        handled = 0
+        for tenant in tenants:
+            share: int = max(limit * weights[tenant] // total_weight, 1)
+            handled += self._catch_up_tenant(shard, tenant, min(share, limit - handled))
+            self._caught_up[shard] = tenant
+            if handled >= limit:
+                break
+        return handled
+
+    def _catch_up_tenant(self, shard: int, tenant: int, limit: int) -> int:
+        with transaction.atomic():
+            now: float = time.time()
+            overdue: list[DueTimer] = self.queue.pop_overdue(
+                before=self.sweeper.overdue_before(now), limit=limit, shard=shard, tenant=tenant
+            )
+            if not overdue:
+                return 0
+            self.sweeper.spend(shard, len(overdue))
+            try:
+                fire, skip, expire = self.sweeper.triage(overdue, now)
+                if fire:
+                    self._publish(fire)
+                if skip:
+                    self._advance(skip)
+                if expire:
+                    self.sweeper.expire(expire)
+                self.cache.delete_many([timer.task_id for timer in skip + expire])
+            except Exception:
+                self._put_back(overdue)
+                raise
+        logger.warning(
+            f"Caught up {len(overdue)} overdue timers of tenant {tenant} in shard {shard}: "
+            f"{len(fire)} fired, {len(skip)} skipped and {len(expire)} expired"
+        )
+        return len(overdue)
+
+    def _put_back(self, timers: list[DueTimer]) -> None:
+        self.queue.add_many(
+            (
+                timer.task_id,
+                timer.url,
+                dt.datetime.fromtimestamp(timer.run_at, tz=pytz.utc),
+                timer.max_attempts,
+                timer.interval_seconds,
+                timer.cron,
+                timer.payload_id,
+                timer.user_id,
+            )
+            for timer in timers
+        )
+
+    def _publish(self, due: list[DueTimer]) -> None:
+        now: float = time.time()
+        # Timers popped ahead of their run time are published with an ETA, so the worker already holds them
+        # when they are due and fires them from its timer to the millisecond. Timers due within the same
+        # millisecond share their messages.
+        deliveries: dict[float | None, list[tuple[int, str, int | None, float, int | None]]] = defaultdict(list)
+        for timer in due:
+            eta: float | None = math.ceil(timer.run_at * 1000) / 1000 if timer.run_at > now else None
+            deliveries[eta].append((timer.task_id, timer.url, timer.max_attempts, timer.run_at, timer.payload_id))
+        for eta, timers in deliveries.items():
+            publish_deliveries(timers, eta=dt.datetime.fromtimestamp(eta, tz=pytz.utc) if eta is not None else None)
+        observe_dispatch([timer.run_at for timer in due])
+
+        task_ids: list[int] = [timer.task_id for timer in due]
+        one_off: list[int] = [timer.task_id for timer in due if not timer.recurring]
+        if one_off:
+            Timer.objects.filter(id__in=one_off, status=Timer.Status.PENDING).update(status=Timer.Status.QUEUED)
+        recurring: list[DueTimer] = [timer for timer in due if timer.recurring]
+        if recurring:
+            self._advance(recurring)
+        self.cache.delete_many(task_ids)
+        lateness: float = time.time() - min(timer.run_at for timer in due)
+        logger.info(f"Dispatched {len(due)} timers, oldest was {lateness:.3f}s late")
+
+    def _advance(self, timers: list[DueTimer]) -> None:
+        """
+        Move fired recurring timers to their next occurrence, in place.
+        """
+        time_now: dt.datetime = dt.datetime.now(tz=pytz.utc)
+        advanced: list[tuple[DueTimer, dt.datetime]] = [
+            (
+                timer,
+                next_run_at(
+                    dt.datetime.fromtimestamp(timer.run_at, tz=pytz.utc), time_now, timer.interval_seconds, timer.cron
+                ),
+            )
+            for timer in timers
+        ]
+        Timer.objects.bulk_update([Timer(id=timer.task_id, run_at=run_at) for timer, run_at in advanced], ["run_at"])
+        if settings.TIMER_DISPATCH_BACKEND == "redis":
+            # Timers canceled since they were popped must not be put back.
+            pending: set[int] = set(
+                Timer.objects.filter(
+                    id__in=[timer.task_id for timer in timers], status=Timer.Status.PENDING
+                ).values_list("id", flat=True)
+            )
+            self.queue.add_many(
+                (
+                    timer.task_id,
+                    timer.url,
+                    run_at,
+                    timer.max_attempts,
+                    timer.interval_seconds,
+                    timer.cron,
+                    timer.payload_id,
+                    timer.user_id,
+                )
+                for timer, run_at in advanced
+                if timer.task_id in pending
+            )
+
+    def _sleep_interval(self) -> float:
+        now: float = time.time()
+        overdue_before: float = self.sweeper.overdue_before(now)
+        wake_at_list: list[float] = []
+        for shard in self.leases.owned if self.leases is not None else [0]:
+            run_at: float | None = self.queue.next_run_at(shard=shard)
+            if run_at is not None and run_at < overdue_before:
+                # Overdue timers are waiting for the catch-up rate, on-time timers must not wait with them.
+                wake_at_list.append(now + self.sweeper.wait(shard))
+                run_at = self.queue.next_run_at(shard=shard, since=overdue_before)
+            if run_at is not None:
+                wake_at_list.append(run_at - self.lookahead)
+        if not wake_at_list:
+            return self.poll_interval
+        return min(max(min(wake_at_list) - now, 0), self.poll_interval)
+
+    def run_forever(self) -> None:
+        logger.info(
+            f"Timer dispatcher started with batch size {self.batch_size} and {settings.TIMER_DISPATCH_SHARDS} shards"
+        )
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    self.dispatch_once()
+                except Exception:
+                    logger.exception("Failed to dispatch due timers")
+                    time.sleep(self.poll_interval)
+                    continue
+                time.sleep(self._sleep_interval())
+        finally:
+            if self.leases is not None:
+                # Hand the shards over right away rather than after the leases expire.
+                self.leases.release_all()
+
+    def stop(self) -> None:
+        self._running = False
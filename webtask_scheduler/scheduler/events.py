@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Iterable
+from collections.abc import Iterator
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from redis.client import PubSub
+
+from webtask_scheduler.scheduler.connections import get_redis
+from webtask_scheduler.scheduler.models import Timer
+
+logger = logging.getLogger(__name__)
+
+
+def fired_event(timer: Timer) -> dict:
+    """
+    Return the ``fired`` event of a timer whose delivery is over.
+    """
+    return {
+        "task_id": timer.id,
+        "status": timer.status,
+        "attempts": timer.attempts,
+        "status_code": timer.status_code,
+        "error": timer.error,
+        "completed_at": timer.completed_at,
+        "lateness_in_milliseconds": timer.lateness_ms,
+    }
+
+
+def server_sent_event(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def countdown_event(timer: Timer) -> str:
+    time_left_in_seconds: float = max(round((timer.run_at - timezone.now()).total_seconds(), 1), 0)
+    return server_sent_event(
+        "countdown", json.dumps({"task_id": timer.id, "time_left_in_seconds": time_left_in_seconds})
+    )
+
+
+# Statuses timers end with, announced by the ``canceled`` and ``expired`` events, or by the ``fired`` event.
+FINAL_STATUSES: tuple[Timer.Status, ...] = (
+    Timer.Status.SUCCEEDED,
+    Timer.Status.FAILED,
+    Timer.Status.CANCELED,
+    Timer.Status.EXPIRED,
+)
+
+
+def outcome_event(data: str) -> str:
+    """
+    Return the event announcing an outcome published on the channel of a timer.
+    """
+    status: str = json.loads(data)["status"]
+    if status in (Timer.Status.CANCELED, Timer.Status.EXPIRED):
+        return server_sent_event(status, data)
+    return server_sent_event("fired", data)
+
+
+class TimerEvents:
+    """
+    Redis pub/sub channels announcing the outcome of timers, one channel per timer.
+
+    Workers publish the final outcome of every delivery, and the countdown streams of the
+    timer wait for it instead of polling the database.
+    """
+
+    channel_prefix = "scheduler:timer"
+
+    def __init__(self) -> None:
+        self.redis = get_redis()
+
+    def channel(self, task_id: int | str) -> str:
+        return f"{self.channel_prefix}:{task_id}:events"
+
+    def publish_fired(self, timers: Iterable[Timer]) -> None:
+        pipeline = self.redis.pipeline(transaction=False)
+        for timer in timers:
+            pipeline.publish(self.channel(timer.id), json.dumps(fired_event(timer), cls=DjangoJSONEncoder))
+        try:
+            pipeline.execute()
+        except redis.RedisError:
+            # The outcome is stored on the Timer row already, streams only miss the push.
+            logger.exception("Failed to publish fired timer events")
+
+    def publish_canceled(self, task_ids: Iterable[int]) -> None:
+        pipeline = self.redis.pipeline(transaction=False)
+        for task_id in task_ids:
+            pipeline.publish(
+                self.channel(task_id), json.dumps({"task_id": task_id, "status": Timer.Status.CANCELED.value})
+            )
+        try:
+            pipeline.execute()
+        except redis.RedisError:
+            logger.exception("Failed to publish canceled timer events")
+
+    def subscribe(self, task_id: int | str) -> PubSub:
+        pubsub: PubSub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel(task_id))
+        return pubsub
+
+    def _wait_for_message(self, pubsub: PubSub, timeout: float) -> dict | None:
+        # Subscription confirmations end the wait early without a message, keep waiting for the rest of it.
+        wait_until: float = time.monotonic() + timeout
+        while (remaining := wait_until - time.monotonic()) > 0:
+            message: dict | None = pubsub.get_message(timeout=remaining)
+            if message is not None:
+                return message
+        return None
+
+    def stream(self, timer: Timer, pubsub: PubSub) -> Iterator[str]:
+        """
+        Yield ``countdown`` events with the time left every TIMER_STREAM_TICK_SECONDS, then the ``fired``
+        event, or the ``canceled`` or ``expired`` event when the timer ends without firing.
+
+        The stream ends after TIMER_STREAM_MAX_SECONDS without the timer firing, clients reconnect to follow it further.
+        """
+        try:
+            if timer.status in FINAL_STATUSES:
+                yield outcome_event(json.dumps(fired_event(timer), cls=DjangoJSONEncoder))
+                return
+            deadline: float = time.monotonic() + settings.TIMER_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                yield countdown_event(timer)
+                message: dict | None = self._wait_for_message(pubsub, settings.TIMER_STREAM_TICK_SECONDS)
+                if message is not None:
+                    yield outcome_event(message["data"].decode())
+                    return
+        finally:
+            pubsub.close()
+
+    async def asubscribe(self, task_id: int | str) -> redis.asyncio.client.PubSub:
+        """
+        Subscribe to the channel of a timer with an asyncio client, which is bound to the event loop of the caller.
+        """
+        client: redis.asyncio.Redis = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+        pubsub: redis.asyncio.client.PubSub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel(task_id))
+        return pubsub
+
+    async def _await_message(self, pubsub: redis.asyncio.client.PubSub, timeout: float) -> dict | None:
+        wait_until: float = time.monotonic() + timeout
+        while (remaining := wait_until - time.monotonic()) > 0:
+            message: dict | None = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None:
+                return message
+        return None
+
+    async def astream(self, timer: Timer, pubsub: redis.asyncio.client.PubSub) -> AsyncIterator[str]:
+        """
+        Same events as ``stream``, awaiting the outcome on the event loop instead of blocking a thread per stream.
+        """
+        try:
+            if timer.status in FINAL_STATUSES:
+                yield outcome_event(json.dumps(fired_event(timer), cls=DjangoJSONEncoder))
+                return
+            deadline: float = time.monotonic() + settings.TIMER_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                yield countdown_event(timer)
+                message: dict | None = await self._await_message(pubsub, settings.TIMER_STREAM_TICK_SECONDS)
+                if message is not None:
+                    yield outcome_event(message["data"].decode())
+                    return
+        finally:
+            # Disconnecting clients cancel the stream, which must still let go of its connection.
+            await asyncio.shield(self.aclose(pubsub))
+
+    @staticmethod
+    async def aclose(pubsub: redis.asyncio.client.PubSub) -> None:
+        await pubsub.aclose()
+        await pubsub.connection_pool.disconnect()
@@ -0,0 +1,68 @@
+import datetime as dt
+import logging
+
+import pytz
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from webtask_scheduler.scheduler.models import IdempotencyKey
+from webtask_scheduler.scheduler.quotas import tenant_of
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyKeys:
+    """
+    Idempotency keys of timer requests, mapped to the timer they set.
+
+    Keys are cached for TIMER_IDEMPOTENCY_KEY_TTL, so most retries are answered without touching
+    the database. The IdempotencyKey table is the source of truth: its unique constraint settles
+    concurrent requests carrying the same key, and it answers the retries the cache missed.
+
+    Keys are scoped by the user of the request, so a user can never be answered with the timer
+    of another user who happened to pick the same key. Anonymous requests share one scope.
+    """
+
+    key_prefix = "scheduler:idempotency"
+
+    def _key(self, key: str, user_id: int | None) -> str:
+        return f"{self.key_prefix}:{tenant_of(user_id)}:{key}"
+
+    def get(self, key: str, user_id: int | None = None) -> tuple[int, dt.datetime] | None:
+        """
+        Return the task ID and run time of the timer the user ``user_id`` set with ``key``, if any.
+        """
+        cached: tuple[int, float] | None = cache.get(self._key(key, user_id))
+        if cached is not None:
+            task_id, timestamp = cached
+            return task_id, dt.datetime.fromtimestamp(timestamp, tz=pytz.utc)
+        stored: tuple[int, dt.datetime] | None = (
+            IdempotencyKey.objects.filter(user_id=tenant_of(user_id), key=key, created_at__gte=self.expired_before())
+            .values_list("task_id", "run_at")
+            .first()
+        )
+        if stored is not None:
+            self.remember(key, *stored, user_id=user_id)
+        return stored
+
+    def store(self, key: str, task_id: int, run_at: dt.datetime, user_id: int | None = None) -> None:
+        """
+        Store the timer set with ``key``, raising IntegrityError when a concurrent request stored it first.
+        """
+        tenant: int = tenant_of(user_id)
+        # An expired key may still wait for its cleanup, it must not block its reuse.
+        IdempotencyKey.objects.filter(user_id=tenant, key=key, created_at__lt=self.expired_before()).delete()
+        IdempotencyKey.objects.create(user_id=tenant, key=key, task_id=task_id, run_at=run_at)
+
+    def remember(self, key: str, task_id: int, run_at: dt.datetime, user_id: int | None = None) -> None:
+        cache.set(self._key(key, user_id), (task_id, run_at.timestamp()), timeout=settings.TIMER_IDEMPOTENCY_KEY_TTL)
+
+    @staticmethod
+    def expired_before() -> dt.datetime:
+        return timezone.now() - dt.timedelta(seconds=settings.TIMER_IDEMPOTENCY_KEY_TTL)
+
+    def delete_expired(self) -> int:
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=self.expired_before()).delete()
+        logger.info(f"Deleted {deleted} expired idempotency keys")
+        return deleted
@@ -0,0 +1,133 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from webtask_scheduler.scheduler.benchmarks import DeliveryBenchmark
+from webtask_scheduler.scheduler.benchmarks import StubWebhookServer
+from webtask_scheduler.scheduler.benchmarks import TimerAPIBenchmark
+from webtask_scheduler.scheduler.benchmarks import compare
+from webtask_scheduler.scheduler.benchmarks import side_by_side
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the timer API, firing lateness and webhook delivery against a local stub webhook server, "
+        "and optionally fail when the results regressed from a baseline run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000", help="URL of the deployment under test.")
+        parser.add_argument(
+            "--compare-url", help="URL of a second deployment the API phase also runs against, e.g. the ASGI one."
+        )
+        parser.add_argument("--timers", type=int, default=1000, help="Number of timers set through the API.")
+        parser.add_argument("--deliveries", type=int, default=1000, help="Number of webhooks delivered in process.")
+        parser.add_argument("--concurrency", type=int, default=50, help="Number of requests in flight at once.")
+        # Timers due within TIMER_ETA_THRESHOLD_SECONDS go to the broker directly, past it they go through the
+        # dispatcher, whose firing lateness is the one worth gating on.
+        parser.add_argument(
+            "--delay",
+            type=int,
+            default=settings.TIMER_ETA_THRESHOLD_SECONDS + 30,
+            help="Seconds after which the benchmark timers fire, past the direct ETA threshold by default.",
+        )
+        parser.add_argument("--fire-timeout", type=float, default=60, help="Seconds to wait for late timers.")
+        parser.add_argument("--webhook-latency", type=float, default=0.05, help="Seconds the stub takes to answer.")
+        parser.add_argument("--webhook-error-rate", type=float, default=0, help="Share of 500 stub answers.")
+        parser.add_argument("--webhook-bind", default="127.0.0.1", help="Address the stub webhook server binds to.")
+        parser.add_argument("--webhook-port", type=int, default=0, help="Port of the stub, random by default.")
+        parser.add_argument(
+            "--webhook-host", default="", help="Host the workers reach the stub at, the bind address by default."
+        )
+        parser.add_argument("--throttle", action="store_true", help="Apply per-host throttling to the deliveries.")
+        parser.add_argument("--skip-api", action="store_true", help="Do not benchmark the API and timer firing.")
+        parser.add_argument("--skip-delivery", action="store_true", help="Do not benchmark webhook delivery.")
+        parser.add_argument("--output", type=Path, help="File the JSON results are written to.")
+        parser.add_argument("--baseline", type=Path, help="JSON results of a previous run to compare against.")
+        parser.add_argument(
+            "--max-regression", type=float, default=0.1, help="Tolerated ratio a metric may be worse than baseline."
+        )
+
+    def _git_revision(self) -> str | None:
+        try:
+            return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()  # noqa: S603, S607
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _run_api(self, base_url: str, server: StubWebhookServer, options: dict) -> dict:
+        self.stderr.write(f"Setting {options['timers']} timers on {base_url}")
+        return TimerAPIBenchmark(
+            base_url=base_url,
+            server=server,
+            timers=options["timers"],
+            concurrency=options["concurrency"],
+            delay=options["delay"],
+            fire_timeout=options["fire_timeout"],
+        ).run()
+
+    def handle(self, *args, **options):
+        config: dict = {
+            key: options[key]
+            for key in (
+                "base_url",
+                "compare_url",
+                "timers",
+                "deliveries",
+                "concurrency",
+                "delay",
+                "webhook_latency",
+                "webhook_error_rate",
+                "throttle",
+            )
+        }
+        report: dict = {"started_at": timezone.now().isoformat(), "revision": self._git_revision(), "config": config}
+        server = StubWebhookServer(
+            host=options["webhook_bind"],
+            port=options["webhook_port"],
+            latency=options["webhook_latency"],
+            error_rate=options["webhook_error_rate"],
+            public_host=options["webhook_host"],
+        ).start()
+        try:
+            if not options["skip_api"]:
+                report.update(self._run_api(options["base_url"], server, options))
+                if options["compare_url"]:
+                    compared: dict = self._run_api(options["compare_url"], server, options)
+                    report["compare"] = {
+                        "base_url": options["compare_url"],
+                        **compared,
+                        "ratios": side_by_side(report, compared),
+                    }
+            if not options["skip_delivery"]:
+                self.stderr.write(f"Delivering {options['deliveries']} webhooks")
+                report.update(
+                    DeliveryBenchmark(
+                        server=server,
+                        deliveries=options["deliveries"],
+                        concurrency=options["concurrency"],
+                        throttle=options["throttle"],
+                    ).run()
+                )
+        finally:
+            server.stop()
+
+        output: str = json.dumps(report, indent=2)
+        if options["output"]:
+            options["output"].parent.mkdir(parents=True, exist_ok=True)
+            options["output"].write_text(output + "\n")
+        else:
+            sys.stdout.write(output + "\n")
+
+        if options["baseline"]:
+            regressions: list[str] = compare(
+                report, json.loads(options["baseline"].read_text()), options["max_regression"]
+            )
+            if regressions:
+                raise CommandError("Benchmark regressed:\n" + "\n".join(regressions))
+            self.stderr.write(self.style.SUCCESS("No regression from the baseline"))
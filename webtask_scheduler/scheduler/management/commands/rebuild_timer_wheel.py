@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.timer_wheel import RedisTimerWheel
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the Redis timer wheel from the pending timers, after changing TIMER_DISPATCH_SHARDS. "
+        "Stop the dispatchers while it runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Number of timers indexed per round trip.")
+
+    def handle(self, *args, **options):
+        wheel = RedisTimerWheel()
+        for pattern in (f"{wheel.due_key}*", f"{wheel.deliveries_key}*", f"{wheel.tenants_key}*"):
+            for key in wheel.redis.scan_iter(match=pattern):
+                wheel.redis.delete(key)
+
+        timers = Timer.objects.filter(status=Timer.Status.PENDING).values_list(
+            "id", "url", "run_at", "max_attempts", "interval_seconds", "cron", "payload_id", "user_id"
+        )
+        chunk: list[tuple] = []
+        indexed = 0
+        for timer in timers.iterator(chunk_size=options["chunk_size"]):
+            chunk.append(timer)
+            if len(chunk) == options["chunk_size"]:
+                wheel.add_many(chunk)
+                indexed += len(chunk)
+                chunk = []
+        wheel.add_many(chunk)
+        indexed += len(chunk)
+        self.stdout.write(f"Indexed {indexed} pending timers into {wheel.shards} shards")
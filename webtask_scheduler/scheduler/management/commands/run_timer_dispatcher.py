@@ -0,0 +1,21 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from webtask_scheduler.scheduler.dispatcher import TimerDispatcher
+
+
+class Command(BaseCommand):
+    help = "Fire due timers from the Timer table or the Redis timer wheel, see TIMER_DISPATCH_BACKEND."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Maximum number of timers popped per round trip.")
+        parser.add_argument("--poll-interval", type=float, help="Maximum seconds to sleep between polls.")
+
+    def handle(self, *args, **options):
+        dispatcher = TimerDispatcher(batch_size=options["batch_size"], poll_interval=options["poll_interval"])
+        signal.signal(signal.SIGTERM, lambda *_: dispatcher.stop())
+        try:
+            dispatcher.run_forever()
+        except KeyboardInterrupt:
+            dispatcher.stop()
@@ -0,0 +1,99 @@
+import os
+import socket
+import time
+
+from django.conf import settings
+from prometheus_client import REGISTRY
+from prometheus_client import CollectorRegistry
+from prometheus_client import Counter
+from prometheus_client import Histogram
+from prometheus_client import values
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from webtask_scheduler.scheduler.delivery import DeliveryResult
+from webtask_scheduler.scheduler.timer_queue import DatabaseTimerQueue
+from webtask_scheduler.scheduler.timer_wheel import RedisTimerWheel
+
+if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+    # Every container of the stack writes to the same directory and process IDs are only
+    # unique within a container, so the files of a process are named after its host too.
+    values.ValueClass = values.MultiProcessValue(process_identifier=lambda: f"{socket.gethostname()}-{os.getpid()}")
+
+# Seconds late, from a few milliseconds of dispatch overhead up to timers held back for minutes.
+LATENESS_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+DISPATCH_LAG = Histogram(
+    "scheduler_timer_dispatch_lag_seconds",
+    "Time between the run time of a timer and its publication by the dispatcher.",
+    buckets=LATENESS_BUCKETS,
+)
+FIRING_LATENESS = Histogram(
+    "scheduler_timer_firing_lateness_seconds",
+    "Time between the run time of a timer and the completion of its first delivery attempt.",
+    buckets=LATENESS_BUCKETS,
+)
+DELIVERY_DURATION = Histogram(
+    "scheduler_webhook_duration_seconds",
+    "Duration of outbound webhook requests.",
+    ["status_class"],
+    buckets=LATENESS_BUCKETS,
+)
+DELIVERIES = Counter(
+    "scheduler_webhook_deliveries",
+    "Outbound webhook requests by status class, `error` when no response was received.",
+    ["status_class"],
+)
+
+
+def status_class(status_code: int | None) -> str:
+    return f"{status_code // 100}xx" if status_code is not None else "error"
+
+
+def observe_delivery(result: DeliveryResult, run_at: float | None = None) -> None:
+    """
+    Record the outcome and duration of a webhook request, and the firing lateness of its timer when ``run_at`` is given.
+    """
+    label: str = status_class(result.status_code)
+    DELIVERIES.labels(status_class=label).inc()
+    DELIVERY_DURATION.labels(status_class=label).observe(result.elapsed)
+    if run_at is not None:
+        FIRING_LATENESS.observe(max(time.time() - run_at, 0))
+
+
+def observe_dispatch(run_at_list: list[float]) -> None:
+    now: float = time.time()
+    for run_at in run_at_list:
+        DISPATCH_LAG.observe(max(now - run_at, 0))
+
+
+class DueTimersCollector:
+    """
+    Report the number of timers due but not dispatched yet, counted when the metrics are scraped.
+    """
+
+    def collect(self):
+        queue: RedisTimerWheel | DatabaseTimerQueue = (
+            RedisTimerWheel() if settings.TIMER_DISPATCH_BACKEND == "redis" else DatabaseTimerQueue()
+        )
+        yield GaugeMetricFamily(
+            "scheduler_timers_due",
+            "Timers due but not dispatched yet.",
+            value=queue.due_count(time.time()),
+        )
+
+
+def get_registry() -> CollectorRegistry:
+    """
+    Return the registry the metrics endpoint exposes.
+
+    With PROMETHEUS_MULTIPROC_DIR set, the metrics written by every web, dispatcher and Celery
+    prefork worker process of the stack are aggregated from that directory.
+    """
+    registry = CollectorRegistry()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        MultiProcessCollector(registry)
+    else:
+        registry.register(REGISTRY)
+    registry.register(DueTimersCollector())
+    return registry
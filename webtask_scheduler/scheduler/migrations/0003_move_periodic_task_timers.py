@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.color import no_style
+from django.db import migrations
+
+SEND_REQUEST_TASK = "webtask_scheduler.scheduler.tasks.send_request_to_url"
+
+
+def move_periodic_task_timers(apps, schema_editor):
+    """
+    Turn the timers that did not fire yet from one-off PeriodicTasks into Timer rows.
+
+    IDs are kept, so clients can still look up the timers they were given and the Redis
+    timer wheel keeps pointing at the right rows. Only enabled tasks were waiting for beat,
+    disabled ones are already in the broker or in the timer wheel and are marked queued.
+    """
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    ClockedSchedule = apps.get_model("django_celery_beat", "ClockedSchedule")
+    Timer = apps.get_model("scheduler", "Timer")
+
+    tasks = PeriodicTask.objects.filter(task=SEND_REQUEST_TASK, one_off=True, total_run_count=0).select_related(
+        "clocked"
+    )
+    timers = []
+    for task in tasks.iterator():
+        timers.append(
+            Timer(
+                id=task.id,
+                url=json.loads(task.args)[0],
+                run_at=task.clocked.clocked_time,
+                status="pending" if task.enabled else "queued",
+                max_attempts=json.loads(task.kwargs or "{}").get("max_attempts"),
+            )
+        )
+    if not timers:
+        return
+    Timer.objects.bulk_create(timers, batch_size=1000)
+
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Timer]):
+            cursor.execute(sql)
+
+    task_ids = [timer.id for timer in timers]
+    clocked_ids = list(tasks.filter(id__in=task_ids).values_list("clocked_id", flat=True))
+    PeriodicTask.objects.filter(id__in=task_ids).delete()
+    ClockedSchedule.objects.filter(id__in=clocked_ids).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_celery_beat", "0018_improve_crontab_helptext"),
+        ("scheduler", "0002_timer"),
+    ]
+
+    operations = [
+        migrations.RunPython(move_periodic_task_timers, migrations.RunPython.noop),
+    ]
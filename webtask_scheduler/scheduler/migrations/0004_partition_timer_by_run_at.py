@@ -0,0 +1,124 @@
+import datetime as dt
+import re
+
+import pytz
+from django.conf import settings
+from django.db import migrations
+
+SEND_REQUEST_TASK = "webtask_scheduler.scheduler.tasks.send_request_to_url"
+
+
+def partition_timer_table(apps, schema_editor):
+    """
+    Rebuild scheduler_timer as a table range partitioned by run_at, one partition per UTC day.
+
+    PostgreSQL requires the partition key in the primary key, so the primary key becomes
+    (id, run_at) while ids keep coming from a single sequence. Other databases keep the plain table.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    table = "scheduler_timer"
+    old_table = f"{table}_unpartitioned"
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [old_table, f"{table}_pkey"],
+        )
+        index_definitions = [
+            re.sub(rf" ON (\S+\.)?{old_table} ", f" ON {table} ", definition) for (definition,) in cursor.fetchall()
+        ]
+        cursor.execute(
+            f"CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            "PARTITION BY RANGE (run_at)"
+        )
+        cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+        cursor.execute(f"SELECT DISTINCT (run_at AT TIME ZONE 'UTC')::date FROM {old_table}")
+        days = {day for (day,) in cursor.fetchall()}
+        today = dt.datetime.now(tz=pytz.utc).date()
+        days.update(today + dt.timedelta(days=offset) for offset in range(settings.TIMER_PARTITION_PREMAKE_DAYS + 1))
+        for day in sorted(days):
+            start = dt.datetime.combine(day, dt.time.min, tzinfo=pytz.utc)
+            cursor.execute(
+                f"CREATE TABLE {table}_p{day:%Y%m%d} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+                [start, start + dt.timedelta(days=1)],
+            )
+
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {old_table}")
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {old_table}")
+        (max_id,) = cursor.fetchone()
+        cursor.execute(f"DROP TABLE {old_table}")
+
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, run_at)")
+        cursor.execute(f"CREATE SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        cursor.execute(f"SELECT setval('{table}_id_seq', %s, %s)", [max(max_id, 1), max_id > 0])
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+        for definition in index_definitions:
+            cursor.execute(definition)
+
+
+def unpartition_timer_table(apps, schema_editor):
+    """
+    Rebuild scheduler_timer as a plain table holding the rows of every partition, reversing partition_timer_table.
+
+    The primary key goes back to id alone and ids keep coming from the same sequence. Partitions
+    detached by TIMER_RETENTION_ARCHIVE are not part of the table anymore and are left alone.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    table = "scheduler_timer"
+    old_table = f"{table}_partitioned"
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [table])
+        if not cursor.fetchone()[0]:
+            return
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [old_table, f"{table}_pkey"],
+        )
+        # Indexes of a partitioned table are defined ON ONLY the parent table.
+        index_definitions = [
+            re.sub(rf" ON (ONLY )?(\S+\.)?{old_table} ", f" ON {table} ", definition)
+            for (definition,) in cursor.fetchall()
+        ]
+        cursor.execute(f"CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {old_table}")
+        # The sequence would be dropped along with the table owning it.
+        cursor.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        # Dropping the partitioned table drops its partitions as well.
+        cursor.execute(f"DROP TABLE {old_table}")
+
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+        for definition in index_definitions:
+            cursor.execute(definition)
+
+
+def delete_fired_periodic_task_timers(apps, schema_editor):
+    """
+    Timers used to be one-off PeriodicTasks that were only disabled once fired, drop what is left of them.
+    """
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    ClockedSchedule = apps.get_model("django_celery_beat", "ClockedSchedule")
+
+    tasks = PeriodicTask.objects.filter(task=SEND_REQUEST_TASK, one_off=True)
+    clocked_ids = list(tasks.exclude(clocked=None).values_list("clocked_id", flat=True))
+    tasks.delete()
+    ClockedSchedule.objects.filter(id__in=clocked_ids).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("scheduler", "0003_move_periodic_task_timers"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_timer_table, unpartition_timer_table),
+        # The deleted PeriodicTasks had fired already, there is nothing to restore.
+        migrations.RunPython(delete_fired_periodic_task_timers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0004_partition_timer_by_run_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timer',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('queued', 'Queued'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('canceled', 'Canceled')], default='pending', max_length=16),
+        ),
+    ]
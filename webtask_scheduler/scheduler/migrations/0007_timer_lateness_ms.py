@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("scheduler", "0006_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timer",
+            name="lateness_ms",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
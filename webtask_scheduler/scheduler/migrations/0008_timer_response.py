@@ -0,0 +1,22 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("scheduler", "0007_timer_lateness_ms"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timer",
+            name="response_digest",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name="timer",
+            name="response_ms",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
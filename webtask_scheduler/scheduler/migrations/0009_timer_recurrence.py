@@ -0,0 +1,22 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("scheduler", "0008_timer_response"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timer",
+            name="cron",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="timer",
+            name="interval_seconds",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
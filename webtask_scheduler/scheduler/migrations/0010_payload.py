@@ -0,0 +1,41 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("scheduler", "0009_timer_recurrence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Payload",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("method", models.CharField(default="POST", max_length=8)),
+                ("headers", models.JSONField(blank=True, default=dict)),
+                ("body", models.BinaryField(blank=True, null=True)),
+                ("size", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="deadletter",
+            name="payload_id",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="timer",
+            name="payload_id",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="timer",
+            index=models.Index(
+                condition=models.Q(("payload_id__isnull", False)),
+                fields=["payload_id"],
+                name="scheduler_timer_payload_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("scheduler", "0010_payload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timer",
+            name="lateness_policy",
+            field=models.CharField(
+                choices=[("fire", "Fire"), ("skip", "Skip"), ("expire", "Expire")], default="fire", max_length=8
+            ),
+        ),
+        migrations.AddField(
+            model_name="timer",
+            name="max_lateness_seconds",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="timer",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("queued", "Queued"),
+                    ("succeeded", "Succeeded"),
+                    ("failed", "Failed"),
+                    ("canceled", "Canceled"),
+                    ("expired", "Expired"),
+                ],
+                default="pending",
+                max_length=16,
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:30
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("scheduler", "0011_timer_lateness_policy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserQuota",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("max_timers", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "weight",
+                    models.PositiveSmallIntegerField(
+                        default=1, validators=[django.core.validators.MinValueValidator(1)]
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="timer",
+            name="user_id",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="timer",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["user_id", "run_at"],
+                name="scheduler_timer_user_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="userquota",
+            name="user",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE, related_name="timer_quota", to=settings.AUTH_USER_MODEL
+            ),
+        ),
+    ]
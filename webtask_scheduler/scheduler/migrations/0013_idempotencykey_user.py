@@ -0,0 +1,26 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("scheduler", "0012_userquota"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="user_id",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="idempotencykey",
+            name="key",
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name="idempotencykey",
+            constraint=models.UniqueConstraint(fields=("user_id", "key"), name="scheduler_idem_user_key_uniq"),
+        ),
+    ]
@@ -0,0 +1,181 @@
+from django.conf import settings
+from django.core.validators import MinValueValidator
+from django.db import models
+from django.db.models import Q
+
+
+class Timer(models.Model):
+    """
+    A webhook scheduled to be sent to ``url`` at ``run_at``.
+
+    Pending timers are found through a partial index on ``run_at``, so the due-time scan
+    of the dispatcher never reads fired timers. The outcome of the delivery is recorded
+    on the same row once the webhook was sent or given up, instead of in the Celery result
+    backend. Pending timers can be moved or canceled, canceled timers are kept until their
+    partition expires.
+
+    Recurring timers, every ``interval_seconds`` or on a ``cron`` schedule, keep a single row:
+    ``run_at`` holds their next occurrence, which the dispatcher advances in place each time it
+    fires them, and the outcome fields hold the outcome of the last one. They stay pending
+    until they are canceled.
+
+    Timers found later than ``max_lateness_seconds`` after an outage follow their ``lateness_policy``
+    instead of firing, see CatchUpSweeper.
+
+    Timers belong to the user who set them, the tenant they are counted and dispatched for, see TimerQuotas.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        QUEUED = "queued", "Queued"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+        CANCELED = "canceled", "Canceled"
+        EXPIRED = "expired", "Expired"
+
+    class LatenessPolicy(models.TextChoices):
+        # Fire the timer however late it is.
+        FIRE = "fire", "Fire"
+        # Drop the late occurrence, recurring timers wait for their next one and one-off timers expire.
+        SKIP = "skip", "Skip"
+        # End the timer with the expired status without firing it.
+        EXPIRE = "expire", "Expire"
+
+    url = models.URLField(max_length=2048)
+    run_at = models.DateTimeField(db_index=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    max_attempts = models.PositiveSmallIntegerField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    # Milliseconds between ``run_at`` and the first delivery attempt, negative when the clocks of the hosts drift.
+    lateness_ms = models.IntegerField(null=True, blank=True)
+    # Duration of the last delivery attempt and digest of its response body, see TIMER_DELIVERY_RESULTS.
+    response_ms = models.PositiveIntegerField(null=True, blank=True)
+    response_digest = models.CharField(max_length=16, blank=True)
+    interval_seconds = models.PositiveIntegerField(null=True, blank=True)
+    # Five field cron expression evaluated in UTC, see recurrence.parse_cron.
+    cron = models.CharField(max_length=255, blank=True)
+    # Method, headers and body of the request when it is not an empty POST, see Payload.
+    payload_id = models.BigIntegerField(null=True, blank=True)
+    max_lateness_seconds = models.PositiveIntegerField(null=True, blank=True)
+    lateness_policy = models.CharField(max_length=8, choices=LatenessPolicy.choices, default=LatenessPolicy.FIRE)
+    # The user is referenced by ID only, timers of anonymous requests have none.
+    user_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["run_at"], condition=Q(status="pending"), name="scheduler_timer_pending_idx"),
+            # Due timers of a single tenant, popped in turn by the dispatcher.
+            models.Index(fields=["user_id", "run_at"], condition=Q(status="pending"), name="scheduler_timer_user_idx"),
+            models.Index(
+                fields=["payload_id"], condition=Q(payload_id__isnull=False), name="scheduler_timer_payload_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Request to {self.url} at {self.run_at}"
+
+    @property
+    def recurring(self) -> bool:
+        return bool(self.interval_seconds or self.cron)
+
+
+# Timers fired again after every occurrence, which never leave the pending status on their own.
+RECURRING_TIMERS = Q(interval_seconds__isnull=False) | ~Q(cron="")
+
+
+def accessible_by(user_id: int | None) -> Q:
+    """
+    Return the timers the user ``user_id`` may read and change: its own and the ones set anonymously.
+    """
+    if user_id is None:
+        return Q(user_id__isnull=True)
+    return Q(user_id__isnull=True) | Q(user_id=user_id)
+
+
+class UserQuota(models.Model):
+    """
+    The share of the scheduler given to a user, overriding the defaults of every other user.
+
+    ``max_timers`` caps the timers the user may set per TIMER_USER_QUOTA_PERIOD instead of TIMER_USER_QUOTA.
+    Due timers are dispatched in proportion to the ``weight`` of their user when several users have timers due.
+    """
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="timer_quota")
+    max_timers = models.PositiveIntegerField(null=True, blank=True)
+    weight = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])
+
+    def __str__(self) -> str:
+        return f"Quota of {self.user}"
+
+
+class Payload(models.Model):
+    """
+    The method, headers and body of a webhook request, stored apart from its timer.
+
+    Timers and delivery tasks only carry the ID of their payload, so scheduler rows and broker
+    messages stay small whatever the size of the body. The body is stored gzip compressed and
+    decompressed while it is streamed to the request. Payloads no timer or dead letter needs
+    anymore are deleted once older than TIMER_RETENTION_DAYS.
+    """
+
+    method = models.CharField(max_length=8, default="POST")
+    headers = models.JSONField(default=dict, blank=True)
+    # Gzip compressed body, or nothing for a request without body.
+    body = models.BinaryField(null=True, blank=True)
+    # Size of the uncompressed body in bytes, sent as its Content-Length.
+    size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.method} request with a {self.size} bytes body"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The timer set by a request carrying an ``Idempotency-Key`` header, so retries of that request are answered with it.
+
+    The key is unique per user here rather than on the Timer table, whose partitioned primary key would
+    have to be part of any unique constraint. Keys are deleted once older than TIMER_IDEMPOTENCY_KEY_TTL.
+    """
+
+    key = models.CharField(max_length=255)
+    # Tenant of the request, keys of different users never collide. Anonymous requests share tenant 0.
+    user_id = models.BigIntegerField(default=0)
+    task_id = models.BigIntegerField()
+    run_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_id", "key"], name="scheduler_idem_user_key_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.key} set timer {self.task_id}"
+
+
+class DeadLetter(models.Model):
+    """
+    A webhook delivery that failed for good, kept so it can be inspected and replayed.
+
+    The timer is referenced by ID only, so dead letters outlive the timers they came from.
+    """
+
+    task_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    url = models.URLField(max_length=2048)
+    attempts = models.PositiveIntegerField()
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    error = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    replayed_at = models.DateTimeField(null=True, blank=True)
+    payload_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.url} failed after {self.attempts} attempts"
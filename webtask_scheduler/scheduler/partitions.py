@@ -0,0 +1,153 @@
+import datetime as dt
+import logging
+import re
+
+import pytz
+from django.conf import settings
+from django.db import connection
+from django.db import transaction
+from django.utils import timezone
+
+from webtask_scheduler.scheduler.models import Timer
+
+logger = logging.getLogger(__name__)
+
+
+class TimerPartitionManager:
+    """
+    Maintains the daily range partitions of the Timer table on PostgreSQL.
+
+    The table is partitioned by ``run_at``, one partition per UTC day, plus a default
+    partition catching timers set further ahead than the partitions created so far.
+    Partitions are created TIMER_PARTITION_PREMAKE_DAYS in advance and expire once their
+    day is older than TIMER_RETENTION_DAYS: they are dropped, or only detached from the
+    table when TIMER_RETENTION_ARCHIVE is set, so the history can be kept elsewhere.
+
+    On other databases the table is a plain table and expired timers are deleted instead.
+    Either way expired timers go without signals, they left the cache and the timer wheel long ago.
+    """
+
+    table: str = Timer._meta.db_table
+    default_partition: str = f"{table}_default"
+    partition_pattern = re.compile(rf"^{table}_p(\d{{8}})$")
+
+    def __init__(self) -> None:
+        self.premake_days: int = settings.TIMER_PARTITION_PREMAKE_DAYS
+        self.retention_days: int = settings.TIMER_RETENTION_DAYS
+        self.archive: bool = settings.TIMER_RETENTION_ARCHIVE
+
+    @classmethod
+    def partition_name(cls, day: dt.date) -> str:
+        return f"{cls.table}_p{day:%Y%m%d}"
+
+    @staticmethod
+    def bounds(day: dt.date) -> tuple[dt.datetime, dt.datetime]:
+        start = dt.datetime.combine(day, dt.time.min, tzinfo=pytz.utc)
+        return start, start + dt.timedelta(days=1)
+
+    def is_partitioned(self) -> bool:
+        if connection.vendor != "postgresql":
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [self.table]
+            )
+            return cursor.fetchone()[0]
+
+    def partitions(self) -> dict[dt.date, str]:
+        """
+        Return the daily partitions attached to the table by day.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(%s)",
+                [self.table],
+            )
+            names: list[str] = [name for (name,) in cursor.fetchall()]
+        partitions: dict[dt.date, str] = {}
+        for name in names:
+            match = self.partition_pattern.match(name)
+            if match:
+                partitions[dt.datetime.strptime(match.group(1), "%Y%m%d").date()] = name
+        return partitions
+
+    def create_partition(self, day: dt.date) -> None:
+        """
+        Create the partition of ``day``, moving the timers of that day out of the default partition.
+        """
+        start, end = self.bounds(day)
+        qn = connection.ops.quote_name
+        table, partition, default = qn(self.table), qn(self.partition_name(day)), qn(self.default_partition)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT EXISTS (SELECT 1 FROM {default} WHERE run_at >= %s AND run_at < %s)",  # noqa: S608
+                [start, end],
+            )
+            if not cursor.fetchone()[0]:
+                cursor.execute(
+                    f"CREATE TABLE {partition} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", [start, end]
+                )
+                return
+            # A partition cannot be created while the default partition holds rows of its range.
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+            cursor.execute(f"CREATE TABLE {partition} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", [start, end])
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {default} WHERE run_at >= %s AND run_at < %s RETURNING *) "  # noqa: S608
+                f"INSERT INTO {table} SELECT * FROM moved",
+                [start, end],
+            )
+            cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+
+    def expire_partition(self, name: str) -> None:
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            if self.archive:
+                cursor.execute(f"ALTER TABLE {qn(self.table)} DETACH PARTITION {qn(name)}")
+            else:
+                cursor.execute(f"DROP TABLE {qn(name)}")
+
+    def delete_expired(self, before: dt.datetime, batch_size: int = 10000) -> int:
+        """
+        Delete the timers due before ``before`` in batches, keeping each transaction short.
+        """
+        table: str = connection.ops.quote_name(self.table)
+        deleted = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE run_at < %s LIMIT %s)",  # noqa: S608
+                    [connection.ops.adapt_datetimefield_value(before), batch_size],
+                )
+                deleted += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    return deleted
+
+    def maintain(self, today: dt.date | None = None) -> dict[str, list[str] | int]:
+        """
+        Create the upcoming partitions and expire the old ones.
+
+        Returns the names of the partitions created and expired, or the number of
+        timers deleted when the table is not partitioned.
+        """
+        today = today or timezone.now().astimezone(pytz.utc).date()
+        cutoff: dt.date = today - dt.timedelta(days=self.retention_days)
+        if not self.is_partitioned():
+            deleted: int = self.delete_expired(self.bounds(cutoff)[0])
+            logger.info(f"Deleted {deleted} timers due before {cutoff}")
+            return {"deleted": deleted}
+
+        partitions: dict[dt.date, str] = self.partitions()
+        created: list[str] = []
+        for offset in range(self.premake_days + 1):
+            day: dt.date = today + dt.timedelta(days=offset)
+            if day not in partitions:
+                self.create_partition(day)
+                created.append(self.partition_name(day))
+        expired: list[str] = []
+        for day, name in sorted(partitions.items()):
+            if day < cutoff:
+                self.expire_partition(name)
+                expired.append(name)
+        logger.info(f"Created timer partitions {created}, {'archived' if self.archive else 'dropped'} {expired}")
+        return {"created": created, "expired": expired}
@@ -0,0 +1,111 @@
+import datetime as dt
+import gzip
+import json
+import logging
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.utils import timezone
+
+from webtask_scheduler.scheduler.delivery import WebhookRequest
+from webtask_scheduler.scheduler.models import DeadLetter
+from webtask_scheduler.scheduler.models import Payload
+from webtask_scheduler.scheduler.models import Timer
+
+logger = logging.getLogger(__name__)
+
+# Method of the requests sent without a payload.
+DEFAULT_METHOD = "POST"
+
+
+def encode_body(body) -> bytes:
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
+def has_payload(method: str = DEFAULT_METHOD, headers: dict[str, str] | None = None, body=None) -> bool:
+    """
+    Whether a request needs a payload, every other request is an empty POST.
+    """
+    return method != DEFAULT_METHOD or bool(headers) or body is not None
+
+
+class Payloads:
+    """
+    Payloads of webhook requests, stored apart from their timers and referenced by ID.
+
+    Only requests other than an empty POST get a payload, so most timers never touch the Payload table.
+    """
+
+    def build(self, method: str = DEFAULT_METHOD, headers: dict[str, str] | None = None, body=None) -> Payload | None:
+        """
+        Return the unsaved payload of a request with the given JSON ``body``, or None when it does not need one.
+        """
+        if not has_payload(method, headers, body):
+            return None
+        if body is None:
+            return Payload(method=method, headers=headers or {})
+        encoded: bytes = encode_body(body)
+        return Payload(method=method, headers=headers or {}, body=gzip.compress(encoded), size=len(encoded))
+
+    def store(self, method: str = DEFAULT_METHOD, headers: dict[str, str] | None = None, body=None) -> int | None:
+        """
+        Store the payload of a request and return its ID, or None when it does not need one.
+        """
+        payload: Payload | None = self.build(method, headers, body)
+        if payload is None:
+            return None
+        payload.save()
+        return payload.id
+
+    def store_many(self, requests: list[dict]) -> list[int | None]:
+        """
+        Store the payloads of requests given as ``method``, ``headers`` and ``body`` keys with one insert.
+
+        Returns the payload ID of every request in order, None for the requests that do not need one.
+        """
+        payloads: list[Payload | None] = [self.build(**request) for request in requests]
+        Payload.objects.bulk_create([payload for payload in payloads if payload is not None])
+        return [payload.id if payload is not None else None for payload in payloads]
+
+    def get_many(self, payload_ids: Iterable[int]) -> dict[int, WebhookRequest]:
+        """
+        Return the requests of the given payloads, by payload ID.
+        """
+        payload_ids = set(payload_ids)
+        requests: dict[int, WebhookRequest] = {
+            payload_id: WebhookRequest(method, headers, bytes(body) if body is not None else None, size)
+            for payload_id, method, headers, body, size in Payload.objects.filter(id__in=payload_ids).values_list(
+                "id", "method", "headers", "body", "size"
+            )
+        }
+        if missing := payload_ids - requests.keys():
+            logger.error(f"Payloads {sorted(missing)} do not exist, sending empty POST requests instead")
+        return requests
+
+    def get(self, payload_id: int) -> WebhookRequest | None:
+        return self.get_many([payload_id]).get(payload_id)
+
+    @staticmethod
+    def expired_before() -> dt.datetime:
+        return timezone.now() - dt.timedelta(days=settings.TIMER_RETENTION_DAYS)
+
+    def delete_expired(self) -> int:
+        """
+        Delete the payloads older than TIMER_RETENTION_DAYS that no timer waiting to fire and no dead letter uses.
+        """
+        deleted, _ = (
+            Payload.objects.filter(created_at__lt=self.expired_before())
+            .exclude(
+                Exists(
+                    Timer.objects.filter(
+                        payload_id=OuterRef("id"), status__in=[Timer.Status.PENDING, Timer.Status.QUEUED]
+                    )
+                )
+            )
+            .exclude(Exists(DeadLetter.objects.filter(payload_id=OuterRef("id"))))
+            .delete()
+        )
+        logger.info(f"Deleted {deleted} expired payloads")
+        return deleted
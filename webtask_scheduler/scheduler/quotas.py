@@ -0,0 +1,139 @@
+import contextlib
+import logging
+import math
+import time
+from collections.abc import Iterable
+from collections.abc import Iterator
+
+from django.conf import settings
+from django.core.cache import cache
+
+from webtask_scheduler.scheduler.models import UserQuota
+
+logger = logging.getLogger(__name__)
+
+# Tenant of the timers set by anonymous requests, which share it. User IDs start at 1.
+ANONYMOUS_TENANT = 0
+
+
+def tenant_of(user_id: int | None) -> int:
+    return user_id or ANONYMOUS_TENANT
+
+
+def user_id_of(user) -> int | None:
+    """
+    Return the ID of the user of a request, None for an anonymous request.
+    """
+    return user.id if user.is_authenticated else None
+
+
+class QuotaExceededError(Exception):
+    """
+    Raised when setting timers would take a user over their quota, which resets in ``retry_after`` seconds.
+    """
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after: int = retry_after
+
+
+class TimerQuotas:
+    """
+    Per user quotas of the timers set, and the weights users get in the fair dispatch of due timers.
+
+    Every user may set TIMER_USER_QUOTA timers per TIMER_USER_QUOTA_PERIOD. Anonymous requests are
+    not limited, a quota shared by every anonymous caller would let one of them lock out all the others.
+    Timers set are counted in a cache entry per user and period, so the quota costs no database query.
+    The UserQuota of a user overrides the limit and sets its weight, both are cached for
+    TIMER_USER_QUOTA_CACHE_SECONDS.
+    """
+
+    key_prefix = "scheduler:quota"
+
+    def _limits_key(self, tenant: int) -> str:
+        return f"{self.key_prefix}:{tenant}:limits"
+
+    def _usage_key(self, tenant: int, window: int) -> str:
+        return f"{self.key_prefix}:{tenant}:{window}:used"
+
+    def limits(self, tenants: Iterable[int]) -> dict[int, tuple[int | None, int]]:
+        """
+        Return the ``(max_timers, weight)`` override of every tenant, max_timers being None without one.
+        """
+        keys: dict[str, int] = {self._limits_key(tenant): tenant for tenant in tenants}
+        limits: dict[int, tuple[int | None, int]] = {
+            keys[key]: tuple(value) for key, value in cache.get_many(list(keys)).items()
+        }
+        missing: set[int] = set(keys.values()) - limits.keys()
+        if missing:
+            stored: dict[int, tuple[int | None, int]] = {
+                user_id: (max_timers, weight)
+                for user_id, max_timers, weight in UserQuota.objects.filter(user_id__in=missing).values_list(
+                    "user_id", "max_timers", "weight"
+                )
+            }
+            fetched: dict[int, tuple[int | None, int]] = {tenant: stored.get(tenant, (None, 1)) for tenant in missing}
+            cache.set_many(
+                {self._limits_key(tenant): limits for tenant, limits in fetched.items()},
+                timeout=settings.TIMER_USER_QUOTA_CACHE_SECONDS,
+            )
+            limits.update(fetched)
+        return limits
+
+    def weights(self, tenants: Iterable[int]) -> dict[int, int]:
+        return {tenant: weight for tenant, (_, weight) in self.limits(tenants).items()}
+
+    def max_timers(self, tenant: int) -> int:
+        max_timers, _ = self.limits([tenant])[tenant]
+        return max_timers if max_timers is not None else settings.TIMER_USER_QUOTA
+
+    def consume(self, user_id: int | None, count: int = 1) -> None:
+        """
+        Count ``count`` timers set by a user, raising QuotaExceededError when they would take it over its quota.
+
+        Timers over the quota are not counted, so a rejected request does not use up the quota of the next ones.
+        """
+        tenant: int = tenant_of(user_id)
+        if tenant == ANONYMOUS_TENANT:
+            return
+        max_timers: int = self.max_timers(tenant)
+        if not max_timers:
+            return
+        period: int = settings.TIMER_USER_QUOTA_PERIOD
+        now: float = time.time()
+        window: int = int(now // period)
+        key: str = self._usage_key(tenant, window)
+        # The counter outlives its window a little, so it cannot expire between the add and the incr.
+        cache.add(key, 0, timeout=period + 60)
+        used: int = cache.incr(key, count)
+        if used > max_timers:
+            cache.decr(key, count)
+            logger.warning(f"Tenant {tenant} is over its quota of {max_timers} timers, rejecting {count} timers")
+            raise QuotaExceededError(
+                f"Quota of {max_timers} timers per {period} seconds exceeded.",
+                retry_after=math.ceil((window + 1) * period - now),
+            )
+
+    def release(self, user_id: int | None, count: int = 1) -> None:
+        """
+        Give back ``count`` timers counted by ``consume`` that were not set after all.
+        """
+        tenant: int = tenant_of(user_id)
+        if tenant == ANONYMOUS_TENANT or not self.max_timers(tenant):
+            return
+        window: int = int(time.time() // settings.TIMER_USER_QUOTA_PERIOD)
+        # The window may have ended meanwhile, its counter is then gone along with the timers to give back.
+        with contextlib.suppress(ValueError):
+            cache.decr(self._usage_key(tenant, window), count)
+
+    @contextlib.contextmanager
+    def reserve(self, user_id: int | None, count: int = 1) -> Iterator[None]:
+        """
+        Count ``count`` timers set by a user like ``consume``, giving them back when the block raises.
+        """
+        self.consume(user_id, count)
+        try:
+            yield
+        except BaseException:
+            self.release(user_id, count)
+            raise
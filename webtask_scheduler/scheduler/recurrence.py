@@ -0,0 +1,49 @@
+import datetime as dt
+from collections.abc import Callable
+
+import pytz
+from celery.schedules import ParseException
+from celery.schedules import crontab
+
+
+def parse_cron(expression: str, nowfun: Callable[[], dt.datetime] | None = None) -> crontab:
+    """
+    Parse a five field cron expression: minute, hour, day of month, month and day of week, evaluated in UTC.
+
+    Schedules are computed with Celery's crontab, so a day must match both the day of month and
+    the day of week fields when both are restricted. Raises ValueError when the expression is malformed.
+    """
+    fields: list[str] = expression.split()
+    if len(fields) != 5:
+        raise ValueError("A cron expression has five fields: minute, hour, day of month, month and day of week.")
+    minute, hour, day_of_month, month_of_year, day_of_week = fields
+    try:
+        return crontab(
+            minute=minute,
+            hour=hour,
+            day_of_month=day_of_month,
+            month_of_year=month_of_year,
+            day_of_week=day_of_week,
+            nowfun=nowfun,
+        )
+    except (ValueError, ParseException) as e:
+        raise ValueError(f"Invalid cron expression {expression!r}: {e}") from e
+
+
+def next_run_at(
+    run_at: dt.datetime, time_now: dt.datetime, interval_seconds: int | None = None, cron: str = ""
+) -> dt.datetime:
+    """
+    Return the first occurrence of a recurring timer after both its last ``run_at`` and ``time_now``.
+
+    Interval timers stay aligned on their first run time. Occurrences missed while the timer
+    could not fire are skipped rather than fired in a burst.
+    """
+    if interval_seconds:
+        interval = dt.timedelta(seconds=interval_seconds)
+        missed: int = max((time_now - run_at) // interval, 0)
+        return run_at + (missed + 1) * interval
+    after: dt.datetime = max(run_at, time_now).astimezone(pytz.utc)
+    # The crontab counts from its current time, which must be the time the occurrence is looked up after.
+    last_run_at, delta, _ = parse_cron(cron, nowfun=lambda: after).remaining_delta(after, tz=pytz.utc)
+    return last_run_at + delta
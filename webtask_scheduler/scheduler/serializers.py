@@ -1,19 +1,284 @@
+import re
+
+from django.conf import settings
 from rest_framework import serializers
 
+from webtask_scheduler.scheduler.models import DeadLetter
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.payloads import DEFAULT_METHOD
+from webtask_scheduler.scheduler.payloads import encode_body
+from webtask_scheduler.scheduler.recurrence import parse_cron
+
+# Headers of webhook requests set by the scheduler itself, which timers cannot override.
+RESERVED_HEADERS: frozenset[str] = frozenset({"content-length", "transfer-encoding", "host", "connection"})
+# Header names are RFC 7230 tokens, and header values may hold no control character but tab.
+HEADER_NAME_PATTERN = re.compile(r"[!#$%&'*+\-.^_`|~0-9A-Za-z]+")
+HEADER_VALUE_FORBIDDEN_PATTERN = re.compile(r"[\x00-\x08\x0a-\x1f\x7f]")
+
+
+class RunAtInputSerializer(serializers.Serializer):
+    """
+    When to send the request: after a delay, the sum of the given units, or at an absolute ``run_at`` time.
+    """
+
+    hours = serializers.IntegerField(
+        help_text="Number of hours to wait before sending the request.", min_value=0, required=False
+    )
+    minutes = serializers.IntegerField(
+        help_text="Number of minutes to wait before sending the request.", min_value=0, required=False
+    )
+    seconds = serializers.IntegerField(
+        help_text="Number of seconds to wait before sending the request.", min_value=0, required=False
+    )
+    milliseconds = serializers.IntegerField(
+        help_text="Number of milliseconds to wait before sending the request.", min_value=0, required=False
+    )
+    run_at = serializers.DateTimeField(
+        help_text="Time to send the request at, with millisecond precision, instead of a delay.", required=False
+    )
+
+    delay_fields: tuple[str, ...] = ("hours", "minutes", "seconds", "milliseconds")
+
+    class Meta:
+        fields = ["hours", "minutes", "seconds", "milliseconds", "run_at"]
 
-class SetTimerInputSerializer(serializers.Serializer):
-    hours = serializers.IntegerField(help_text="Number of hours to wait before sending the request.", min_value=0)
-    minutes = serializers.IntegerField(help_text="Number of minutes to wait before sending the request.", min_value=0)
-    seconds = serializers.IntegerField(help_text="Number of seconds to wait before sending the request.", min_value=0)
+    def run_at_required(self, attrs: dict) -> bool:
+        return True
+
+    def validate(self, attrs: dict) -> dict:
+        has_delay: bool = any(field in attrs for field in self.delay_fields)
+        if "run_at" in attrs and has_delay:
+            raise serializers.ValidationError("Either a delay or run_at is accepted, not both.")
+        if "run_at" not in attrs and not has_delay and self.run_at_required(attrs):
+            raise serializers.ValidationError("A delay or run_at is required.")
+        return attrs
+
+
+class SetTimerInputSerializer(RunAtInputSerializer):
     web_url = serializers.URLField(help_text="URL to send the request to.")
+    max_attempts = serializers.IntegerField(
+        help_text="Number of delivery attempts before the request is given up. Defaults to the server setting.",
+        min_value=1,
+        max_value=settings.TIMER_RETRY_MAX_ATTEMPTS_LIMIT,
+        required=False,
+    )
+    interval_seconds = serializers.IntegerField(
+        help_text="Send the request again every given number of seconds, until the timer is canceled.",
+        min_value=1,
+        required=False,
+    )
+    cron = serializers.CharField(
+        help_text="Send the request again at every occurrence of a five field cron expression in UTC, "
+        "until the timer is canceled.",
+        max_length=Timer._meta.get_field("cron").max_length,
+        required=False,
+    )
+    max_lateness_seconds = serializers.IntegerField(
+        help_text="Seconds the request may be sent late after an outage, beyond which the lateness policy applies.",
+        min_value=settings.TIMER_CATCHUP_AFTER_SECONDS,
+        required=False,
+    )
+    lateness_policy = serializers.ChoiceField(
+        help_text="What happens to the timer when it is later than max_lateness_seconds: fire it anyway, skip the "
+        "late occurrence, or expire the timer.",
+        choices=Timer.LatenessPolicy.choices,
+        required=False,
+    )
+    method = serializers.ChoiceField(
+        help_text="HTTP method of the request.",
+        choices=["GET", "POST", "PUT", "PATCH", "DELETE"],
+        default=DEFAULT_METHOD,
+    )
+    headers = serializers.DictField(
+        help_text="HTTP headers of the request.", child=serializers.CharField(max_length=8192), required=False
+    )
+    body = serializers.JSONField(
+        help_text="JSON body of the request, sent with an application/json content type unless the headers say "
+        "otherwise.",
+        required=False,
+    )
+
+    class Meta:
+        fields = [
+            *RunAtInputSerializer.Meta.fields,
+            "web_url",
+            "max_attempts",
+            "interval_seconds",
+            "cron",
+            "max_lateness_seconds",
+            "lateness_policy",
+            "method",
+            "headers",
+            "body",
+        ]
+
+    def validate_headers(self, value: dict[str, str]) -> dict[str, str]:
+        # Checked here rather than when the request is sent, where a bad header fails the delivery.
+        invalid: list[str] = sorted(repr(name) for name in value if not HEADER_NAME_PATTERN.fullmatch(name))
+        if invalid:
+            raise serializers.ValidationError(f"These header names are not valid: {', '.join(invalid)}.")
+        invalid = sorted(name for name, header in value.items() if HEADER_VALUE_FORBIDDEN_PATTERN.search(header))
+        if invalid:
+            raise serializers.ValidationError(
+                f"These headers have control characters in their value: {', '.join(invalid)}."
+            )
+        reserved: list[str] = sorted(name for name in value if name.lower() in RESERVED_HEADERS)
+        if reserved:
+            raise serializers.ValidationError(f"These headers are set by the scheduler: {', '.join(reserved)}.")
+        return value
+
+    def validate_body(self, value):
+        if len(encode_body(value)) > settings.TIMER_PAYLOAD_MAX_BYTES:
+            raise serializers.ValidationError(f"The body is larger than {settings.TIMER_PAYLOAD_MAX_BYTES} bytes.")
+        return value
 
+    def validate_cron(self, value: str) -> str:
+        try:
+            parse_cron(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def run_at_required(self, attrs: dict) -> bool:
+        # Recurring timers first fire at their first occurrence unless told otherwise.
+        return "interval_seconds" not in attrs and "cron" not in attrs
+
+    def validate(self, attrs: dict) -> dict:
+        if "interval_seconds" in attrs and "cron" in attrs:
+            raise serializers.ValidationError("Either interval_seconds or cron is accepted, not both.")
+        if attrs.get("lateness_policy", Timer.LatenessPolicy.FIRE) != Timer.LatenessPolicy.FIRE and (
+            "max_lateness_seconds" not in attrs
+        ):
+            raise serializers.ValidationError("A lateness_policy other than fire requires max_lateness_seconds.")
+        return super().validate(attrs)
+
+
+class RescheduleTimerInputSerializer(RunAtInputSerializer):
     class Meta:
-        fields = ["hours", "minutes", "seconds", "web_url"]
+        fields = RunAtInputSerializer.Meta.fields
 
 
 class SetTimerOutputSerializer(serializers.Serializer):
     task_id = serializers.IntegerField(read_only=True)
     time_left_in_seconds = serializers.IntegerField(read_only=True)
+    time_left_in_milliseconds = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        fields = ["task_id", "time_left_in_seconds", "time_left_in_milliseconds"]
+
+
+class SetTimerBulkInputSerializer(serializers.Serializer):
+    timers = SetTimerInputSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.TIMER_BULK_MAX_SIZE,
+        help_text="Timers to schedule in a single batch.",
+    )
+
+    class Meta:
+        fields = ["timers"]
+
+
+class SetTimerBulkOutputSerializer(serializers.Serializer):
+    timers = SetTimerOutputSerializer(many=True, read_only=True)
+
+    class Meta:
+        fields = ["timers"]
+
+
+class GetTimerBulkInputSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.TIMER_BULK_MAX_SIZE,
+        help_text="Task IDs of the timers to look up.",
+    )
+
+    class Meta:
+        fields = ["ids"]
+
+
+class GetTimerBulkOutputSerializer(serializers.Serializer):
+    timers = SetTimerOutputSerializer(many=True, read_only=True)
+    missing = serializers.ListField(
+        child=serializers.IntegerField(), read_only=True, help_text="Task IDs that match no timer."
+    )
+
+    class Meta:
+        fields = ["timers", "missing"]
+
+
+class CancelTimersInputSerializer(serializers.Serializer):
+    url_prefix = serializers.URLField(
+        required=False, help_text="Cancel the pending timers whose URL starts with this prefix."
+    )
+    created_before = serializers.DateTimeField(
+        required=False, help_text="Cancel the pending timers set before this time."
+    )
+
+    class Meta:
+        fields = ["url_prefix", "created_before"]
+
+    def validate(self, attrs: dict) -> dict:
+        if not attrs:
+            raise serializers.ValidationError("At least one filter is required.")
+        return attrs
+
+
+class CancelTimersOutputSerializer(serializers.Serializer):
+    canceled = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        fields = ["canceled"]
+
+
+class TimerResultSerializer(serializers.ModelSerializer):
+    task_id = serializers.IntegerField(source="id", read_only=True)
+
+    class Meta:
+        model = Timer
+        fields = [
+            "task_id",
+            "url",
+            "run_at",
+            "interval_seconds",
+            "cron",
+            "max_lateness_seconds",
+            "lateness_policy",
+            "status",
+            "attempts",
+            "status_code",
+            "error",
+            "response_ms",
+            "response_digest",
+            "lateness_ms",
+            "completed_at",
+        ]
+        read_only_fields = fields
+
+
+class DeadLetterSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeadLetter
+        fields = ["id", "task_id", "url", "attempts", "status_code", "error", "created_at", "replayed_at"]
+        read_only_fields = fields
+
+
+class DeadLetterReplayInputSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.TIMER_BULK_MAX_SIZE,
+        required=False,
+        help_text="Dead letters to replay. Every dead letter not replayed yet when omitted.",
+    )
+
+    class Meta:
+        fields = ["ids"]
+
+
+class DeadLetterReplayOutputSerializer(serializers.Serializer):
+    replayed = serializers.IntegerField(read_only=True)
 
     class Meta:
-        fields = ["task_id", "time_left_in_seconds"]
+        fields = ["replayed"]
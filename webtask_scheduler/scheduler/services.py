@@ -1,56 +1,644 @@
 import logging
+from collections.abc import AsyncIterator
+from collections.abc import Iterator
 
 import pytz
+import redis.asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.db import transaction
 from django.utils import timezone
-from django_celery_beat.models import ClockedSchedule
-from django_celery_beat.models import PeriodicTask
+from redis.client import PubSub
+
+from webtask_scheduler.scheduler.cache import TimerCache
+from webtask_scheduler.scheduler.dispatcher import publish_deliveries
+from webtask_scheduler.scheduler.events import TimerEvents
+from webtask_scheduler.scheduler.idempotency import IdempotencyKeys
+from webtask_scheduler.scheduler.models import RECURRING_TIMERS
+from webtask_scheduler.scheduler.models import DeadLetter
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.models import accessible_by
+from webtask_scheduler.scheduler.payloads import DEFAULT_METHOD
+from webtask_scheduler.scheduler.payloads import Payloads
+from webtask_scheduler.scheduler.payloads import has_payload
+from webtask_scheduler.scheduler.quotas import TimerQuotas
+from webtask_scheduler.scheduler.recurrence import next_run_at
+from webtask_scheduler.scheduler.timer_wheel import RedisTimerWheel
 
 logger = logging.getLogger(__name__)
 
+# Keys of a timer request that set its run time, see RunAtInputSerializer and SetTimerInputSerializer.
+RUN_AT_FIELDS: tuple[str, ...] = ("hours", "minutes", "seconds", "milliseconds", "run_at", "interval_seconds", "cron")
+# Keys of a timer request describing the request it sends, stored as its Payload.
+PAYLOAD_FIELDS: tuple[str, ...] = ("method", "headers", "body")
+
+
+def get_run_at(
+    time_now: timezone.datetime,
+    hours: int = 0,
+    minutes: int = 0,
+    seconds: int = 0,
+    milliseconds: int = 0,
+    run_at: timezone.datetime | None = None,
+    interval_seconds: int | None = None,
+    cron: str = "",
+) -> timezone.datetime:
+    """
+    Return the run time of a timer set at ``time_now``, either the given ``run_at`` or after the given delay.
+
+    Recurring timers given neither first fire at their first occurrence.
+    """
+    if run_at is not None:
+        return run_at.astimezone(pytz.utc)
+    if (interval_seconds or cron) and not (hours or minutes or seconds or milliseconds):
+        return next_run_at(time_now, time_now, interval_seconds, cron)
+    return time_now + timezone.timedelta(hours=hours, minutes=minutes, seconds=seconds, milliseconds=milliseconds)
+
+
+def time_left(run_at: timezone.datetime, time_now: timezone.datetime) -> dict:
+    seconds: float = max((run_at - time_now).total_seconds(), 0)
+    return {"time_left_in_seconds": round(seconds, 1), "time_left_in_milliseconds": round(seconds * 1000)}
+
+
+class TimerNotPendingError(Exception):
+    """
+    Raised when changing a timer that already fired, is firing or was canceled.
+    """
+
 
 class TimerService:
-    def set(self, hours: int, minutes: int, seconds: int, web_url: str) -> dict:
+    def __init__(self) -> None:
+        self.cache = TimerCache()
+        # With the Redis wheel the Timer row is only the durable record and the wheel decides when the timer
+        # fires, otherwise the dispatcher scans the pending rows of the Timer table.
+        self.wheel: RedisTimerWheel | None = RedisTimerWheel() if settings.TIMER_DISPATCH_BACKEND == "redis" else None
+        self.eta_threshold = timezone.timedelta(seconds=settings.TIMER_ETA_THRESHOLD_SECONDS)
+        self.idempotency_keys = IdempotencyKeys()
+        self.payloads = Payloads()
+        self.quotas = TimerQuotas()
+
+    def _is_short(self, run_at: timezone.datetime, time_now: timezone.datetime, recurring: bool = False) -> bool:
+        """
+        Short timers skip the scheduler entirely and are published to the broker with an ETA.
+
+        Recurring timers never do, the dispatcher advances them to their next occurrence when firing them.
+        """
+        return not recurring and run_at - time_now < self.eta_threshold
+
+    def _initial_status(
+        self, run_at: timezone.datetime, time_now: timezone.datetime, recurring: bool = False
+    ) -> Timer.Status:
+        # A short timer is already handed to the broker, so the dispatcher must never pick it up.
+        return Timer.Status.QUEUED if self._is_short(run_at, time_now, recurring) else Timer.Status.PENDING
+
+    def set(
+        self,
+        web_url: str,
+        hours: int = 0,
+        minutes: int = 0,
+        seconds: int = 0,
+        milliseconds: int = 0,
+        run_at: timezone.datetime | None = None,
+        max_attempts: int | None = None,
+        interval_seconds: int | None = None,
+        cron: str = "",
+        max_lateness_seconds: int | None = None,
+        lateness_policy: Timer.LatenessPolicy = Timer.LatenessPolicy.FIRE,
+        method: str = DEFAULT_METHOD,
+        headers: dict[str, str] | None = None,
+        body=None,
+        user_id: int | None = None,
+        idempotency_key: str | None = None,
+    ) -> dict:
         """
-        Set a timer to send a GET request to a given URL after a specified amount of time.
+        Set a timer to send a request to a given URL after a specified amount of time, or at ``run_at``.
+
+        With ``interval_seconds`` or a ``cron`` expression the request is sent again at every
+        occurrence, on the same timer, until it is canceled.
+
+        A timer found later than ``max_lateness_seconds`` after an outage follows its ``lateness_policy``,
+        see CatchUpSweeper.
+
+        The request is an empty POST unless a ``method``, ``headers`` or a JSON ``body`` are given,
+        which are stored as a Payload in the same transaction as the timer.
+
+        The timer belongs to the user ``user_id`` and counts against its quota once stored, see TimerQuotas.
+        Raises QuotaExceededError when the user is over it.
+
+        A request repeating the ``idempotency_key`` of an earlier request of the same user within
+        TIMER_IDEMPOTENCY_KEY_TTL sets nothing and gets the timer of the earlier request back, flagged
+        as ``replayed``. It does not count against the quota.
         """
-        logger.info(f"Setting timer for {hours} hours, {minutes} minutes, {seconds} seconds with web URL: {web_url}")
+        if idempotency_key:
+            existing: tuple[int, timezone.datetime] | None = self.idempotency_keys.get(idempotency_key, user_id)
+            if existing is not None:
+                return self._replayed(idempotency_key, *existing)
 
         time_now = timezone.now().replace(tzinfo=pytz.utc)
-        run_at = time_now + timezone.timedelta(hours=hours, minutes=minutes, seconds=seconds)
-        task: PeriodicTask = PeriodicTask.objects.create(
-            name=f"Get request to {web_url} at {run_at}",
-            task="webtask_scheduler.scheduler.tasks.send_request_to_url",
-            one_off=True,
-            clocked=ClockedSchedule.objects.create(clocked_time=run_at),
-            args=f'["{web_url}"]',
+        run_at = get_run_at(time_now, hours, minutes, seconds, milliseconds, run_at, interval_seconds, cron)
+        recurring: bool = bool(interval_seconds or cron)
+        logger.info(f"Setting timer at {run_at} with web URL: {web_url}")
+        try:
+            # The quota is given back when the timer cannot be stored.
+            with self.quotas.reserve(user_id), transaction.atomic():
+                payload_id: int | None = self.payloads.store(method, headers, body)
+                timer: Timer = Timer.objects.create(
+                    url=web_url,
+                    run_at=run_at,
+                    status=self._initial_status(run_at, time_now, recurring),
+                    max_attempts=max_attempts,
+                    interval_seconds=interval_seconds,
+                    cron=cron,
+                    max_lateness_seconds=max_lateness_seconds,
+                    lateness_policy=lateness_policy,
+                    payload_id=payload_id,
+                    user_id=user_id,
+                )
+                if idempotency_key:
+                    self.idempotency_keys.store(idempotency_key, timer.id, run_at, user_id)
+        except IntegrityError:
+            # A concurrent request carrying the same key set its timer first, this one sets nothing.
+            existing = self.idempotency_keys.get(idempotency_key, user_id) if idempotency_key else None
+            if existing is None:
+                raise
+            return self._replayed(idempotency_key, *existing)
+        # Only cache and index once the row is committed, so a rolled back request never leaves
+        # a phantom timer behind.
+        transaction.on_commit(
+            lambda: self._on_timers_committed(
+                [(timer.id, web_url, run_at, max_attempts, interval_seconds, cron, payload_id, user_id)], time_now
+            )
         )
+        if idempotency_key:
+            transaction.on_commit(lambda: self.idempotency_keys.remember(idempotency_key, timer.id, run_at, user_id))
 
-        time_left_in_seconds: float = round((task.clocked.clocked_time - time_now).total_seconds(), 1)
         data: dict = {
-            "task_id": task.id,
-            "time_left_in_seconds": time_left_in_seconds,
+            "task_id": timer.id,
+            **time_left(run_at, time_now),
         }
-        logger.info(f"Timer set for {run_at} with task ID {task.id}")
+        logger.info(f"Timer set for {run_at} with task ID {timer.id}")
         return data
 
-    def get(self, task_id: int) -> dict:
+    async def aset(
+        self,
+        web_url: str,
+        hours: int = 0,
+        minutes: int = 0,
+        seconds: int = 0,
+        milliseconds: int = 0,
+        run_at: timezone.datetime | None = None,
+        max_attempts: int | None = None,
+        interval_seconds: int | None = None,
+        cron: str = "",
+        max_lateness_seconds: int | None = None,
+        lateness_policy: Timer.LatenessPolicy = Timer.LatenessPolicy.FIRE,
+        method: str = DEFAULT_METHOD,
+        headers: dict[str, str] | None = None,
+        body=None,
+        user_id: int | None = None,
+        idempotency_key: str | None = None,
+    ) -> dict:
+        """
+        Same as ``set``, for the async views.
+
+        The Timer row is inserted on its own, without a transaction, so the cache and the timer
+        index are updated right after it. Requests carrying an ``idempotency_key`` or a payload need
+        the row stored atomically with their key or payload and go through ``set`` in a worker thread.
+        """
+        if idempotency_key or has_payload(method, headers, body):
+            return await sync_to_async(self.set)(
+                web_url,
+                hours=hours,
+                minutes=minutes,
+                seconds=seconds,
+                milliseconds=milliseconds,
+                run_at=run_at,
+                max_attempts=max_attempts,
+                interval_seconds=interval_seconds,
+                cron=cron,
+                max_lateness_seconds=max_lateness_seconds,
+                lateness_policy=lateness_policy,
+                method=method,
+                headers=headers,
+                body=body,
+                user_id=user_id,
+                idempotency_key=idempotency_key,
+            )
+
+        await sync_to_async(self.quotas.consume)(user_id)
+        time_now = timezone.now().replace(tzinfo=pytz.utc)
+        run_at = get_run_at(time_now, hours, minutes, seconds, milliseconds, run_at, interval_seconds, cron)
+        logger.info(f"Setting timer at {run_at} with web URL: {web_url}")
+        try:
+            timer: Timer = await Timer.objects.acreate(
+                url=web_url,
+                run_at=run_at,
+                status=self._initial_status(run_at, time_now, bool(interval_seconds or cron)),
+                max_attempts=max_attempts,
+                interval_seconds=interval_seconds,
+                cron=cron,
+                max_lateness_seconds=max_lateness_seconds,
+                lateness_policy=lateness_policy,
+                user_id=user_id,
+            )
+        except BaseException:
+            await sync_to_async(self.quotas.release)(user_id)
+            raise
+        await sync_to_async(self._on_timers_committed)(
+            [(timer.id, web_url, run_at, max_attempts, interval_seconds, cron, None, user_id)], time_now
+        )
+
+        data: dict = {
+            "task_id": timer.id,
+            **time_left(run_at, time_now),
+        }
+        logger.info(f"Timer set for {run_at} with task ID {timer.id}")
+        return data
+
+    def _replayed(self, idempotency_key: str, task_id: int, run_at: timezone.datetime) -> dict:
+        logger.info(f"Replaying timer with task ID {task_id} for idempotency key {idempotency_key!r}")
+        time_now = timezone.now().replace(tzinfo=pytz.utc)
+        data: dict = {
+            "task_id": task_id,
+            **time_left(run_at, time_now),
+            "replayed": True,
+        }
+        return data
+
+    def set_many(self, timers: list[dict], user_id: int | None = None) -> list[dict]:
+        """
+        Set a batch of timers using a single bulk insert.
+
+        Each item of ``timers`` holds the same keys accepted by ``set``. The returned list
+        keeps the order of the input items. The whole batch counts against the quota of the
+        user ``user_id``, none of it is set when it does not fit.
+        """
+        logger.info(f"Setting {len(timers)} timers in bulk")
+        time_now = timezone.now().replace(tzinfo=pytz.utc)
+        run_at_list = [
+            get_run_at(time_now, **{field: timer[field] for field in RUN_AT_FIELDS if field in timer})
+            for timer in timers
+        ]
+        # The quota is given back when the timers cannot be stored.
+        with self.quotas.reserve(user_id, len(timers)), transaction.atomic():
+            payload_ids: list[int | None] = self.payloads.store_many(
+                [{field: timer[field] for field in PAYLOAD_FIELDS if field in timer} for timer in timers]
+            )
+            created: list[Timer] = Timer.objects.bulk_create(
+                [
+                    Timer(
+                        url=timer["web_url"],
+                        run_at=run_at,
+                        status=self._initial_status(
+                            run_at, time_now, bool(timer.get("interval_seconds") or timer.get("cron"))
+                        ),
+                        max_attempts=timer.get("max_attempts"),
+                        interval_seconds=timer.get("interval_seconds"),
+                        cron=timer.get("cron", ""),
+                        max_lateness_seconds=timer.get("max_lateness_seconds"),
+                        lateness_policy=timer.get("lateness_policy", Timer.LatenessPolicy.FIRE),
+                        payload_id=payload_id,
+                        user_id=user_id,
+                    )
+                    for timer, run_at, payload_id in zip(timers, run_at_list, payload_ids, strict=True)
+                ]
+            )
+            committed: list[tuple[int, str, timezone.datetime, int | None, int | None, str, int | None, int | None]] = [
+                (
+                    timer.id,
+                    timer.url,
+                    timer.run_at,
+                    timer.max_attempts,
+                    timer.interval_seconds,
+                    timer.cron,
+                    timer.payload_id,
+                    timer.user_id,
+                )
+                for timer in created
+            ]
+            transaction.on_commit(lambda: self._on_timers_committed(committed, time_now))
+
+        data: list[dict] = [
+            {
+                "task_id": timer.id,
+                **time_left(timer.run_at, time_now),
+            }
+            for timer in created
+        ]
+        logger.info(f"{len(data)} timers set in bulk")
+        return data
+
+    def _on_timers_committed(
+        self,
+        timers: list[tuple[int, str, timezone.datetime, int | None, int | None, str, int | None, int | None]],
+        time_now,
+    ) -> None:
+        """
+        Cache and index committed ``(task_id, url, run_at, max_attempts, interval_seconds, cron, payload_id, user_id)``
+        timers.
+        """
+        self.cache.set_many({task_id: (run_at, user_id) for task_id, _, run_at, *_, user_id in timers}, time_now)
+        # The Timer row of a short timer only tracks it for `get`, the broker holds the ETA.
+        # Timers of a batch that share a run time travel together in as few messages as possible.
+        short_timers: dict[timezone.datetime, list[tuple[int, str, int | None, float, int | None]]] = {}
+        scheduled: list[tuple[int, str, timezone.datetime, int | None, int | None, str, int | None, int | None]] = []
+        for task_id, web_url, run_at, max_attempts, interval_seconds, cron, payload_id, user_id in timers:
+            if self._is_short(run_at, time_now, bool(interval_seconds or cron)):
+                short_timers.setdefault(run_at, []).append(
+                    (task_id, web_url, max_attempts, run_at.timestamp(), payload_id)
+                )
+            else:
+                scheduled.append((task_id, web_url, run_at, max_attempts, interval_seconds, cron, payload_id, user_id))
+        for run_at, due in short_timers.items():
+            publish_deliveries(due, eta=run_at)
+        if self.wheel is not None:
+            self.wheel.add_many(scheduled)
+
+    def get(self, task_id: int, user_id: int | None = None) -> dict:
         """
         Get the remaining time left for a timer to expire.
+
+        Only timers set anonymously or by the user ``user_id`` are found, see ``accessible_by``.
+        """
+        logger.info(f"Getting time left for task with ID {task_id}")
+        run_at = self.cache.get(task_id, user_id)
+        if run_at is None:
+            try:
+                run_at, owner = (
+                    Timer.objects.filter(accessible_by(user_id))
+                    .exclude(status=Timer.Status.CANCELED)
+                    .values_list("run_at", "user_id")
+                    .get(id=task_id)
+                )
+            except (Timer.DoesNotExist, ValueError):
+                logger.error(f"Error occurred while retrieving task with ID {task_id}")
+                raise ValueError(f"Task with ID {task_id} does not exist")
+            self.cache.set(task_id, run_at, timezone.now().replace(tzinfo=pytz.utc), owner)
+
+        time_now = timezone.now().replace(tzinfo=pytz.utc)
+        data: dict = {
+            "task_id": int(task_id),
+            **time_left(run_at, time_now),
+        }
+        return data
+
+    async def aget(self, task_id: int | str, user_id: int | None = None) -> dict:
+        """
+        Same as ``get``, for the async views.
         """
         logger.info(f"Getting time left for task with ID {task_id}")
+        run_at = await self.cache.aget(task_id, user_id)
+        if run_at is None:
+            try:
+                run_at, owner = await (
+                    Timer.objects.filter(accessible_by(user_id))
+                    .exclude(status=Timer.Status.CANCELED)
+                    .values_list("run_at", "user_id")
+                    .aget(id=task_id)
+                )
+            except (Timer.DoesNotExist, ValueError):
+                logger.error(f"Error occurred while retrieving task with ID {task_id}")
+                raise ValueError(f"Task with ID {task_id} does not exist")
+            await self.cache.aset(task_id, run_at, timezone.now().replace(tzinfo=pytz.utc), owner)
+
+        time_now = timezone.now().replace(tzinfo=pytz.utc)
+        data: dict = {
+            "task_id": int(task_id),
+            **time_left(run_at, time_now),
+        }
+        return data
+
+    def get_many(self, task_ids: list[int], user_id: int | None = None) -> dict:
+        """
+        Get the remaining time left of many timers at once.
+
+        Timers are read from the cache first and the others with a single query. IDs matching
+        no timer the user ``user_id`` may access are listed under ``missing``.
+        """
+        task_ids = list(dict.fromkeys(task_ids))
+        logger.info(f"Getting time left for {len(task_ids)} tasks")
+        time_now = timezone.now().replace(tzinfo=pytz.utc)
+        run_at_times: dict[int, timezone.datetime] = self.cache.get_many(task_ids, user_id)
+        uncached: list[int] = [task_id for task_id in task_ids if task_id not in run_at_times]
+        if uncached:
+            found: dict[int, tuple[timezone.datetime, int | None]] = {
+                task_id: (run_at, owner)
+                for task_id, run_at, owner in Timer.objects.filter(accessible_by(user_id), id__in=uncached)
+                .exclude(status=Timer.Status.CANCELED)
+                .values_list("id", "run_at", "user_id")
+            }
+            self.cache.set_many(found, time_now)
+            run_at_times.update({task_id: run_at for task_id, (run_at, _) in found.items()})
+
+        data: dict = {
+            "timers": [
+                {
+                    "task_id": task_id,
+                    **time_left(run_at_times[task_id], time_now),
+                }
+                for task_id in task_ids
+                if task_id in run_at_times
+            ],
+            "missing": [task_id for task_id in task_ids if task_id not in run_at_times],
+        }
+        return data
+
+    def get_result(self, task_id: int | str, user_id: int | None = None) -> Timer:
+        """
+        Get a timer with the outcome of its delivery, which is empty until the timer fired.
+        """
+        logger.info(f"Getting result of task with ID {task_id}")
+        try:
+            return Timer.objects.filter(accessible_by(user_id)).get(id=task_id)
+        except (Timer.DoesNotExist, ValueError):
+            logger.error(f"Error occurred while retrieving task with ID {task_id}")
+            raise ValueError(f"Task with ID {task_id} does not exist")
+
+    def stream(self, task_id: int | str, user_id: int | None = None) -> Iterator[str]:
+        """
+        Stream the remaining time of a timer as Server-Sent Events, then the outcome of its delivery.
+        """
+        logger.info(f"Streaming time left for task with ID {task_id}")
+        events = TimerEvents()
+        # Subscribe before reading the timer, so an outcome published in between is not missed.
+        pubsub: PubSub = events.subscribe(task_id)
+        try:
+            timer: Timer = (
+                Timer.objects.filter(accessible_by(user_id))
+                .exclude(status=Timer.Status.CANCELED)
+                .only("run_at", "status", "attempts", "status_code", "error", "completed_at", "lateness_ms")
+                .get(id=task_id)
+            )
+        except (Timer.DoesNotExist, ValueError):
+            pubsub.close()
+            logger.error(f"Error occurred while retrieving task with ID {task_id}")
+            raise ValueError(f"Task with ID {task_id} does not exist")
+        return events.stream(timer, pubsub)
+
+    async def astream(self, task_id: int | str, user_id: int | None = None) -> AsyncIterator[str]:
+        """
+        Same as ``stream``, for the async views: the stream waits on the event loop instead of holding a thread.
+        """
+        logger.info(f"Streaming time left for task with ID {task_id}")
+        events = TimerEvents()
+        pubsub: redis.asyncio.client.PubSub = await events.asubscribe(task_id)
+        try:
+            timer: Timer = await (
+                Timer.objects.filter(accessible_by(user_id))
+                .exclude(status=Timer.Status.CANCELED)
+                .only("run_at", "status", "attempts", "status_code", "error", "completed_at", "lateness_ms")
+                .aget(id=task_id)
+            )
+        except (Timer.DoesNotExist, ValueError):
+            await events.aclose(pubsub)
+            logger.error(f"Error occurred while retrieving task with ID {task_id}")
+            raise ValueError(f"Task with ID {task_id} does not exist")
+        return events.astream(timer, pubsub)
+
+    def _update_pending(
+        self,
+        task_id: int | str,
+        user_id: int | None = None,
+        statuses: tuple[Timer.Status, ...] = (Timer.Status.PENDING,),
+        **fields,
+    ) -> None:
+        """
+        Update a timer the user ``user_id`` may access, as long as it has one of ``statuses``.
+
+        Raises ValueError when the timer does not exist and TimerNotPendingError when it is not pending anymore.
+        """
+        timers = Timer.objects.filter(accessible_by(user_id))
         try:
-            task: PeriodicTask = PeriodicTask.objects.get(id=task_id)
-        except PeriodicTask.DoesNotExist:
+            updated: int = timers.filter(id=task_id, status__in=statuses).update(**fields)
+        except ValueError:
+            updated = 0
+        if updated:
+            return
+        try:
+            exists: bool = timers.exclude(status=Timer.Status.CANCELED).filter(id=task_id).exists()
+        except ValueError:
+            exists = False
+        if not exists:
             logger.error(f"Error occurred while retrieving task with ID {task_id}")
             raise ValueError(f"Task with ID {task_id} does not exist")
+        raise TimerNotPendingError(f"Task with ID {task_id} already fired")
 
+    def reschedule(
+        self,
+        task_id: int | str,
+        hours: int = 0,
+        minutes: int = 0,
+        seconds: int = 0,
+        milliseconds: int = 0,
+        run_at: timezone.datetime | None = None,
+        user_id: int | None = None,
+    ) -> dict:
+        """
+        Move a pending timer to fire after the given amount of time from now, or at ``run_at``.
+
+        The row is updated in place and the dispatcher follows it: the database queue reads the
+        new run time on its next poll and the Redis timer wheel only has its score updated.
+        """
         time_now = timezone.now().replace(tzinfo=pytz.utc)
-        time_left_in_seconds: float = round((task.clocked.clocked_time - time_now).total_seconds(), 1)
-        if time_left_in_seconds < 0:
-            time_left_in_seconds = 0
+        run_at = get_run_at(time_now, hours, minutes, seconds, milliseconds, run_at)
+        logger.info(f"Rescheduling task with ID {task_id} at {run_at}")
+        self._update_pending(task_id, user_id, run_at=run_at)
+        task_id = int(task_id)
+        transaction.on_commit(lambda: self._on_timer_rescheduled(task_id, run_at))
 
         data: dict = {
-            "task_id": task.id,
-            "time_left_in_seconds": time_left_in_seconds,
+            "task_id": task_id,
+            **time_left(run_at, time_now),
         }
         return data
+
+    def _on_timer_rescheduled(self, task_id: int, run_at: timezone.datetime) -> None:
+        # The next read caches the timer again with its owner.
+        self.cache.delete(task_id)
+        if self.wheel is not None:
+            self.wheel.reschedule(task_id, run_at)
+
+    def cancel(self, task_id: int | str, user_id: int | None = None) -> None:
+        """
+        Cancel a pending or queued timer, which is kept with the canceled status.
+
+        Queued timers, short ones and the ones already handed to the workers, are still in the broker:
+        their task drops them when it finds them canceled, retries included. A request already being
+        sent at that very moment still goes out.
+        """
+        logger.info(f"Canceling task with ID {task_id}")
+        self._update_pending(
+            task_id,
+            user_id,
+            statuses=(Timer.Status.PENDING, Timer.Status.QUEUED),
+            status=Timer.Status.CANCELED,
+            completed_at=timezone.now(),
+        )
+        task_ids: list[int] = [int(task_id)]
+        transaction.on_commit(lambda: self._on_timers_canceled(task_ids))
+
+    def cancel_many(self, url_prefix: str | None = None, created_before: timezone.datetime | None = None) -> int:
+        """
+        Cancel every pending timer matching all the given filters and return how many were canceled.
+
+        Timers are canceled TIMER_BULK_MAX_SIZE at a time, so cleaning up a runaway job never loads it all at once.
+        """
+        queryset = Timer.objects.filter(status=Timer.Status.PENDING)
+        if url_prefix:
+            queryset = queryset.filter(url__startswith=url_prefix)
+        if created_before:
+            queryset = queryset.filter(created_at__lt=created_before)
+
+        canceled = 0
+        completed_at = timezone.now()
+        while task_ids := list(queryset.values_list("id", flat=True)[: settings.TIMER_BULK_MAX_SIZE]):
+            canceled += Timer.objects.filter(id__in=task_ids, status=Timer.Status.PENDING).update(
+                status=Timer.Status.CANCELED, completed_at=completed_at
+            )
+            transaction.on_commit(lambda task_ids=task_ids: self._on_timers_canceled(task_ids))
+        logger.info(f"Canceled {canceled} timers matching url prefix {url_prefix!r} created before {created_before}")
+        return canceled
+
+    def _on_timers_canceled(self, task_ids: list[int]) -> None:
+        self.cache.delete_many(task_ids)
+        if self.wheel is not None:
+            self.wheel.remove_many(task_ids)
+        if settings.TIMER_EVENTS:
+            TimerEvents().publish_canceled(task_ids)
+
+
+class DeadLetterService:
+    def replay(self, ids: list[int] | None = None) -> int:
+        """
+        Deliver dead letters again and return how many were replayed.
+
+        Replays the given dead letters, or every dead letter not replayed yet when no IDs are given,
+        at most TIMER_BULK_MAX_SIZE per call. Each replay starts over with a fresh retry budget.
+        """
+        queryset = DeadLetter.objects.filter(replayed_at__isnull=True).order_by("created_at")
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+
+        with transaction.atomic():
+            # Skip rows locked by a concurrent replay instead of delivering them twice.
+            dead_letters: list[tuple[int, int | None, str, int | None]] = list(
+                queryset.select_for_update(skip_locked=True).values_list("id", "task_id", "url", "payload_id")[
+                    : settings.TIMER_BULK_MAX_SIZE
+                ]
+            )
+            if not dead_letters:
+                return 0
+            DeadLetter.objects.filter(id__in=[id_ for id_, *_ in dead_letters]).update(replayed_at=timezone.now())
+            # Recurring timers stay pending for their next occurrence, only one-off timers are delivered again.
+            Timer.objects.filter(id__in=[task_id for _, task_id, *_ in dead_letters if task_id is not None]).exclude(
+                RECURRING_TIMERS
+            ).update(status=Timer.Status.QUEUED)
+            # Replays send the same request again, payload included.
+            timers: list[tuple[int | None, str, None, None, int | None]] = [
+                (task_id, url, None, None, payload_id) for _, task_id, url, payload_id in dead_letters
+            ]
+            transaction.on_commit(lambda: publish_deliveries(timers))
+
+        logger.info(f"Replaying {len(dead_letters)} dead letters")
+        return len(dead_letters)
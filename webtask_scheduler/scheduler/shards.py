@@ -0,0 +1,123 @@
+import logging
+import math
+import os
+import random
+import socket
+import time
+import uuid
+
+from django.conf import settings
+
+from webtask_scheduler.scheduler.connections import get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS: shard lease
+# ARGV: node id, lease TTL (ms)
+# Extends the lease when it is still held by the node, returns 1 when it was.
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS: shard lease
+# ARGV: node id
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def shard_of(task_id: int, shards: int) -> int:
+    return task_id % shards
+
+
+class ShardLeases:
+    """
+    Spread the dispatch shards over every running dispatcher with Redis leases.
+
+    Each dispatcher heartbeats in a registry of live nodes and aims for an even share of the
+    TIMER_DISPATCH_SHARDS shards: it claims free shards while it holds fewer than its share and
+    releases the extra ones when nodes join. Leases expire TIMER_DISPATCH_LEASE_TTL seconds after
+    their last renewal, so the shards of a dead dispatcher are claimed by the others without any
+    leader: scaling dispatch is a matter of starting more dispatchers.
+    """
+
+    nodes_key = "scheduler:dispatch:nodes"
+    lease_prefix = "scheduler:dispatch:shard"
+
+    def __init__(self, shards: int | None = None, ttl: float | None = None) -> None:
+        self.redis = get_redis()
+        self.shards: int = shards or settings.TIMER_DISPATCH_SHARDS
+        self.ttl: float = ttl or settings.TIMER_DISPATCH_LEASE_TTL
+        self.node_id: str = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.owned: set[int] = set()
+        self._renewed_at: float | None = None
+        self._renew = self.redis.register_script(RENEW_SCRIPT)
+        self._release = self.redis.register_script(RELEASE_SCRIPT)
+
+    def _lease_key(self, shard: int) -> str:
+        return f"{self.lease_prefix}:{shard}"
+
+    @property
+    def valid(self) -> bool:
+        """
+        Whether the owned leases are known to be held, they may have expired since the last renewal otherwise.
+        """
+        return self._renewed_at is not None and time.monotonic() - self._renewed_at < self.ttl
+
+    @property
+    def refresh_due(self) -> bool:
+        return self._renewed_at is None or time.monotonic() - self._renewed_at >= self.ttl / 3
+
+    def _live_nodes(self) -> int:
+        now: float = time.time()
+        pipeline = self.redis.pipeline()
+        pipeline.zadd(self.nodes_key, {self.node_id: now})
+        pipeline.zremrangebyscore(self.nodes_key, "-inf", now - self.ttl)
+        pipeline.zcard(self.nodes_key)
+        return max(pipeline.execute()[-1], 1)
+
+    def refresh(self) -> set[int]:
+        """
+        Renew the owned leases, then claim or release shards to hold this node's share, and return the owned shards.
+        """
+        started_at: float = time.monotonic()
+        ttl_ms: int = int(self.ttl * 1000)
+        target: int = math.ceil(self.shards / self._live_nodes())
+
+        lost: set[int] = {
+            shard for shard in self.owned if not self._renew([self._lease_key(shard)], [self.node_id, ttl_ms])
+        }
+        if lost:
+            logger.warning(f"Lost the leases of shards {sorted(lost)}")
+        self.owned -= lost
+
+        for shard in sorted(self.owned)[target:]:
+            self._release([self._lease_key(shard)], [self.node_id])
+            self.owned.discard(shard)
+            logger.info(f"Released shard {shard} to balance {self.shards} shards")
+
+        # Start from a random shard so nodes starting together do not race for the same leases.
+        offset: int = random.randrange(self.shards)  # noqa: S311
+        for i in range(self.shards):
+            if len(self.owned) >= target:
+                break
+            shard: int = (offset + i) % self.shards
+            if shard not in self.owned and self.redis.set(self._lease_key(shard), self.node_id, nx=True, px=ttl_ms):
+                self.owned.add(shard)
+                logger.info(f"Claimed shard {shard}")
+
+        self._renewed_at = started_at
+        return self.owned
+
+    def release_all(self) -> None:
+        for shard in self.owned:
+            self._release([self._lease_key(shard)], [self.node_id])
+        self.redis.zrem(self.nodes_key, self.node_id)
+        self.owned = set()
+        self._renewed_at = None
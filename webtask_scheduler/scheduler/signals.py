@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from webtask_scheduler.scheduler.cache import TimerCache
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.timer_wheel import RedisTimerWheel
+
+
+@receiver(post_delete, sender=Timer)
+def invalidate_deleted_timer(sender, instance: Timer, **kwargs) -> None:
+    """
+    Drop the cached run time of a deleted timer and stop the timer wheel from firing it.
+    """
+    TimerCache().delete(instance.id)
+    if settings.TIMER_DISPATCH_BACKEND == "redis":
+        RedisTimerWheel().remove(instance.id)
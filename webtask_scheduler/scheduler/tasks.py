@@ -1,33 +1,366 @@
+import copy
+import hashlib
 import logging
+import time
 
-import requests
 from celery import shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from django.conf import settings
+from django.db.models import Case
+from django.db.models import F
+from django.db.models import Q
+from django.db.models import Value
+from django.db.models import When
+from django.utils import timezone
+
+from webtask_scheduler.scheduler.catchup import expire_timers
+from webtask_scheduler.scheduler.delivery import DeliveryResult
+from webtask_scheduler.scheduler.delivery import WebhookRequest
+from webtask_scheduler.scheduler.delivery import get_engine
+from webtask_scheduler.scheduler.events import TimerEvents
+from webtask_scheduler.scheduler.idempotency import IdempotencyKeys
+from webtask_scheduler.scheduler.metrics import observe_delivery
+from webtask_scheduler.scheduler.models import RECURRING_TIMERS
+from webtask_scheduler.scheduler.models import DeadLetter
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.partitions import TimerPartitionManager
+from webtask_scheduler.scheduler.payloads import Payloads
+from webtask_scheduler.scheduler.throttle import HostThrottle
+from webtask_scheduler.scheduler.throttle import Lease
 
 logger = logging.getLogger(__name__)
 
+# Responses worth trying again later, anything else in the 4xx range is a permanent failure.
+RETRYABLE_STATUS_CODES = {408, 425, 429}
 
-@shared_task
-def send_request_to_url(url: str) -> str | dict:
+
+def is_retryable(result: DeliveryResult) -> bool:
+    return result.status_code is None or result.status_code >= 500 or result.status_code in RETRYABLE_STATUS_CODES
+
+
+def get_max_attempts(max_attempts: int | None) -> int:
+    return min(max_attempts or settings.TIMER_RETRY_MAX_ATTEMPTS, settings.TIMER_RETRY_MAX_ATTEMPTS_LIMIT)
+
+
+def get_retry_countdown(attempt: int, result: DeliveryResult) -> int:
+    """
+    Return the jittered exponential delay before the attempt following ``attempt``.
+    """
+    countdown: int = get_exponential_backoff_interval(
+        factor=settings.TIMER_RETRY_BACKOFF_BASE,
+        retries=attempt - 1,
+        maximum=settings.TIMER_RETRY_BACKOFF_MAX,
+        full_jitter=True,
+    )
+    return max(countdown, int(result.retry_after or 0))
+
+
+def dead_letter(
+    task_id: int | None, url: str, attempt: int, result: DeliveryResult, payload_id: int | None = None
+) -> DeadLetter:
+    return DeadLetter(
+        task_id=task_id,
+        url=url,
+        attempts=attempt,
+        status_code=result.status_code,
+        error=result.error,
+        payload_id=payload_id,
+    )
+
+
+def get_lateness_ms(run_at: float | None, fired_at: float) -> int | None:
+    return round((fired_at - run_at) * 1000) if run_at is not None else None
+
+
+def response_digest(text: str | None) -> str:
+    """
+    Return the first 16 hex digits of the SHA-256 of a response body, enough to tell responses apart.
+    """
+    return hashlib.sha256(text.encode()).hexdigest()[:16] if text else ""
+
+
+def completed_timer(task_id: int, attempt: int, result: DeliveryResult, lateness_ms: int | None = None) -> Timer:
     """
-    Sends a POST request to the specified URL and returns the response text.
+    Return an unsaved Timer carrying the final outcome of its delivery, for ``bulk_update``.
+    """
+    return Timer(
+        id=task_id,
+        status=Timer.Status.SUCCEEDED if result.ok else Timer.Status.FAILED,
+        attempts=attempt,
+        status_code=result.status_code,
+        error=result.error or "",
+        completed_at=timezone.now(),
+        lateness_ms=lateness_ms,
+        response_ms=round(result.elapsed * 1000),
+        response_digest=response_digest(result.text),
+    )
+
+
+def dropped_timers(timers: list[tuple[int | None, float | None]]) -> dict[int, str]:
+    """
+    Return the timers among ``(task_id, run_at)`` pairs whose request must not be sent, with the reason why.
+
+    Timers canceled or expired since they were queued are dropped. So are the ones that waited in the
+    broker longer than their ``max_lateness_seconds``, behind a backlog of the workers or a worker outage,
+    which follow their ``lateness_policy`` like the catch-up sweeper does: a recurring timer skipping the
+    occurrence waits for its next one, the others expire. Retries carry no ``run_at`` and are never late.
+    """
+    run_at_times: dict[int, float | None] = {task_id: run_at for task_id, run_at in timers if task_id is not None}
+    if not run_at_times:
+        return {}
+    now: float = time.time()
+    dropped: dict[int, str] = {}
+    late: list[int] = []
+    for task_id, status, max_lateness_seconds, lateness_policy, interval_seconds, cron in (
+        Timer.objects.filter(id__in=run_at_times)
+        .filter(
+            Q(status__in=[Timer.Status.CANCELED, Timer.Status.EXPIRED])
+            | Q(max_lateness_seconds__isnull=False) & ~Q(lateness_policy=Timer.LatenessPolicy.FIRE)
+        )
+        .values_list("id", "status", "max_lateness_seconds", "lateness_policy", "interval_seconds", "cron")
+    ):
+        run_at: float | None = run_at_times[task_id]
+        if status in (Timer.Status.CANCELED, Timer.Status.EXPIRED):
+            dropped[task_id] = status
+        elif run_at is not None and now - run_at > max_lateness_seconds:
+            skip: bool = lateness_policy == Timer.LatenessPolicy.SKIP and bool(interval_seconds or cron)
+            dropped[task_id] = "skipped" if skip else Timer.Status.EXPIRED
+            if not skip:
+                late.append(task_id)
+    if late:
+        expire_timers(late)
+    return dropped
+
+
+def drop_undeliverable(timers: list[list]) -> list[list]:
+    """
+    Return the ``[task_id, url, max_attempts, run_at, payload_id]`` items of a batch without the ones of dropped
+    timers.
+    """
+    dropped: dict[int, str] = dropped_timers([(task_id, run_at) for task_id, _, _, run_at, _ in timers])
+    if dropped:
+        logger.info("Dropping %s requests of canceled, expired or skipped timers", len(dropped))
+    return [timer for timer in timers if timer[0] not in dropped]
+
+
+def record_outcomes(timers: list[Timer]) -> None:
+    """
+    Store the outcome of delivered timers with one update.
+
+    Recurring timers keep their status, they are still pending for their next occurrence and
+    only the outcome of the last one is stored. So do timers canceled while their request was sent.
+    """
+    rows: list[Timer] = []
+    for timer in timers:
+        row: Timer = copy.copy(timer)
+        row.status = Case(
+            When(RECURRING_TIMERS | Q(status=Timer.Status.CANCELED), then=F("status")), default=Value(timer.status)
+        )
+        rows.append(row)
+    Timer.objects.bulk_update(
+        rows,
+        ["status", "attempts", "status_code", "error", "completed_at", "lateness_ms", "response_ms", "response_digest"],
+    )
+    if settings.TIMER_EVENTS:
+        TimerEvents().publish_fired(timers)
+
+
+# Outcomes are recorded on the Timer rows, the result backend only keeps them with TIMER_DELIVERY_RESULTS="backend".
+IGNORE_DELIVERY_RESULTS: bool = settings.TIMER_DELIVERY_RESULTS != "backend"
+
+
+@shared_task(bind=True, ignore_result=IGNORE_DELIVERY_RESULTS)
+def send_request_to_url(
+    self,
+    url: str,
+    task_id: int | None = None,
+    max_attempts: int | None = None,
+    attempt: int = 1,
+    run_at: float | None = None,
+    lateness_ms: int | None = None,
+    payload_id: int | None = None,
+    host_throttle: bool | None = None,
+) -> str | dict:
+    """
+    Sends a request to the specified URL and returns the response text.
+
+    The request is an empty POST unless the timer has a payload, whose method, headers and
+    body are loaded when the request is sent rather than carried by the task message.
+
+    The request goes through the process wide delivery engine, so the connection to the
+    host is pooled and kept alive for the next deliveries. When the host is throttled the
+    task is retried once the host accepts requests again.
+
+    Failed deliveries are retried on the TIMER_RETRY_QUEUE queue with a jittered exponential
+    backoff until ``max_attempts`` is reached, then they are stored as a DeadLetter. The final
+    outcome is recorded on the Timer row when the timer is known. Timers canceled since they
+    were queued, or found later than their max lateness, are dropped before any attempt, see dropped_timers.
 
     Args:
         url (str): The URL to send the request to.
+        task_id (int): The ID of the timer being fired, if known.
+        max_attempts (int): The number of attempts allowed for this timer, TIMER_RETRY_MAX_ATTEMPTS by default.
+        attempt (int): The number of the current attempt, starting at 1.
+        run_at (float): The UNIX timestamp the timer was due at, if known, to measure its firing lateness.
+        lateness_ms (int): The firing lateness of the first attempt, carried over by the retries.
+        payload_id (int): The ID of the Payload of the request, if any.
+        host_throttle (bool): Whether the request is throttled per host, TIMER_HOST_THROTTLE by default.
 
     Returns:
         Union[str, dict]: The response text or an error dictionary.
 
-    Raises:
-        requests.exceptions.RequestException: If an error occurs while sending the request.
-
     """
+    dropped: str | None = dropped_timers([(task_id, run_at)]).get(task_id)
+    if dropped is not None:
+        logger.info("Dropping request to %s, timer %s was %s", url, task_id, dropped)
+        return {"error": f"Timer was {dropped}"}
+
+    if host_throttle is None:
+        host_throttle = settings.TIMER_HOST_THROTTLE
+    throttle: HostThrottle | None = HostThrottle() if host_throttle else None
+    lease: Lease | None = None
+    if throttle is not None:
+        lease = throttle.acquire(url)
+        if not lease.granted:
+            logger.info("Delaying request to %s by %ss, host is throttled", url, lease.wait)
+            # Waiting for the host is not a failure, so it never exhausts the retries.
+            raise self.retry(countdown=lease.wait, max_retries=None)
+
     logger.info("Sending request to %s", url)
-    try:
-        response = requests.post(url, timeout=10)
-
-        logger.info("Received response with status code %s for url %s", response.status_code, url)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        logger.exception("Failed to send request to %s: %s", url, e)
-        return {"error": str(e)}
-    return response.text
+    if attempt == 1:
+        lateness_ms = get_lateness_ms(run_at, time.time())
+    request: WebhookRequest | None = Payloads().get(payload_id) if payload_id is not None else None
+    result: DeliveryResult = get_engine().deliver(url, request)
+    observe_delivery(result, run_at if attempt == 1 else None)
+    if throttle is not None:
+        throttle.release(lease, result.status_code, result.retry_after)
+    if not result.ok:
+        if is_retryable(result) and attempt < get_max_attempts(max_attempts):
+            countdown: int = get_retry_countdown(attempt, result)
+            logger.warning("Attempt %s to send request to %s failed, retrying in %ss", attempt, url, countdown)
+            raise self.retry(
+                kwargs={
+                    "task_id": task_id,
+                    "max_attempts": max_attempts,
+                    "attempt": attempt + 1,
+                    "lateness_ms": lateness_ms,
+                    "payload_id": payload_id,
+                },
+                countdown=countdown,
+                max_retries=None,
+                queue=settings.TIMER_RETRY_QUEUE,
+            )
+        logger.error("Failed to send request to %s: %s", url, result.error)
+        dead_letter(task_id, url, attempt, result, payload_id).save()
+    else:
+        logger.info("Received response with status code %s for url %s", result.status_code, url)
+    if task_id is not None:
+        record_outcomes([completed_timer(task_id, attempt, result, lateness_ms)])
+    return result.text if result.ok else {"error": result.error}
+
+
+@shared_task(ignore_result=IGNORE_DELIVERY_RESULTS)
+def send_requests_to_urls(timers: list[list]) -> list[dict]:
+    """
+    Sends the request of every timer of a batch concurrently.
+
+    Used when many timers fire in the same tick: one message and one stored result
+    cover the whole batch instead of one per timer. Timers whose host is throttled are
+    sent back to the broker as a new batch that runs once the host accepts requests again.
+    Failed deliveries continue as individual retries on the TIMER_RETRY_QUEUE queue, and
+    those that cannot be retried are stored as dead letters in one insert. The outcomes of the
+    timers that are done are recorded with one bulk update. The payloads of the batch are loaded with one query.
+    Timers canceled since they were queued, or later than their max lateness, are dropped.
+
+    Args:
+        timers (list): ``[task_id, url, max_attempts, run_at, payload_id]`` items of the timers to fire.
+
+    Returns:
+        list[dict]: A ``task_id``/``status_code``/``error`` record per delivered timer, in input order.
+
+    """
+    logger.info("Sending %s requests in batch", len(timers))
+    timers = drop_undeliverable(timers)
+    if settings.TIMER_HOST_THROTTLE:
+        throttle = HostThrottle()
+        leases: list[Lease] = throttle.acquire_many([timer[1] for timer in timers])
+        deferred: list[tuple[list, Lease]] = [
+            (timer, lease) for timer, lease in zip(timers, leases) if not lease.granted
+        ]
+        if deferred:
+            countdown: float = min(lease.wait for _, lease in deferred)
+            logger.info("Delaying %s requests by %ss, their hosts are throttled", len(deferred), countdown)
+            send_requests_to_urls.apply_async(args=[[timer for timer, _ in deferred]], countdown=countdown)
+        granted: list[tuple[list, Lease]] = [(timer, lease) for timer, lease in zip(timers, leases) if lease.granted]
+        timers = [timer for timer, _ in granted]
+
+    payload_ids: list[int] = [payload_id for *_, payload_id in timers if payload_id is not None]
+    requests: dict[int, WebhookRequest] = Payloads().get_many(payload_ids) if payload_ids else {}
+    fired_at: float = time.time()
+    results: list[DeliveryResult] = get_engine().deliver_many(
+        [url for _, url, *_ in timers], [requests.get(payload_id) for *_, payload_id in timers]
+    )
+    if settings.TIMER_HOST_THROTTLE:
+        throttle.release_many(
+            [lease for _, lease in granted], [(result.status_code, result.retry_after) for result in results]
+        )
+
+    records: list[dict] = []
+    dead_letters: list[DeadLetter] = []
+    completed: list[Timer] = []
+    for (task_id, url, max_attempts, run_at, payload_id), result in zip(timers, results, strict=True):
+        observe_delivery(result, run_at)
+        lateness_ms: int | None = get_lateness_ms(run_at, fired_at)
+        records.append({"task_id": task_id, "status_code": result.status_code, "error": result.error})
+        if not result.ok:
+            if is_retryable(result) and get_max_attempts(max_attempts) > 1:
+                send_request_to_url.apply_async(
+                    args=[url],
+                    kwargs={
+                        "task_id": task_id,
+                        "max_attempts": max_attempts,
+                        "attempt": 2,
+                        "lateness_ms": lateness_ms,
+                        "payload_id": payload_id,
+                    },
+                    countdown=get_retry_countdown(1, result),
+                    queue=settings.TIMER_RETRY_QUEUE,
+                )
+                continue
+            logger.error("Failed to send request to %s: %s", url, result.error)
+            dead_letters.append(dead_letter(task_id, url, 1, result, payload_id))
+        if task_id is not None:
+            completed.append(completed_timer(task_id, 1, result, lateness_ms))
+    if dead_letters:
+        DeadLetter.objects.bulk_create(dead_letters)
+    if completed:
+        record_outcomes(completed)
+    failed: int = sum(1 for record in records if record["error"] is not None)
+    logger.info("Sent %s requests in batch, %s failed", len(records), failed)
+    return records
+
+
+@shared_task
+def expire_idempotency_keys() -> int:
+    """
+    Delete the idempotency keys older than TIMER_IDEMPOTENCY_KEY_TTL, runs hourly from CELERY_BEAT_SCHEDULE.
+    """
+    return IdempotencyKeys().delete_expired()
+
+
+@shared_task
+def expire_payloads() -> int:
+    """
+    Delete the payloads no timer or dead letter needs anymore, runs hourly from CELERY_BEAT_SCHEDULE, see Payloads.
+    """
+    return Payloads().delete_expired()
+
+
+@shared_task
+def maintain_timer_partitions() -> dict:
+    """
+    Create the upcoming partitions of the Timer table and expire the ones past retention.
+
+    Runs hourly from CELERY_BEAT_SCHEDULE, see TimerPartitionManager.
+    """
+    return TimerPartitionManager().maintain()
@@ -0,0 +1,234 @@
+import datetime as dt
+import json
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from webtask_scheduler.scheduler.async_views import GetTimerAsyncView
+from webtask_scheduler.scheduler.async_views import SetTimerAsyncView
+from webtask_scheduler.scheduler.async_views import StreamTimerAsyncView
+from webtask_scheduler.scheduler.models import IdempotencyKey
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.users.tests.factories import UserFactory
+
+pytestmark: pytest.mark = pytest.mark.django_db
+
+
+def call(view, request, **kwargs) -> HttpResponse:
+    # The factory skips the middleware, which sets the user of real requests.
+    if not hasattr(request, "user"):
+        request.user = AnonymousUser()
+    return async_to_sync(view)(request, **kwargs)
+
+
+class TestSetTimerAsyncView:
+    """
+    Test case class for testing the SetTimerAsyncView.
+    """
+
+    view = staticmethod(SetTimerAsyncView.as_view())
+
+    @pytest.fixture
+    def factory(self) -> AsyncRequestFactory:
+        return AsyncRequestFactory()
+
+    def test_view_opts_out_of_atomic_requests(self) -> None:
+        assert self.view.csrf_exempt
+        assert self.view._non_atomic_requests
+
+    def test_set_timer(self, factory: AsyncRequestFactory) -> None:
+        request = factory.post("/timer/", {"minutes": 5, "web_url": "https://example.com"}, "application/json")
+
+        response: HttpResponse = call(self.view, request)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        body: dict = json.loads(response.content)
+        timer: Timer = Timer.objects.get(id=body["task_id"])
+        assert timer.status == Timer.Status.PENDING
+        assert 299 <= body["time_left_in_seconds"] <= 300
+        assert cache.get(f"scheduler:timer:{timer.id}:run_at") == (timer.run_at.timestamp(), None)
+
+    @patch("webtask_scheduler.scheduler.services.publish_deliveries")
+    def test_set_short_timer_publishes_it(self, publish_deliveries: patch, factory: AsyncRequestFactory) -> None:
+        request = factory.post("/timer/", {"seconds": 1, "web_url": "https://example.com"}, "application/json")
+
+        response: HttpResponse = call(self.view, request)
+
+        task_id: int = json.loads(response.content)["task_id"]
+        assert Timer.objects.get(id=task_id).status == Timer.Status.QUEUED
+        publish_deliveries.assert_called_once()
+        assert publish_deliveries.call_args.args[0][0][:2] == (task_id, "https://example.com")
+
+    def test_set_timer_with_idempotency_key(self, factory: AsyncRequestFactory) -> None:
+        data: dict = {"minutes": 5, "web_url": "https://example.com"}
+
+        headers: dict = {"Idempotency-Key": "order-1"}
+
+        first: HttpResponse = call(self.view, factory.post("/timer/", data, "application/json", headers=headers))
+        second: HttpResponse = call(self.view, factory.post("/timer/", data, "application/json", headers=headers))
+
+        assert json.loads(first.content)["task_id"] == json.loads(second.content)["task_id"]
+        assert second["Idempotent-Replayed"] == "true"
+        assert IdempotencyKey.objects.count() == 1
+
+    def test_set_timer_with_token(self, factory: AsyncRequestFactory) -> None:
+        token: Token = Token.objects.create(user=UserFactory())
+        data: dict = {"minutes": 5, "web_url": "https://example.com"}
+        headers: dict = {"Authorization": f"Token {token.key}"}
+
+        response: HttpResponse = call(self.view, factory.post("/timer/", data, "application/json", headers=headers))
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Timer.objects.get(id=json.loads(response.content)["task_id"]).user_id == token.user_id
+
+    def test_set_timer_with_bad_token(self, factory: AsyncRequestFactory) -> None:
+        data: dict = {"minutes": 5, "web_url": "https://example.com"}
+        headers: dict = {"Authorization": "Token nope"}
+
+        response: HttpResponse = call(self.view, factory.post("/timer/", data, "application/json", headers=headers))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert json.loads(response.content) == {"detail": "Invalid token."}
+        assert not Timer.objects.exists()
+
+    def test_session_request_requires_csrf_token(self, factory: AsyncRequestFactory) -> None:
+        request = factory.post("/timer/", {"minutes": 5, "web_url": "https://example.com"}, "application/json")
+        request.user = UserFactory()
+
+        response: HttpResponse = call(self.view, request)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert json.loads(response.content)["detail"].startswith("CSRF Failed")
+        assert not Timer.objects.exists()
+
+    def test_set_timer_invalid(self, factory: AsyncRequestFactory) -> None:
+        response: HttpResponse = call(self.view, factory.post("/timer/", {"minutes": 5}, "application/json"))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "web_url" in json.loads(response.content)
+
+    def test_set_timer_malformed_json(self, factory: AsyncRequestFactory) -> None:
+        response: HttpResponse = call(self.view, factory.post("/timer/", "{", "application/json"))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert json.loads(response.content)["detail"].startswith("JSON parse error")
+
+
+class TestGetTimerAsyncView:
+    """
+    Test case class for testing the GetTimerAsyncView.
+    """
+
+    view = staticmethod(GetTimerAsyncView.as_view())
+
+    @pytest.fixture
+    def factory(self) -> AsyncRequestFactory:
+        return AsyncRequestFactory()
+
+    @pytest.fixture
+    def timer(self) -> Timer:
+        return Timer.objects.create(url="https://example.com", run_at=timezone.now() + dt.timedelta(hours=1))
+
+    def test_get_timer(self, factory: AsyncRequestFactory, timer: Timer) -> None:
+        response: HttpResponse = call(self.view, factory.get("/"), task_id=str(timer.id))
+
+        assert response.status_code == status.HTTP_200_OK
+        body: dict = json.loads(response.content)
+        assert body["task_id"] == timer.id
+        assert 3599 <= body["time_left_in_seconds"] <= 3600
+        assert cache.get(f"scheduler:timer:{timer.id}:run_at") == (timer.run_at.timestamp(), None)
+
+    def test_get_timer_not_found(self, factory: AsyncRequestFactory) -> None:
+        response: HttpResponse = call(self.view, factory.get("/"), task_id="999999")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert json.loads(response.content) == {"detail": "Task with ID 999999 does not exist"}
+
+    def test_timer_of_another_user_not_found(self, factory: AsyncRequestFactory, timer: Timer) -> None:
+        timer.user_id = UserFactory().id
+        timer.save()
+        request = factory.get("/")
+        request.user = UserFactory()
+
+        response: HttpResponse = call(self.view, request, task_id=str(timer.id))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_reschedule_timer(self, factory: AsyncRequestFactory, timer: Timer) -> None:
+        request = factory.patch("/", {"minutes": 10}, "application/json")
+
+        response: HttpResponse = call(self.view, request, task_id=str(timer.id))
+
+        assert response.status_code == status.HTTP_200_OK
+        timer.refresh_from_db()
+        assert timer.run_at - timezone.now() < dt.timedelta(minutes=10)
+
+    def test_cancel_timer(self, factory: AsyncRequestFactory, timer: Timer) -> None:
+        response: HttpResponse = call(self.view, factory.delete("/"), task_id=str(timer.id))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        timer.refresh_from_db()
+        assert timer.status == Timer.Status.CANCELED
+
+        response = call(self.view, factory.delete("/"), task_id=str(timer.id))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_cancel_fired_timer(self, factory: AsyncRequestFactory, timer: Timer) -> None:
+        Timer.objects.filter(id=timer.id).update(status=Timer.Status.SUCCEEDED)
+
+        response: HttpResponse = call(self.view, factory.delete("/"), task_id=str(timer.id))
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+
+class TestStreamTimerAsyncView:
+    """
+    Test case class for testing the StreamTimerAsyncView, with a mocked asyncio Redis subscription.
+    """
+
+    view = staticmethod(StreamTimerAsyncView.as_view())
+
+    @pytest.fixture
+    def pubsub(self):
+        pubsub = AsyncMock()
+        with (
+            patch("webtask_scheduler.scheduler.events.get_redis"),
+            patch("webtask_scheduler.scheduler.events.TimerEvents.asubscribe", return_value=pubsub),
+        ):
+            yield pubsub
+
+    @staticmethod
+    def consume(response) -> list[str]:
+        async def read() -> bytes:
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        return async_to_sync(read)().decode().split("\n\n")[:-1]
+
+    def test_stream_countdown_until_fired(self, pubsub: AsyncMock) -> None:
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=timezone.now() + dt.timedelta(minutes=1))
+        fired: bytes = json.dumps({"task_id": timer.id, "status": "succeeded", "status_code": 200}).encode()
+        pubsub.get_message.side_effect = [{"type": "message", "data": fired}]
+
+        response = call(self.view, AsyncRequestFactory().get("/"), task_id=str(timer.id))
+        events: list[str] = self.consume(response)
+
+        assert response["Content-Type"] == "text/event-stream"
+        assert [event.split("\n")[0] for event in events] == ["event: countdown", "event: fired"]
+        assert events[1] == f"event: fired\ndata: {fired.decode()}"
+        pubsub.aclose.assert_awaited_once()
+
+    def test_stream_timer_not_found(self, pubsub: AsyncMock) -> None:
+        response = call(self.view, AsyncRequestFactory().get("/"), task_id="999999")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        pubsub.aclose.assert_awaited_once()
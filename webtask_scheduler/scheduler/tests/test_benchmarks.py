@@ -0,0 +1,112 @@
+import pytest
+
+from webtask_scheduler.scheduler.benchmarks import DeliveryBenchmark
+from webtask_scheduler.scheduler.benchmarks import StubWebhookServer
+from webtask_scheduler.scheduler.benchmarks import compare
+from webtask_scheduler.scheduler.benchmarks import percentile
+from webtask_scheduler.scheduler.benchmarks import side_by_side
+from webtask_scheduler.scheduler.benchmarks import summarize
+from webtask_scheduler.scheduler.delivery import close_engine
+from webtask_scheduler.scheduler.delivery import get_engine
+
+pytestmark = pytest.mark.django_db
+
+
+class TestBenchmarkReport:
+    """
+    Test case class for testing the statistics and comparison of benchmark results.
+    """
+
+    def test_percentile(self) -> None:
+        values: list[float] = [float(value) for value in range(1, 101)]
+
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([0.2], 99) == 0.2
+        assert percentile([], 50) is None
+
+    def test_summarize(self) -> None:
+        summary: dict = summarize([0.01, 0.02, 0.03, 0.04], errors=1, elapsed=2)
+
+        assert summary == {
+            "count": 4,
+            "errors": 1,
+            "elapsed_seconds": 2,
+            "throughput_per_second": 2,
+            "p50_ms": 20,
+            "p95_ms": 40,
+            "p99_ms": 40,
+        }
+
+    def test_compare_reports_regressions_beyond_tolerance(self) -> None:
+        baseline: dict = {
+            "set_timer": {"p95_ms": 100, "throughput_per_second": 500},
+            "delivery": {"p95_ms": 50, "throughput_per_second": 1000},
+        }
+        results: dict = {
+            "set_timer": {"p95_ms": 105, "throughput_per_second": 400},
+            "delivery": {"p95_ms": 80, "throughput_per_second": 1200},
+        }
+
+        assert compare(results, baseline, max_regression=0.1) == [
+            "set_timer.throughput_per_second regressed by 20.0%: 500 -> 400",
+            "delivery.p95_ms regressed by 60.0%: 50 -> 80",
+        ]
+        assert compare(results, baseline, max_regression=0.7) == []
+
+    def test_compare_reports_failed_phases(self) -> None:
+        baseline: dict = {
+            "set_timer": {"count": 100, "errors": 0, "p95_ms": 100, "throughput_per_second": 500},
+            "firing": {"count": 98, "missing": 2, "p95_ms": 20},
+            "delivery": {"count": 90, "errors": 10, "p95_ms": 50, "throughput_per_second": 1000},
+        }
+        results: dict = {
+            "set_timer": {"count": 0, "errors": 100, "p95_ms": None, "throughput_per_second": 0},
+            "firing": {"count": 90, "missing": 10, "p95_ms": 20},
+            "delivery": {"count": 89, "errors": 11, "p95_ms": 50, "throughput_per_second": 1000},
+        }
+
+        assert compare(results, baseline, max_regression=0.1) == [
+            "set_timer.p95_ms is missing: 100 -> None",
+            "set_timer.throughput_per_second regressed by 100.0%: 500 -> 0",
+            "set_timer.errors rose from 0.0% to 100.0% of the operations",
+            "firing.missing rose from 2.0% to 10.0% of the operations",
+        ]
+        # Phases skipped by a run are not compared.
+        assert compare({"delivery": results["delivery"]}, baseline, max_regression=0.1) == []
+
+    def test_side_by_side(self) -> None:
+        results: dict = {"set_timer": {"p95_ms": 100, "throughput_per_second": 500}, "get_timer": {"p95_ms": 0}}
+        other: dict = {"set_timer": {"p95_ms": 40, "throughput_per_second": 1500}, "get_timer": {"p95_ms": 10}}
+
+        assert side_by_side(results, other) == {"set_timer.p95_ms": 0.4, "set_timer.throughput_per_second": 3.0}
+
+
+class TestDeliveryBenchmark:
+    """
+    Test case class for testing the DeliveryBenchmark against the stub webhook server.
+    """
+
+    @pytest.fixture
+    def server(self):
+        server = StubWebhookServer(latency=0.01).start()
+        yield server
+        close_engine()
+        server.stop()
+
+    def test_run(self, server: StubWebhookServer) -> None:
+        results: dict = DeliveryBenchmark(server=server, deliveries=20, concurrency=4).run()
+
+        assert results["delivery"]["count"] == 20
+        assert results["delivery"]["errors"] == 0
+        assert results["delivery"]["p50_ms"] >= 10
+        assert len(server.received) == 20
+
+    def test_stub_simulates_errors(self, server: StubWebhookServer) -> None:
+        server.error_rate = 1
+
+        result = get_engine().deliver(server.url("failing"))
+
+        assert result.status_code == 500
+        assert "failing" in server.received
@@ -0,0 +1,152 @@
+import datetime as dt
+import time
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+import pytz
+from django.utils import timezone
+
+from webtask_scheduler.scheduler.catchup import CatchUpSweeper
+from webtask_scheduler.scheduler.delivery import DeliveryResult
+from webtask_scheduler.scheduler.dispatcher import TimerDispatcher
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.tasks import send_request_to_url
+from webtask_scheduler.scheduler.tasks import send_requests_to_urls
+from webtask_scheduler.scheduler.timer_wheel import RedisTimerWheel
+
+pytestmark = pytest.mark.django_db
+
+
+class TestCatchUpSweeper:
+    """
+    Test case class for testing the catch-up of timers missed during an outage.
+    """
+
+    @pytest.fixture(autouse=True)
+    def catch_up_settings(self, settings) -> None:
+        settings.TIMER_CATCHUP_AFTER_SECONDS = 60
+        settings.TIMER_CATCHUP_RATE = 2
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_requests_to_urls.apply_async")
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_overdue_timers_are_replayed_oldest_first_at_the_catch_up_rate(
+        self, apply_async: MagicMock, batch_apply_async: MagicMock
+    ) -> None:
+        now: dt.datetime = timezone.now()
+        overdue: list[Timer] = Timer.objects.bulk_create(
+            [Timer(url=f"https://example.com/{i}", run_at=now - dt.timedelta(minutes=10 - i)) for i in range(5)]
+        )
+        on_time: Timer = Timer.objects.create(url="https://example.org", run_at=now)
+        dispatcher = TimerDispatcher(batch_size=10)
+
+        assert dispatcher.dispatch_once() == 3
+        assert dispatcher.dispatch_once() == 0
+
+        assert apply_async.call_args.kwargs["args"] == ["https://example.org"]
+        assert [timer[0] for timer in batch_apply_async.call_args.kwargs["args"][0]] == [
+            overdue[0].id,
+            overdue[1].id,
+        ]
+        assert set(Timer.objects.filter(status=Timer.Status.QUEUED).values_list("id", flat=True)) == {
+            on_time.id,
+            overdue[0].id,
+            overdue[1].id,
+        }
+
+    def test_allowance_refills_at_the_catch_up_rate(self) -> None:
+        sweeper = CatchUpSweeper(rate=4, shards=2)
+        with patch("webtask_scheduler.scheduler.catchup.time.monotonic", side_effect=[100, 100, 100.25, 100.5, 110]):
+            assert sweeper.allowance(0) == 2
+            sweeper.spend(0, 2)
+            assert sweeper.wait(0) == 0.5
+            assert sweeper.allowance(0) == 0
+            assert sweeper.allowance(0) == 1
+            assert sweeper.allowance(0) == 2
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_requests_to_urls.apply_async")
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_lateness_policies(self, apply_async: MagicMock, batch_apply_async: MagicMock, settings) -> None:
+        settings.TIMER_CATCHUP_RATE = 100
+        run_at: dt.datetime = dt.datetime.now(tz=pytz.utc).replace(microsecond=0) - dt.timedelta(minutes=5)
+        late: dict = {"url": "https://example.com", "run_at": run_at, "max_lateness_seconds": 120}
+        fired, allowed, skipped, skipped_once, expired = Timer.objects.bulk_create(
+            [
+                Timer(**late, lateness_policy=Timer.LatenessPolicy.FIRE),
+                Timer(**{**late, "max_lateness_seconds": 600}, lateness_policy=Timer.LatenessPolicy.EXPIRE),
+                Timer(**late, lateness_policy=Timer.LatenessPolicy.SKIP, interval_seconds=60),
+                Timer(**late, lateness_policy=Timer.LatenessPolicy.SKIP),
+                Timer(**late, lateness_policy=Timer.LatenessPolicy.EXPIRE, cron="* * * * *"),
+            ]
+        )
+
+        assert TimerDispatcher(batch_size=10).dispatch_once() == 5
+
+        assert [timer[0] for timer in batch_apply_async.call_args.kwargs["args"][0]] == [fired.id, allowed.id]
+        apply_async.assert_not_called()
+        statuses: dict[int, tuple[str, dt.datetime]] = {
+            timer.id: (timer.status, timer.run_at) for timer in Timer.objects.all()
+        }
+        assert statuses[skipped.id] == (Timer.Status.PENDING, run_at + dt.timedelta(minutes=6))
+        assert statuses[skipped_once.id][0] == Timer.Status.EXPIRED
+        assert statuses[expired.id] == (Timer.Status.EXPIRED, run_at)
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_lateness_policies_of_timers_late_in_the_broker(self, engine_mock: MagicMock) -> None:
+        # Timers already published, then held up in the broker by a backlog of the workers.
+        run_at: float = time.time() - 300
+        late: dict = {
+            "url": "https://example.com",
+            "run_at": dt.datetime.fromtimestamp(run_at, tz=pytz.utc),
+            "max_lateness_seconds": 120,
+        }
+        fired, allowed, skipped, skipped_once, expired = Timer.objects.bulk_create(
+            [
+                Timer(**late, status=Timer.Status.QUEUED, lateness_policy=Timer.LatenessPolicy.FIRE),
+                Timer(**{**late, "max_lateness_seconds": 600}, lateness_policy=Timer.LatenessPolicy.EXPIRE),
+                Timer(**late, lateness_policy=Timer.LatenessPolicy.SKIP, interval_seconds=60),
+                Timer(**late, status=Timer.Status.QUEUED, lateness_policy=Timer.LatenessPolicy.SKIP),
+                Timer(**late, status=Timer.Status.QUEUED, lateness_policy=Timer.LatenessPolicy.EXPIRE),
+            ]
+        )
+        engine_mock.return_value.deliver_many.side_effect = lambda urls, requests: [
+            DeliveryResult(url, 200, "", None, 0.1) for url in urls
+        ]
+
+        send_requests_to_urls([[timer.id, timer.url, None, run_at, None] for timer in (fired, allowed, skipped)])
+        result: dict = send_request_to_url(skipped_once.url, task_id=skipped_once.id, run_at=run_at)
+        send_request_to_url(expired.url, task_id=expired.id, run_at=run_at)
+
+        ((urls, _), _) = engine_mock.return_value.deliver_many.call_args
+        assert len(urls) == 2
+        engine_mock.return_value.deliver.assert_not_called()
+        assert result == {"error": "Timer was expired"}
+        statuses: dict[int, str] = dict(Timer.objects.values_list("id", "status"))
+        assert statuses[fired.id] == Timer.Status.SUCCEEDED
+        assert statuses[skipped.id] == Timer.Status.PENDING
+        assert statuses[skipped_once.id] == Timer.Status.EXPIRED
+        assert statuses[expired.id] == Timer.Status.EXPIRED
+
+    def test_sleep_interval_paces_the_catch_up_but_not_on_time_timers(self) -> None:
+        now: float = time.time()
+        dispatcher = TimerDispatcher(poll_interval=5)
+        dispatcher.queue = MagicMock()
+        dispatcher.queue.next_run_at.side_effect = [now - 600, now + 2]
+        dispatcher.sweeper.spend(0, dispatcher.sweeper.allowance(0))
+
+        assert 0.4 <= dispatcher._sleep_interval() <= 0.5
+        assert now - 60 <= dispatcher.queue.next_run_at.call_args.kwargs["since"] <= time.time() - 60
+
+    def test_timer_wheel_leaves_overdue_timers_to_the_sweeper(self) -> None:
+        with patch("webtask_scheduler.scheduler.timer_wheel.get_redis") as get_redis:
+            wheel = RedisTimerWheel(shards=1)
+            pop_due_script: MagicMock = get_redis.return_value.register_script.return_value
+            pop_due_script.return_value = []
+
+            wheel.pop_due(now=1000, limit=10, since=940, tenant=0)
+            wheel.pop_overdue(before=940, limit=2, tenant=0)
+
+        assert [call.kwargs["args"] for call in pop_due_script.call_args_list] == [
+            [1000, 10, 940, 0],
+            [940, 2, "-inf", 0],
+        ]
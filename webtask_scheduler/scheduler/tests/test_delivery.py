@@ -0,0 +1,148 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from aiohttp import web
+
+from webtask_scheduler.scheduler.delivery import DeliveryEngine
+from webtask_scheduler.scheduler.delivery import WebhookRequest
+from webtask_scheduler.scheduler.delivery import parse_retry_after
+
+
+class TestDeliveryEngine:
+    """
+    Test case class for testing the DeliveryEngine against a local HTTP server.
+    """
+
+    @pytest.fixture
+    def engine(self):
+        engine = DeliveryEngine(max_connections=10, max_connections_per_host=5, timeout=1, keepalive_timeout=5)
+        yield engine
+        engine.close()
+
+    @pytest.fixture
+    def server_url(self, engine: DeliveryEngine):
+        async def ok(request: web.Request) -> web.Response:
+            return web.Response(text="ok")
+
+        async def fail(request: web.Request) -> web.Response:
+            return web.Response(status=503, text="unavailable")
+
+        async def throttled(request: web.Request) -> web.Response:
+            return web.Response(status=429, headers={"Retry-After": "30"})
+
+        async def slow(request: web.Request) -> web.Response:
+            await asyncio.sleep(2)
+            return web.Response(text="too late")
+
+        async def garbled(request: web.Request) -> web.Response:
+            return web.Response(body=b"\xff\xfe", content_type="text/plain", charset="utf-8")
+
+        async def echo(request: web.Request) -> web.Response:
+            body: bytes = await request.read()
+            return web.json_response(
+                {
+                    "method": request.method,
+                    "content_type": request.content_type,
+                    "content_length": request.content_length,
+                    "chunked": request.headers.get("Transfer-Encoding"),
+                    "token": request.headers.get("X-Token"),
+                    "body": body.decode(),
+                }
+            )
+
+        app = web.Application()
+        app.add_routes(
+            [
+                web.post("/ok", ok),
+                web.post("/fail", fail),
+                web.post("/throttled", throttled),
+                web.post("/slow", slow),
+                web.post("/garbled", garbled),
+                web.route("*", "/echo", echo),
+            ]
+        )
+        runner = web.AppRunner(app)
+        engine.run(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        engine.run(site.start())
+        host, port = runner.addresses[0][:2]
+        yield f"http://{host}:{port}"
+        engine.run(runner.cleanup())
+
+    def test_deliver_success(self, engine: DeliveryEngine, server_url: str) -> None:
+        result = engine.deliver(f"{server_url}/ok")
+
+        assert result.ok
+        assert result.status_code == 200
+        assert result.text == "ok"
+
+    def test_deliver_error_status(self, engine: DeliveryEngine, server_url: str) -> None:
+        result = engine.deliver(f"{server_url}/fail")
+
+        assert not result.ok
+        assert result.status_code == 503
+        assert result.error == f"503 Error: Service Unavailable for url: {server_url}/fail"
+
+    def test_deliver_reads_retry_after(self, engine: DeliveryEngine, server_url: str) -> None:
+        result = engine.deliver(f"{server_url}/throttled")
+
+        assert result.status_code == 429
+        assert result.retry_after == 30
+
+    def test_deliver_timeout(self, engine: DeliveryEngine, server_url: str) -> None:
+        result = engine.deliver(f"{server_url}/slow")
+
+        assert not result.ok
+        assert result.status_code is None
+        assert result.error == "TimeoutError"
+
+    def test_deliver_request(self, engine: DeliveryEngine, server_url: str) -> None:
+        body: bytes = json.dumps({"items": ["x" * 100] * 3000}).encode()
+        request = WebhookRequest("PUT", {"X-Token": "secret"}, gzip.compress(body), len(body))
+
+        result = engine.deliver(f"{server_url}/echo", request)
+
+        assert json.loads(result.text) == {
+            "method": "PUT",
+            "content_type": "application/json",
+            "content_length": len(body),
+            "chunked": None,
+            "token": "secret",
+            "body": body.decode(),
+        }
+
+    def test_deliver_request_without_body(self, engine: DeliveryEngine, server_url: str) -> None:
+        result = engine.deliver(f"{server_url}/echo", WebhookRequest("DELETE", {}, None, 0))
+
+        assert json.loads(result.text)["method"] == "DELETE"
+        assert json.loads(result.text)["body"] == ""
+
+    def test_deliver_many_keeps_order(self, engine: DeliveryEngine, server_url: str) -> None:
+        urls: list[str] = [f"{server_url}/ok", f"{server_url}/fail"] * 10
+        results = engine.deliver_many(urls)
+
+        assert [result.url for result in results] == urls
+        assert [result.status_code for result in results] == [200, 503] * 10
+
+    def test_deliver_many_isolates_failed_deliveries(self, engine: DeliveryEngine, server_url: str) -> None:
+        urls: list[str] = [f"{server_url}/ok", f"{server_url}/garbled", f"{server_url}/echo"]
+        requests: list[WebhookRequest | None] = [None, None, WebhookRequest("POST", {"X-A\r\nB": "1"}, None, 0)]
+
+        results = engine.deliver_many(urls, requests)
+
+        assert results[0].ok
+        assert results[0].text == "ok"
+        assert results[1].ok
+        assert results[1].text == "\ufffd\ufffd"
+        assert not results[2].ok
+        assert results[2].status_code is None
+        assert results[2].error.startswith("ValueError")
+
+
+def test_parse_retry_after() -> None:
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
@@ -0,0 +1,381 @@
+import datetime as dt
+import time
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+import pytz
+
+from webtask_scheduler.scheduler.dispatcher import TimerDispatcher
+from webtask_scheduler.scheduler.dispatcher import publish_deliveries
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.quotas import ANONYMOUS_TENANT
+from webtask_scheduler.scheduler.services import TimerService
+from webtask_scheduler.scheduler.shards import ShardLeases
+from webtask_scheduler.scheduler.timer_queue import DatabaseTimerQueue
+from webtask_scheduler.scheduler.timer_wheel import DueTimer
+from webtask_scheduler.scheduler.timer_wheel import RedisTimerWheel
+
+pytestmark = pytest.mark.django_db
+
+
+class TestTimerDispatcher:
+    """
+    Test case class for testing the TimerDispatcher.
+    """
+
+    @pytest.fixture
+    def wheel(self, settings) -> MagicMock:
+        settings.TIMER_DISPATCH_BACKEND = "redis"
+        with patch("webtask_scheduler.scheduler.dispatcher.RedisTimerWheel") as wheel_class:
+            wheel_class.return_value.due_tenants.return_value = [ANONYMOUS_TENANT]
+            wheel_class.return_value.pop_overdue.return_value = []
+            yield wheel_class.return_value
+
+    @pytest.fixture
+    def task(self) -> Timer:
+        return Timer.objects.create(url="https://example.com", run_at=dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc))
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_dispatch_once_publishes_due_timers(self, apply_async: MagicMock, wheel: MagicMock, task) -> None:
+        wheel.pop_due.side_effect = [[DueTimer(task_id=task.id, run_at=time.time(), url="https://example.com")]]
+
+        dispatched: int = TimerDispatcher(batch_size=10).dispatch_once()
+
+        assert dispatched == 1
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs["args"] == ["https://example.com"]
+        task.refresh_from_db()
+        assert task.status == Timer.Status.QUEUED
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_requests_to_urls.apply_async")
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_dispatch_once_drains_full_batches(
+        self, apply_async: MagicMock, batch_apply_async: MagicMock, wheel: MagicMock
+    ) -> None:
+        now: float = time.time()
+        wheel.pop_due.side_effect = [
+            [DueTimer(task_id=1, run_at=now, url="https://example.com")] * 2,
+            [DueTimer(task_id=2, run_at=now, url="https://example.org")],
+        ]
+
+        dispatched: int = TimerDispatcher(batch_size=2).dispatch_once()
+
+        assert dispatched == 3
+        assert wheel.pop_due.call_count == 2
+        batch_apply_async.assert_called_once()
+        apply_async.assert_called_once()
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_requests_to_urls.apply_async")
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_publish_deliveries_in_chunks(self, apply_async: MagicMock, batch_apply_async: MagicMock, settings) -> None:
+        settings.TIMER_DELIVERY_CHUNK_SIZE = 2
+        timers: list[tuple[int, str, None, float, None]] = [
+            (task_id, f"https://example.com/{task_id}", None, 1717118640.0, None) for task_id in range(5)
+        ]
+
+        publish_deliveries(timers)
+
+        assert [call.kwargs["args"] for call in batch_apply_async.call_args_list] == [
+            [
+                [
+                    [0, "https://example.com/0", None, 1717118640.0, None],
+                    [1, "https://example.com/1", None, 1717118640.0, None],
+                ]
+            ],
+            [
+                [
+                    [2, "https://example.com/2", None, 1717118640.0, None],
+                    [3, "https://example.com/3", None, 1717118640.0, None],
+                ]
+            ],
+        ]
+        assert apply_async.call_args.kwargs["args"] == ["https://example.com/4"]
+        assert apply_async.call_args.kwargs["kwargs"] == {
+            "task_id": 4,
+            "max_attempts": None,
+            "run_at": 1717118640.0,
+            "payload_id": None,
+        }
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_dispatch_once_publishes_upcoming_timers_with_eta(
+        self, apply_async: MagicMock, wheel: MagicMock, settings
+    ) -> None:
+        settings.TIMER_DISPATCH_LOOKAHEAD_SECONDS = 0.5
+        now: float = time.time()
+        wheel.pop_due.side_effect = [
+            [
+                DueTimer(task_id=1, run_at=now - 1, url="https://example.com"),
+                DueTimer(task_id=2, run_at=now + 0.3, url="https://example.org"),
+            ]
+        ]
+
+        TimerDispatcher(batch_size=10).dispatch_once()
+
+        assert wheel.pop_due.call_args.kwargs["now"] >= now + 0.5
+        etas: dict[str, dt.datetime | None] = {
+            call.kwargs["args"][0]: call.kwargs["eta"] for call in apply_async.call_args_list
+        }
+        assert etas["https://example.com"] is None
+        assert 0 <= etas["https://example.org"].timestamp() - (now + 0.3) <= 0.001
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_requests_to_urls.apply_async")
+    def test_dispatch_once_puts_recurring_timers_back(self, batch_apply_async: MagicMock, wheel: MagicMock) -> None:
+        run_at: dt.datetime = dt.datetime.now(tz=pytz.utc).replace(microsecond=0)
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=run_at, cron="* * * * *")
+        canceled: Timer = Timer.objects.create(
+            url="https://example.com", run_at=run_at, cron="* * * * *", status=Timer.Status.CANCELED
+        )
+        wheel.pop_due.side_effect = [
+            [DueTimer(task_id=t.id, run_at=run_at.timestamp(), url=t.url, cron="* * * * *") for t in (timer, canceled)]
+        ]
+
+        TimerDispatcher(batch_size=10).dispatch_once()
+
+        next_run_at: dt.datetime = run_at.replace(second=0) + dt.timedelta(minutes=1)
+        ((timers,), _) = wheel.add_many.call_args
+        assert list(timers) == [(timer.id, "https://example.com", next_run_at, None, None, "* * * * *", None, None)]
+        timer.refresh_from_db()
+        assert (timer.status, timer.run_at) == (Timer.Status.PENDING, next_run_at)
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_dispatch_once_requeues_batch_on_publish_failure(self, apply_async: MagicMock, wheel: MagicMock) -> None:
+        apply_async.side_effect = ConnectionError("broker is down")
+        wheel.pop_due.side_effect = [[DueTimer(task_id=1, run_at=time.time(), url="https://example.com")]]
+
+        with pytest.raises(ConnectionError):
+            TimerDispatcher(batch_size=10).dispatch_once()
+
+        wheel.add_many.assert_called_once()
+
+
+class TestDatabaseTimerQueue:
+    """
+    Test case class for testing the DatabaseTimerQueue and the dispatcher reading from it.
+    """
+
+    @pytest.fixture
+    def timers(self) -> list[Timer]:
+        run_at = dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc)
+        return Timer.objects.bulk_create(
+            [
+                Timer(url="https://example.org", run_at=run_at + dt.timedelta(seconds=1), max_attempts=3),
+                Timer(url="https://example.com", run_at=run_at),
+                Timer(url="https://example.net", run_at=run_at, status=Timer.Status.QUEUED),
+                Timer(url="https://example.io", run_at=run_at + dt.timedelta(hours=1)),
+            ]
+        )
+
+    def test_pop_due_returns_pending_timers_in_run_time_order(self, timers: list[Timer]) -> None:
+        now: float = dt.datetime(2024, 5, 31, 1, 30, tzinfo=pytz.utc).timestamp()
+
+        due: list[DueTimer] = DatabaseTimerQueue().pop_due(now=now, limit=10)
+
+        assert [(timer.task_id, timer.url, timer.max_attempts) for timer in due] == [
+            (timers[1].id, "https://example.com", None),
+            (timers[0].id, "https://example.org", 3),
+        ]
+        assert DatabaseTimerQueue().next_run_at() == timers[1].run_at.timestamp()
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_requests_to_urls.apply_async")
+    def test_dispatch_once_marks_timers_queued(self, batch_apply_async: MagicMock, timers: list[Timer]) -> None:
+        dispatcher = TimerDispatcher(batch_size=10)
+
+        assert dispatcher.dispatch_once() == 3
+        assert dispatcher.dispatch_once() == 0
+
+        batch_apply_async.assert_called_once()
+        assert list(Timer.objects.filter(status=Timer.Status.PENDING).values_list("id", flat=True)) == []
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_requests_to_urls.apply_async")
+    def test_dispatch_once_releases_claims_on_publish_failure(
+        self, batch_apply_async: MagicMock, timers: list[Timer]
+    ) -> None:
+        batch_apply_async.side_effect = ConnectionError("broker is down")
+
+        with pytest.raises(ConnectionError):
+            TimerDispatcher(batch_size=10).dispatch_once()
+
+        assert Timer.objects.filter(status=Timer.Status.PENDING).count() == 3
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_dispatch_once_advances_recurring_timers(self, apply_async: MagicMock) -> None:
+        run_at: dt.datetime = dt.datetime.now(tz=pytz.utc) - dt.timedelta(seconds=90)
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=run_at, interval_seconds=60)
+        dispatcher = TimerDispatcher(batch_size=10)
+
+        assert dispatcher.dispatch_once() == 1
+        assert dispatcher.dispatch_once() == 0
+
+        apply_async.assert_called_once()
+        timer.refresh_from_db()
+        # The occurrence missed while the timer was late is skipped.
+        assert (timer.status, timer.run_at) == (Timer.Status.PENDING, run_at + dt.timedelta(minutes=2))
+
+    def test_pop_due_claims_rows_for_update_skip_locked(self, timers: list[Timer]) -> None:
+        with patch("django.db.models.query.QuerySet.select_for_update", autospec=True) as select_for_update:
+            select_for_update.side_effect = lambda queryset, **kwargs: queryset
+            DatabaseTimerQueue().pop_due(now=time.time(), limit=10)
+
+        assert select_for_update.call_args.kwargs == {"skip_locked": True}
+
+
+class TestShardedDispatch:
+    """
+    Test case class for testing the shard leases and the dispatch of sharded timers.
+    """
+
+    @pytest.fixture
+    def redis(self) -> MagicMock:
+        with patch("webtask_scheduler.scheduler.shards.get_redis") as get_redis:
+            yield get_redis.return_value
+
+    def test_refresh_claims_an_even_share_of_shards(self, redis: MagicMock) -> None:
+        redis.pipeline.return_value.execute.return_value = [1, 0, 2]
+        redis.set.return_value = True
+        leases = ShardLeases(shards=4, ttl=10)
+
+        assert len(leases.refresh()) == 2
+        assert leases.valid
+
+        # Two more dispatchers joined, the extra shard is released for them.
+        redis.pipeline.return_value.execute.return_value = [0, 0, 4]
+        redis.register_script.return_value.return_value = 1
+
+        assert len(leases.refresh()) == 1
+
+    def test_refresh_drops_lost_leases(self, redis: MagicMock) -> None:
+        redis.pipeline.return_value.execute.return_value = [0, 0, 1]
+        redis.set.return_value = False
+        redis.register_script.return_value.return_value = 0
+        leases = ShardLeases(shards=2, ttl=10)
+        leases.owned = {0, 1}
+
+        assert leases.refresh() == set()
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    @patch("webtask_scheduler.scheduler.dispatcher.ShardLeases")
+    @patch("webtask_scheduler.scheduler.dispatcher.RedisTimerWheel")
+    def test_dispatch_once_pops_owned_shards_only(
+        self, wheel_class: MagicMock, leases_class: MagicMock, apply_async: MagicMock, settings
+    ) -> None:
+        settings.TIMER_DISPATCH_BACKEND = "redis"
+        settings.TIMER_DISPATCH_SHARDS = 4
+        leases_class.return_value.configure_mock(owned={1, 3}, refresh_due=False, valid=True)
+        wheel_class.return_value.pop_due.side_effect = [
+            [DueTimer(task_id=1, run_at=time.time(), url="https://example.com")],
+            [],
+        ]
+        wheel_class.return_value.due_tenants.return_value = [ANONYMOUS_TENANT]
+        wheel_class.return_value.pop_overdue.return_value = []
+
+        assert TimerDispatcher(batch_size=10).dispatch_once() == 1
+        assert [call.kwargs["shard"] for call in wheel_class.return_value.pop_due.call_args_list] == [1, 3]
+
+    @patch("webtask_scheduler.scheduler.dispatcher.ShardLeases")
+    def test_dispatch_once_skips_expired_leases(self, leases_class: MagicMock, settings) -> None:
+        settings.TIMER_DISPATCH_SHARDS = 2
+        leases_class.return_value.configure_mock(owned={0, 1}, refresh_due=True, valid=False)
+
+        assert TimerDispatcher().dispatch_once() == 0
+        leases_class.return_value.refresh.assert_called_once()
+
+    def test_database_queue_pops_shard_timers(self) -> None:
+        run_at = dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc)
+        timers: list[Timer] = Timer.objects.bulk_create(
+            [Timer(url=f"https://example.com/{i}", run_at=run_at) for i in range(4)]
+        )
+
+        due: list[DueTimer] = DatabaseTimerQueue(shards=2).pop_due(now=run_at.timestamp(), limit=10, shard=1)
+
+        assert {timer.task_id for timer in due} == {timer.id for timer in timers if timer.id % 2 == 1}
+
+    def test_timer_wheel_keeps_recurrence(self) -> None:
+        redis = MagicMock()
+        run_at = dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc)
+        with patch("webtask_scheduler.scheduler.timer_wheel.get_redis", return_value=redis):
+            wheel = RedisTimerWheel(shards=1)
+            wheel.add_many(
+                [
+                    (1, "https://example.com", run_at, None, None, "", None, None),
+                    (2, "https://example.com", run_at, 3, 60, "", None, None),
+                    (3, "https://example.com", run_at, None, None, "", 9, None),
+                ]
+            )
+            redis.register_script.return_value.return_value = [
+                b"2",
+                b"1717118640",
+                b'["https://example.com", 3, 60, "", null, null]',
+                b"3",
+                b"1717118640",
+                b'["https://example.com", null, null, "", 9, null]',
+            ]
+            recurring, with_payload = wheel.pop_due(now=run_at.timestamp(), limit=10, tenant=ANONYMOUS_TENANT)
+
+        assert redis.pipeline.return_value.hset.call_args.kwargs["mapping"] == {
+            "1": '["https://example.com", null, null, "", null, null]',
+            "2": '["https://example.com", 3, 60, "", null, null]',
+            "3": '["https://example.com", null, null, "", 9, null]',
+        }
+        assert (recurring.task_id, recurring.max_attempts, recurring.interval_seconds) == (2, 3, 60)
+        assert (recurring.recurring, recurring.payload_id) == (True, None)
+        assert (with_payload.recurring, with_payload.payload_id) == (False, 9)
+
+    def test_timer_wheel_indexes_timers_in_their_shard(self) -> None:
+        with patch("webtask_scheduler.scheduler.timer_wheel.get_redis") as get_redis:
+            wheel = RedisTimerWheel(shards=2)
+            wheel.add_many(
+                [
+                    (
+                        task_id,
+                        "https://example.com",
+                        dt.datetime(2024, 5, 31, tzinfo=pytz.utc),
+                        None,
+                        None,
+                        "",
+                        None,
+                        None,
+                    )
+                    for task_id in (1, 2)
+                ]
+            )
+            unsharded: RedisTimerWheel = RedisTimerWheel(shards=1)
+
+        pipeline: MagicMock = get_redis.return_value.pipeline.return_value
+        assert [call.args[0] for call in pipeline.zadd.call_args_list] == [
+            "scheduler:timers:due:{1}:0",
+            "scheduler:timers:tenants:{1}",
+            "scheduler:timers:due:{0}:0",
+            "scheduler:timers:tenants:{0}",
+        ]
+        assert unsharded.keys(0) == ("scheduler:timers:tenants", "scheduler:timers:deliveries")
+        assert unsharded.lane_key(0, 7) == "scheduler:timers:due:7"
+
+
+class TestTimerServiceWithTimerWheel:
+    """
+    Test case class for testing the TimerService when timers are fired from the Redis timer wheel.
+    """
+
+    @pytest.fixture(autouse=True)
+    def wheel(self, settings) -> MagicMock:
+        settings.TIMER_DISPATCH_BACKEND = "redis"
+        with patch("webtask_scheduler.scheduler.services.RedisTimerWheel") as wheel_class:
+            yield wheel_class.return_value
+
+    def test_set_timer_indexes_timer(self, wheel: MagicMock, django_capture_on_commit_callbacks) -> None:
+        with django_capture_on_commit_callbacks(execute=True):
+            data: dict = TimerService().set(hours=0, minutes=1, seconds=0, web_url="https://example.com")
+
+        timer: Timer = Timer.objects.get(id=data["task_id"])
+        ((timers,), _) = wheel.add_many.call_args
+        assert timers == [(timer.id, "https://example.com", timer.run_at, None, None, "", None, None)]
+
+    def test_set_many_timers_indexes_timers(self, wheel: MagicMock, django_capture_on_commit_callbacks) -> None:
+        timer: dict = {"hours": 0, "minutes": 1, "seconds": 0, "web_url": "https://example.com"}
+        with django_capture_on_commit_callbacks(execute=True):
+            data: list[dict] = TimerService().set_many(timers=[timer, timer])
+
+        ((timers,), _) = wheel.add_many.call_args
+        assert [task_id for task_id, *_ in timers] == [item["task_id"] for item in data]
@@ -0,0 +1,95 @@
+import datetime as dt
+import time
+from unittest.mock import patch
+
+import pytest
+import pytz
+from django.test import Client
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from webtask_scheduler.scheduler.delivery import DeliveryResult
+from webtask_scheduler.scheduler.dispatcher import TimerDispatcher
+from webtask_scheduler.scheduler.metrics import get_registry
+from webtask_scheduler.scheduler.metrics import observe_delivery
+from webtask_scheduler.scheduler.metrics import status_class
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.tasks import send_request_to_url
+
+pytestmark = pytest.mark.django_db
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetrics:
+    """
+    Test case class for testing the scheduler metrics and the endpoint exposing them.
+    """
+
+    def test_status_class(self) -> None:
+        assert [status_class(code) for code in (200, 302, 429, 503, None)] == ["2xx", "3xx", "4xx", "5xx", "error"]
+
+    def test_observe_delivery(self) -> None:
+        deliveries: float = sample("scheduler_webhook_deliveries_total", status_class="5xx")
+        lateness: float = sample("scheduler_timer_firing_lateness_seconds_count")
+
+        observe_delivery(DeliveryResult("https://example.com", 503, "", "503 Error", 0.2), run_at=time.time() - 1)
+        observe_delivery(DeliveryResult("https://example.com", 503, "", "503 Error", 0.2))
+
+        assert sample("scheduler_webhook_deliveries_total", status_class="5xx") == deliveries + 2
+        assert sample("scheduler_timer_firing_lateness_seconds_count") == lateness + 1
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_observes_first_attempt_lateness(self, engine_mock: patch) -> None:
+        engine_mock.return_value.deliver.return_value = DeliveryResult("https://example.com", 200, "", None, 0.1)
+        lateness: float = sample("scheduler_timer_firing_lateness_seconds_sum")
+
+        send_request_to_url("https://example.com", run_at=time.time() - 2)
+        send_request_to_url("https://example.com", run_at=time.time() - 60, attempt=2)
+
+        assert 2 <= sample("scheduler_timer_firing_lateness_seconds_sum") - lateness < 60
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_dispatch_observes_lag(self, apply_async: patch) -> None:
+        Timer.objects.create(url="https://example.com", run_at=dt.datetime.now(tz=pytz.utc) - dt.timedelta(seconds=3))
+        lag: float = sample("scheduler_timer_dispatch_lag_seconds_sum")
+
+        TimerDispatcher().dispatch_once()
+
+        assert sample("scheduler_timer_dispatch_lag_seconds_sum") - lag >= 3
+        assert apply_async.call_args.kwargs["kwargs"]["run_at"] is not None
+
+    def test_metrics_endpoint(self, settings) -> None:
+        settings.METRICS_TOKEN = "scrape-token"
+        now: dt.datetime = dt.datetime.now(tz=pytz.utc)
+        Timer.objects.create(url="https://example.com", run_at=now - dt.timedelta(seconds=1))
+        Timer.objects.create(url="https://example.com", run_at=now + dt.timedelta(hours=1))
+        Timer.objects.create(url="https://example.com", run_at=now, status=Timer.Status.QUEUED)
+
+        response = Client().get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-token")
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain")
+        body: str = response.content.decode()
+        assert "scheduler_timers_due 1.0" in body
+        assert "scheduler_webhook_duration_seconds_bucket" in body
+
+    def test_metrics_endpoint_requires_the_token(self, settings) -> None:
+        settings.METRICS_TOKEN = "scrape-token"
+
+        assert Client().get(reverse("metrics")).status_code == 403
+        assert Client().get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+        settings.METRICS_TOKEN = ""
+        assert Client().get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer ").status_code == 403
+
+    def test_metrics_endpoint_serves_admin_users(self, admin_client: Client) -> None:
+        assert admin_client.get(reverse("metrics")).status_code == 200
+
+    def test_multiprocess_registry(self, monkeypatch, tmp_path) -> None:
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+        names: set[str] = {metric.name for metric in get_registry().collect()}
+
+        assert names == {"scheduler_timers_due"}
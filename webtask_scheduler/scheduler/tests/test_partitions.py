@@ -0,0 +1,137 @@
+import datetime as dt
+from unittest.mock import patch
+
+import pytest
+import pytz
+from django.core.management import call_command
+from django.db import connection
+
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.partitions import TimerPartitionManager
+from webtask_scheduler.scheduler.tasks import maintain_timer_partitions
+
+pytestmark = pytest.mark.django_db
+
+
+class TestTimerPartitionManager:
+    """
+    Test case class for testing the TimerPartitionManager.
+    """
+
+    @pytest.fixture(autouse=True)
+    def retention(self, settings) -> None:
+        settings.TIMER_PARTITION_PREMAKE_DAYS = 2
+        settings.TIMER_RETENTION_DAYS = 3
+
+    def test_partition_name_and_bounds(self) -> None:
+        day = dt.date(2024, 5, 31)
+
+        assert TimerPartitionManager.partition_name(day) == "scheduler_timer_p20240531"
+        assert TimerPartitionManager.bounds(day) == (
+            dt.datetime(2024, 5, 31, tzinfo=pytz.utc),
+            dt.datetime(2024, 6, 1, tzinfo=pytz.utc),
+        )
+
+    def test_maintain_deletes_expired_timers_without_partitions(self) -> None:
+        Timer.objects.bulk_create(
+            [
+                Timer(url="https://example.com", run_at=dt.datetime(2024, 5, 27, 23, 59, tzinfo=pytz.utc)),
+                Timer(url="https://example.org", run_at=dt.datetime(2024, 5, 28, tzinfo=pytz.utc)),
+            ]
+        )
+
+        with patch("webtask_scheduler.scheduler.partitions.timezone.now") as now:
+            now.return_value = dt.datetime(2024, 5, 31, 12, tzinfo=pytz.utc)
+            result: dict = maintain_timer_partitions()
+
+        assert result == {"deleted": 1}
+        assert list(Timer.objects.values_list("url", flat=True)) == ["https://example.org"]
+
+    def test_maintain_creates_upcoming_and_expires_old_partitions(self) -> None:
+        manager = TimerPartitionManager()
+        today = dt.date(2024, 5, 31)
+        existing: dict[dt.date, str] = {
+            day: manager.partition_name(day)
+            for day in (dt.date(2024, 5, 27), dt.date(2024, 5, 28), today, dt.date(2024, 6, 1))
+        }
+
+        with (
+            patch.object(manager, "is_partitioned", return_value=True),
+            patch.object(manager, "partitions", return_value=existing),
+            patch.object(manager, "create_partition") as create_partition,
+            patch.object(manager, "expire_partition") as expire_partition,
+        ):
+            result: dict = manager.maintain(today=today)
+
+        create_partition.assert_called_once_with(dt.date(2024, 6, 2))
+        expire_partition.assert_called_once_with("scheduler_timer_p20240527")
+        assert result == {"created": ["scheduler_timer_p20240602"], "expired": ["scheduler_timer_p20240527"]}
+
+
+@pytest.mark.postgres
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="Timers are only partitioned on PostgreSQL")
+class TestTimerPartitions:
+    """
+    Test case class for testing the partitions of the timer table on PostgreSQL.
+    """
+
+    @pytest.fixture(autouse=True)
+    def retention(self, settings) -> None:
+        settings.TIMER_PARTITION_PREMAKE_DAYS = 2
+        settings.TIMER_RETENTION_DAYS = 3
+        settings.TIMER_RETENTION_ARCHIVE = False
+
+    @staticmethod
+    def partition_of(task_id: int) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tableoid::regclass::text FROM scheduler_timer WHERE id = %s", [task_id])
+            return cursor.fetchone()[0]
+
+    def test_timer_table_is_partitioned(self) -> None:
+        manager = TimerPartitionManager()
+        today: dt.date = dt.datetime.now(tz=pytz.utc).date()
+
+        assert manager.is_partitioned()
+        assert {today + dt.timedelta(days=offset) for offset in range(3)} <= manager.partitions().keys()
+
+    def test_maintain_rotates_partitions(self) -> None:
+        manager = TimerPartitionManager()
+        today = dt.date(2024, 5, 31)
+        for day in (dt.date(2024, 5, 27), dt.date(2024, 5, 28), today):
+            manager.create_partition(day)
+        old, kept, late = Timer.objects.bulk_create(
+            [
+                Timer(url="https://example.com", run_at=dt.datetime(2024, 5, 27, 12, tzinfo=pytz.utc)),
+                Timer(url="https://example.org", run_at=dt.datetime(2024, 5, 28, 12, tzinfo=pytz.utc)),
+                # Lands in the default partition until the partition of its day is created.
+                Timer(url="https://example.net", run_at=dt.datetime(2024, 6, 2, 12, tzinfo=pytz.utc)),
+            ]
+        )
+        assert self.partition_of(late.id) == "scheduler_timer_default"
+
+        result: dict = manager.maintain(today=today)
+
+        assert set(result["created"]) == {"scheduler_timer_p20240601", "scheduler_timer_p20240602"}
+        assert result["expired"] == ["scheduler_timer_p20240527"]
+        assert dt.date(2024, 5, 27) not in manager.partitions()
+        assert not Timer.objects.filter(id=old.id).exists()
+        assert self.partition_of(kept.id) == "scheduler_timer_p20240528"
+        assert self.partition_of(late.id) == "scheduler_timer_p20240602"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_migration_is_reversible(self) -> None:
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=dt.datetime.now(tz=pytz.utc))
+
+        try:
+            call_command("migrate", "scheduler", "0003", verbosity=0)
+
+            assert not TimerPartitionManager().is_partitioned()
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT url FROM scheduler_timer WHERE id = %s", [timer.id])
+                assert cursor.fetchone() == ("https://example.com",)
+        finally:
+            call_command("migrate", "scheduler", verbosity=0)
+
+        assert TimerPartitionManager().is_partitioned()
+        assert Timer.objects.get(id=timer.id).url == "https://example.com"
+        assert Timer.objects.create(url="https://example.org", run_at=timer.run_at).id > timer.id
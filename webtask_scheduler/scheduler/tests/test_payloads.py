@@ -0,0 +1,93 @@
+import datetime as dt
+import gzip
+import json
+
+import pytest
+from django.utils import timezone
+
+from webtask_scheduler.scheduler.delivery import WebhookRequest
+from webtask_scheduler.scheduler.models import DeadLetter
+from webtask_scheduler.scheduler.models import Payload
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.payloads import Payloads
+from webtask_scheduler.scheduler.serializers import SetTimerInputSerializer
+from webtask_scheduler.scheduler.tasks import expire_payloads
+
+pytestmark = pytest.mark.django_db
+
+
+class TestPayloads:
+    """
+    Test case class for testing the Payloads store.
+    """
+
+    def test_store_skips_empty_post_requests(self) -> None:
+        assert Payloads().store() is None
+        assert Payloads().store("POST", {}, None) is None
+        assert not Payload.objects.exists()
+
+    def test_store_compresses_body(self) -> None:
+        body: dict = {"event": "reminder", "items": list(range(1000))}
+
+        payload_id: int = Payloads().store("PATCH", {"X-Token": "secret"}, body)
+
+        request: WebhookRequest = Payloads().get(payload_id)
+        encoded: bytes = json.dumps(body, separators=(",", ":")).encode()
+        assert (request.method, request.headers, request.size) == ("PATCH", {"X-Token": "secret"}, len(encoded))
+        assert len(request.body) < len(encoded)
+        assert gzip.decompress(request.body) == encoded
+
+    def test_store_many(self) -> None:
+        payload_ids: list[int | None] = Payloads().store_many([{}, {"method": "GET"}, {"body": [1, 2]}])
+
+        assert payload_ids[0] is None
+        requests: dict[int, WebhookRequest] = Payloads().get_many(payload_ids[1:])
+        assert (requests[payload_ids[1]].method, requests[payload_ids[1]].body) == ("GET", None)
+        assert gzip.decompress(requests[payload_ids[2]].body) == b"[1,2]"
+
+    def test_get_missing_payload(self) -> None:
+        assert Payloads().get(999999) is None
+
+    def test_expire_payloads_keeps_the_ones_in_use(self, settings) -> None:
+        settings.TIMER_RETENTION_DAYS = 7
+        payloads: list[Payload] = Payload.objects.bulk_create([Payload(method="GET") for _ in range(5)])
+        Payload.objects.filter(id__in=[payload.id for payload in payloads[:4]]).update(
+            created_at=timezone.now() - dt.timedelta(days=8)
+        )
+        run_at: dt.datetime = timezone.now()
+        Timer.objects.bulk_create(
+            [
+                Timer(url="https://example.com", run_at=run_at, payload_id=payloads[0].id),
+                Timer(
+                    url="https://example.com", run_at=run_at, payload_id=payloads[1].id, status=Timer.Status.SUCCEEDED
+                ),
+            ]
+        )
+        DeadLetter.objects.create(url="https://example.com", attempts=3, error="410", payload_id=payloads[2].id)
+
+        assert expire_payloads() == 2
+
+        assert set(Payload.objects.values_list("id", flat=True)) == {payloads[0].id, payloads[2].id, payloads[4].id}
+
+
+class TestPayloadHeaders:
+    """
+    Test case class for testing the validation of the headers of a payload.
+    """
+
+    @staticmethod
+    def errors(headers: dict[str, str]) -> list[str] | None:
+        serializer = SetTimerInputSerializer(data={"minutes": 5, "web_url": "https://example.com", "headers": headers})
+        serializer.is_valid()
+        return serializer.errors.get("headers")
+
+    def test_valid_headers(self) -> None:
+        assert self.errors({"X-Token": "secret", "Accept": "text/plain;\tq=0.9", "X_Custom.1": "1"}) is None
+
+    @pytest.mark.parametrize("name", ["X-A\r\nB", "X A", "X-A:", "", "X-\u00e9"])
+    def test_invalid_header_names(self, name: str) -> None:
+        assert self.errors({name: "1"}) == [f"These header names are not valid: {name!r}."]
+
+    @pytest.mark.parametrize("value", ["a\r\nX-Injected: 1", "a\nb", "a\rb", "a\x1bb", "a\x7fb"])
+    def test_control_characters_in_header_values(self, value: str) -> None:
+        assert self.errors({"X-A": value}) == ["These headers have control characters in their value: X-A."]
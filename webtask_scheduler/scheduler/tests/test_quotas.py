@@ -0,0 +1,271 @@
+import datetime as dt
+import time
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import DatabaseError
+from django.shortcuts import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from webtask_scheduler.scheduler.dispatcher import TimerDispatcher
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.models import UserQuota
+from webtask_scheduler.scheduler.payloads import Payloads
+from webtask_scheduler.scheduler.quotas import ANONYMOUS_TENANT
+from webtask_scheduler.scheduler.quotas import QuotaExceededError
+from webtask_scheduler.scheduler.quotas import TimerQuotas
+from webtask_scheduler.scheduler.services import TimerService
+from webtask_scheduler.scheduler.timer_queue import DatabaseTimerQueue
+from webtask_scheduler.scheduler.timer_wheel import RedisTimerWheel
+from webtask_scheduler.users.models import User
+from webtask_scheduler.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class TestTimerQuotas:
+    """
+    Test case class for testing the per user quotas of the timers set.
+    """
+
+    @pytest.fixture(autouse=True)
+    def quota_settings(self, settings) -> None:
+        settings.TIMER_USER_QUOTA = 3
+        settings.TIMER_USER_QUOTA_PERIOD = 3600
+
+    @pytest.fixture
+    def api_client(self) -> APIClient:
+        return APIClient()
+
+    @pytest.fixture
+    def user(self) -> User:
+        return UserFactory()
+
+    def test_consume_rejects_timers_over_the_quota(self, user: User) -> None:
+        quotas = TimerQuotas()
+        quotas.consume(user.id, 2)
+
+        with pytest.raises(QuotaExceededError) as exc_info:
+            quotas.consume(user.id, 2)
+
+        assert 0 < exc_info.value.retry_after <= 3600
+        # The rejected timers were not counted, and other users have their own quota.
+        quotas.consume(user.id)
+        quotas.consume(UserFactory().id, 3)
+
+    def test_anonymous_requests_are_not_limited(self, api_client: APIClient) -> None:
+        data: dict = {"minutes": 5, "web_url": "https://example.com"}
+        for _ in range(4):
+            response: Response = api_client.post(reverse("api:scheduler:timer"), data, format="json")
+
+            assert response.status_code == status.HTTP_201_CREATED
+        TimerQuotas().consume(None, 10)
+        assert Timer.objects.filter(user_id=None).count() == 4
+
+    def test_failed_timers_do_not_count_against_the_quota(self, user: User) -> None:
+        svc = TimerService()
+        with patch.object(Payloads, "store", side_effect=DatabaseError), pytest.raises(DatabaseError):
+            svc.set("https://example.com", minutes=5, user_id=user.id)
+        with patch.object(Payloads, "store_many", side_effect=DatabaseError), pytest.raises(DatabaseError):
+            svc.set_many([{"web_url": "https://example.com", "minutes": 5}] * 2, user_id=user.id)
+        with patch.object(Timer.objects, "acreate", side_effect=DatabaseError), pytest.raises(DatabaseError):
+            async_to_sync(svc.aset)("https://example.com", minutes=5, user_id=user.id)
+
+        assert not Timer.objects.exists()
+        TimerQuotas().consume(user.id, 3)
+
+    def test_user_quota_overrides_the_default(self, user: User, settings) -> None:
+        UserQuota.objects.create(user=user, max_timers=0, weight=3)
+        settings.TIMER_USER_QUOTA = 1
+
+        TimerQuotas().consume(user.id, 10)
+
+        assert TimerQuotas().weights([user.id, ANONYMOUS_TENANT]) == {user.id: 3, ANONYMOUS_TENANT: 1}
+
+    def test_set_timer_belongs_to_the_user(self, api_client: APIClient, user: User) -> None:
+        api_client.force_authenticate(user)
+
+        response: Response = api_client.post(
+            reverse("api:scheduler:timer"), {"minutes": 5, "web_url": "https://example.com"}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Timer.objects.get(id=response.data["task_id"]).user_id == user.id
+
+    def test_set_timer_over_the_quota(self, api_client: APIClient, user: User) -> None:
+        api_client.force_authenticate(user)
+        data: dict = {"minutes": 5, "web_url": "https://example.com"}
+        for _ in range(3):
+            api_client.post(reverse("api:scheduler:timer"), data, format="json")
+
+        response: Response = api_client.post(reverse("api:scheduler:timer"), data, format="json")
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response.data["detail"] == "Quota of 3 timers per 3600 seconds exceeded."
+        assert 0 < int(response["Retry-After"]) <= 3600
+        assert Timer.objects.filter(user_id=user.id).count() == 3
+
+    def test_set_timers_in_bulk_over_the_quota(self, api_client: APIClient, user: User) -> None:
+        api_client.force_authenticate(user)
+        timers: list[dict] = [{"minutes": 5, "web_url": "https://example.com"}] * 4
+
+        response: Response = api_client.post(reverse("api:scheduler:timer-bulk"), {"timers": timers}, format="json")
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert not Timer.objects.exists()
+
+
+class TestTimerOwnership:
+    """
+    Test case class for testing that the timers of a user are hidden from the other users.
+    """
+
+    @pytest.fixture
+    def users(self) -> list[User]:
+        return UserFactory.create_batch(2)
+
+    @pytest.fixture
+    def timer(self, users: list[User]) -> Timer:
+        return Timer.objects.create(
+            url="https://example.com", run_at=timezone.now() + dt.timedelta(hours=1), user_id=users[0].id
+        )
+
+    @staticmethod
+    def client_of(user: User | None) -> APIClient:
+        api_client = APIClient()
+        if user is not None:
+            api_client.force_authenticate(user)
+        return api_client
+
+    def test_owner_reads_and_changes_its_timer(self, users: list[User], timer: Timer) -> None:
+        api_client: APIClient = self.client_of(users[0])
+        url: str = reverse("api:scheduler:timer", kwargs={"task_id": timer.id})
+
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+        assert api_client.patch(url, {"minutes": 5}, format="json").status_code == status.HTTP_200_OK
+        assert api_client.delete(url).status_code == status.HTTP_204_NO_CONTENT
+
+    @pytest.mark.parametrize("other", [1, None], ids=["other_user", "anonymous"])
+    def test_timer_of_another_user_is_not_found(self, users: list[User], timer: Timer, other: int | None) -> None:
+        # The owner reads the timer first, so it is cached for the others too.
+        self.client_of(users[0]).get(reverse("api:scheduler:timer", kwargs={"task_id": timer.id}))
+        api_client: APIClient = self.client_of(users[other] if other is not None else None)
+        url: str = reverse("api:scheduler:timer", kwargs={"task_id": timer.id})
+
+        assert api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.patch(url, {"minutes": 5}, format="json").status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.delete(url).status_code == status.HTTP_404_NOT_FOUND
+        result_url: str = reverse("api:scheduler:timer-result", kwargs={"task_id": timer.id})
+        assert api_client.get(result_url).status_code == status.HTTP_404_NOT_FOUND
+        lookup: Response = api_client.post(reverse("api:scheduler:timer-lookup"), {"ids": [timer.id]}, format="json")
+        assert lookup.data == {"timers": [], "missing": [timer.id]}
+        timer.refresh_from_db()
+        assert timer.status == Timer.Status.PENDING
+
+    def test_stream_of_another_user_is_not_found(self, users: list[User], timer: Timer) -> None:
+        url: str = reverse("api:scheduler:timer-stream", kwargs={"task_id": timer.id})
+
+        with patch("webtask_scheduler.scheduler.events.get_redis"):
+            response: Response = self.client_of(users[1]).get(url, HTTP_ACCEPT="text/event-stream")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_anonymous_timer_is_shared(self, users: list[User]) -> None:
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=timezone.now() + dt.timedelta(hours=1))
+        url: str = reverse("api:scheduler:timer", kwargs={"task_id": timer.id})
+
+        assert self.client_of(None).get(url).status_code == status.HTTP_200_OK
+        assert self.client_of(users[1]).get(url).status_code == status.HTTP_200_OK
+
+
+class TestFairDispatch:
+    """
+    Test case class for testing the deficit round-robin dispatch of due timers over their tenants.
+    """
+
+    @pytest.fixture
+    def users(self) -> list[User]:
+        return UserFactory.create_batch(2)
+
+    @pytest.fixture
+    def burst(self, users: list[User]) -> list[Timer]:
+        # The first tenant sets a burst of timers due before the single timer of the second one.
+        now: dt.datetime = timezone.now()
+        burst: list[Timer] = Timer.objects.bulk_create(
+            [
+                Timer(url=f"https://example.com/{i}", run_at=now - dt.timedelta(seconds=10), user_id=users[0].id)
+                for i in range(5)
+            ]
+        )
+        return [*burst, Timer.objects.create(url="https://example.org", run_at=now, user_id=users[1].id)]
+
+    @staticmethod
+    def published(publish_deliveries: MagicMock) -> list[int]:
+        return [timer[0] for call in publish_deliveries.call_args_list for timer in call.args[0]]
+
+    @patch("webtask_scheduler.scheduler.dispatcher.publish_deliveries")
+    def test_burst_of_a_tenant_does_not_delay_the_others(
+        self, publish_deliveries: MagicMock, burst: list[Timer]
+    ) -> None:
+        assert TimerDispatcher(batch_size=2).dispatch_once() == 6
+
+        assert self.published(publish_deliveries) == [timer.id for timer in (*burst[:2], burst[5], *burst[2:5])]
+        assert not Timer.objects.filter(status=Timer.Status.PENDING).exists()
+
+    @patch("webtask_scheduler.scheduler.dispatcher.publish_deliveries")
+    def test_tenants_get_quantums_by_weight(
+        self, publish_deliveries: MagicMock, users: list[User], burst: list[Timer]
+    ) -> None:
+        UserQuota.objects.create(user=users[0], weight=2)
+
+        TimerDispatcher(batch_size=2).dispatch_once()
+
+        assert self.published(publish_deliveries) == [timer.id for timer in (*burst[:4], burst[5], burst[4])]
+
+    @patch("webtask_scheduler.scheduler.dispatcher.publish_deliveries")
+    def test_catch_up_rate_is_shared_between_tenants(
+        self, publish_deliveries: MagicMock, users: list[User], settings
+    ) -> None:
+        settings.TIMER_CATCHUP_RATE = 4
+        run_at: dt.datetime = timezone.now() - dt.timedelta(minutes=10)
+        Timer.objects.bulk_create(
+            [Timer(url="https://example.com", run_at=run_at, user_id=user.id) for user in users for _ in range(4)]
+        )
+
+        assert TimerDispatcher(batch_size=10).dispatch_once() == 4
+
+        assert sorted(Timer.objects.filter(status=Timer.Status.QUEUED).values_list("user_id", flat=True)) == sorted(
+            [users[0].id, users[0].id, users[1].id, users[1].id]
+        )
+
+    def test_database_queue_pops_a_single_tenant(self, users: list[User], burst: list[Timer]) -> None:
+        queue = DatabaseTimerQueue()
+        Timer.objects.create(url="https://example.net", run_at=timezone.now())
+
+        assert set(queue.due_tenants(time.time())) == {users[0].id, users[1].id, ANONYMOUS_TENANT}
+        assert [timer.task_id for timer in queue.pop_due(time.time(), limit=10, tenant=users[1].id)] == [burst[5].id]
+        assert [timer.url for timer in queue.pop_due(time.time(), limit=10, tenant=ANONYMOUS_TENANT)] == [
+            "https://example.net"
+        ]
+
+    def test_timer_wheel_finds_the_lane_of_a_timer(self) -> None:
+        with patch("webtask_scheduler.scheduler.timer_wheel.get_redis") as get_redis:
+            redis: MagicMock = get_redis.return_value
+            redis.hmget.return_value = [b'["https://example.com", null, null, "", null, 7]', None]
+            wheel = RedisTimerWheel(shards=1)
+            wheel.add_many([(1, "https://example.com", timezone.now(), None, None, "", None, 7)])
+            wheel.remove_many([1, 2])
+
+        pipeline: MagicMock = redis.pipeline.return_value
+        assert [call.args[0] for call in pipeline.zadd.call_args_list] == [
+            "scheduler:timers:due:7",
+            "scheduler:timers:tenants",
+        ]
+        assert pipeline.zadd.call_args.kwargs == {"lt": True}
+        pipeline.zrem.assert_called_once_with("scheduler:timers:due:7", "1")
+        pipeline.hdel.assert_called_once_with("scheduler:timers:deliveries", "1", "2")
@@ -0,0 +1,47 @@
+import datetime as dt
+
+import pytest
+import pytz
+
+from webtask_scheduler.scheduler.recurrence import next_run_at
+from webtask_scheduler.scheduler.recurrence import parse_cron
+
+
+class TestRecurrence:
+    """
+    Test case class for testing the next occurrences of recurring timers.
+    """
+
+    run_at = dt.datetime(2024, 5, 30, 9, 0, 0, 125000, tzinfo=pytz.utc)
+
+    def test_next_interval_occurrence(self) -> None:
+        assert next_run_at(self.run_at, self.run_at, interval_seconds=60) == self.run_at + dt.timedelta(minutes=1)
+        # Timers popped ahead of their run time by the dispatcher lookahead.
+        early: dt.datetime = self.run_at - dt.timedelta(milliseconds=400)
+        assert next_run_at(self.run_at, early, interval_seconds=60) == self.run_at + dt.timedelta(minutes=1)
+
+    def test_next_interval_occurrence_skips_missed_ones(self) -> None:
+        late: dt.datetime = self.run_at + dt.timedelta(seconds=125)
+
+        assert next_run_at(self.run_at, late, interval_seconds=60) == self.run_at + dt.timedelta(minutes=3)
+
+    @pytest.mark.parametrize(
+        ("cron", "expected"),
+        [
+            ("*/15 * * * *", dt.datetime(2024, 5, 30, 9, 15, tzinfo=pytz.utc)),
+            ("0 9 * * *", dt.datetime(2024, 5, 31, 9, 0, tzinfo=pytz.utc)),
+            ("30 8 * * mon", dt.datetime(2024, 6, 3, 8, 30, tzinfo=pytz.utc)),
+        ],
+    )
+    def test_next_cron_occurrence(self, cron: str, expected: dt.datetime) -> None:
+        assert next_run_at(self.run_at, self.run_at, cron=cron) == expected
+
+    def test_next_cron_occurrence_skips_missed_ones(self) -> None:
+        late: dt.datetime = self.run_at + dt.timedelta(days=2, minutes=1)
+
+        assert next_run_at(self.run_at, late, cron="0 9 * * *") == dt.datetime(2024, 6, 2, 9, 0, tzinfo=pytz.utc)
+
+    @pytest.mark.parametrize("cron", ["* * * *", "61 * * * *", "*/0 * * * *", "0 9 * * someday"])
+    def test_parse_invalid_cron(self, cron: str) -> None:
+        with pytest.raises(ValueError, match="cron expression"):
+            parse_cron(cron)
@@ -1,14 +1,21 @@
 import datetime as dt
+from unittest.mock import MagicMock
 from unittest.mock import patch
 
 import pytest
 import pytz
 import time_machine
+from django.core.cache import cache
 from django.utils import timezone
-from django_celery_beat.models import ClockedSchedule
-from django_celery_beat.models import PeriodicTask
 
+from webtask_scheduler.scheduler.idempotency import IdempotencyKeys
+from webtask_scheduler.scheduler.models import IdempotencyKey
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.services import TimerNotPendingError
 from webtask_scheduler.scheduler.services import TimerService
+from webtask_scheduler.scheduler.tasks import expire_idempotency_keys
+from webtask_scheduler.users.models import User
+from webtask_scheduler.users.tests.factories import UserFactory
 
 pytestmark = pytest.mark.django_db
 
@@ -26,28 +33,149 @@ class TestTimerService:
 
         assert data["time_left_in_seconds"] == 60
         assert mock_logger.call_count == 2
-        PeriodicTask.objects.count() == 1
-        PeriodicTask.objects.last().id == data["task_id"]
+        timer: Timer = Timer.objects.get()
+        assert timer.id == data["task_id"]
+        assert timer.url == "https://example.com"
+        assert timer.status == Timer.Status.PENDING
+
+    @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc))
+    @patch("logging.Logger.info")
+    def test_set_many_timers(self, mock_logger) -> None:
+        service: TimerService = TimerService()
+        data: list[dict] = service.set_many(
+            timers=[
+                {"hours": 0, "minutes": 1, "seconds": 0, "web_url": "https://example.com"},
+                {"hours": 0, "minutes": 0, "seconds": 30, "web_url": "https://example.org"},
+            ]
+        )
+
+        assert [item["time_left_in_seconds"] for item in data] == [60, 30]
+        assert mock_logger.call_count == 2
+        assert Timer.objects.count() == 2
+        assert Timer.objects.get(id=data[1]["task_id"]).url == "https://example.org"
+
+    @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc))
+    def test_set_many_duplicated_timers(self) -> None:
+        service: TimerService = TimerService()
+        timer: dict = {"hours": 0, "minutes": 1, "seconds": 0, "web_url": "https://example.com", "max_attempts": 3}
+        data: list[dict] = service.set_many(timers=[timer, timer])
+
+        assert len({item["task_id"] for item in data}) == 2
+        assert list(Timer.objects.values_list("url", "max_attempts")) == [("https://example.com", 3)] * 2
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_set_short_timer_published_with_eta(self, apply_async, django_capture_on_commit_callbacks) -> None:
+        service: TimerService = TimerService()
+        with django_capture_on_commit_callbacks(execute=True):
+            data: dict = service.set(hours=0, minutes=0, seconds=10, web_url="https://example.com")
+
+        timer: Timer = Timer.objects.get(id=data["task_id"])
+        assert timer.status == Timer.Status.QUEUED
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs["args"] == ["https://example.com"]
+        assert apply_async.call_args.kwargs["eta"] == timer.run_at
+        assert service.get(task_id=timer.id)["time_left_in_seconds"] > 0
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_set_long_timer_left_to_dispatcher(self, apply_async, django_capture_on_commit_callbacks) -> None:
+        service: TimerService = TimerService()
+        with django_capture_on_commit_callbacks(execute=True):
+            data: dict = service.set(hours=1, minutes=0, seconds=0, web_url="https://example.com")
+
+        assert Timer.objects.get(id=data["task_id"]).status == Timer.Status.PENDING
+        apply_async.assert_not_called()
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_request_to_url.apply_async")
+    def test_set_many_timers_splits_short_and_long(self, apply_async, django_capture_on_commit_callbacks) -> None:
+        service: TimerService = TimerService()
+        with django_capture_on_commit_callbacks(execute=True):
+            data: list[dict] = service.set_many(
+                timers=[
+                    {"hours": 0, "minutes": 0, "seconds": 10, "web_url": "https://example.com"},
+                    {"hours": 1, "minutes": 0, "seconds": 0, "web_url": "https://example.org"},
+                ]
+            )
+
+        assert Timer.objects.get(id=data[0]["task_id"]).status == Timer.Status.QUEUED
+        assert Timer.objects.get(id=data[1]["task_id"]).status == Timer.Status.PENDING
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs["args"] == ["https://example.com"]
+
+    @patch("webtask_scheduler.scheduler.dispatcher.send_requests_to_urls.apply_async")
+    def test_set_many_short_timers_sharing_run_time_are_batched(
+        self, batch_apply_async, django_capture_on_commit_callbacks
+    ) -> None:
+        service: TimerService = TimerService()
+        timer: dict = {"hours": 0, "minutes": 0, "seconds": 10, "web_url": "https://example.com"}
+        with django_capture_on_commit_callbacks(execute=True):
+            data: list[dict] = service.set_many(timers=[timer, timer, timer])
+
+        batch_apply_async.assert_called_once()
+        run_at: float = batch_apply_async.call_args.kwargs["eta"].timestamp()
+        assert batch_apply_async.call_args.kwargs["args"] == [
+            [[item["task_id"], "https://example.com", None, run_at, None] for item in data]
+        ]
 
     @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc))
     @patch("logging.Logger.info")
     def test_get_timer(self, mock_logger) -> None:
         time_now: dt.datetime = timezone.now().replace(tzinfo=pytz.utc)
         run_at: dt.datetime = time_now + timezone.timedelta(hours=0, minutes=1, seconds=0)
-        task: PeriodicTask = PeriodicTask.objects.create(
-            clocked=ClockedSchedule.objects.create(clocked_time=run_at),
-            name="Get request to https://example.com at 2022-01-01 00:00:00",
-            task="webtask_scheduler.scheduler.tasks.send_request_to_url",
-            one_off=True,
-            args='["https://example.com"]',
-        )
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=run_at)
         service: TimerService = TimerService()
-        data: dict = service.get(task_id=task.id)
+        data: dict = service.get(task_id=timer.id)
 
         assert data["time_left_in_seconds"] == 60
-        assert data["task_id"] == task.id
+        assert data["task_id"] == timer.id
         assert mock_logger.call_count == 1
 
+    @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc))
+    def test_get_timer_served_from_cache(self, django_assert_num_queries, django_capture_on_commit_callbacks) -> None:
+        service: TimerService = TimerService()
+        # The cache is only populated once the timer is committed.
+        with django_capture_on_commit_callbacks(execute=True):
+            data: dict = service.set(hours=0, minutes=1, seconds=0, web_url="https://example.com")
+
+        with django_assert_num_queries(0):
+            assert service.get(task_id=data["task_id"])["time_left_in_seconds"] == 60
+
+    def test_get_timer_cache_invalidated_on_delete(self, django_capture_on_commit_callbacks) -> None:
+        service: TimerService = TimerService()
+        with django_capture_on_commit_callbacks(execute=True):
+            data: dict = service.set(hours=0, minutes=1, seconds=0, web_url="https://example.com")
+        Timer.objects.get(id=data["task_id"]).delete()
+
+        with pytest.raises(ValueError):
+            service.get(task_id=data["task_id"])
+
+    @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc), tick=False)
+    def test_get_many_timers(self, django_assert_num_queries, django_capture_on_commit_callbacks) -> None:
+        service: TimerService = TimerService()
+        with django_capture_on_commit_callbacks(execute=True):
+            cached: dict = service.set(hours=0, minutes=1, seconds=0, web_url="https://example.com")
+        uncached: list[Timer] = Timer.objects.bulk_create(
+            [
+                Timer(url="https://example.org", run_at=timezone.now() + timezone.timedelta(minutes=2)),
+                Timer(url="https://example.net", run_at=timezone.now() - timezone.timedelta(minutes=2)),
+            ]
+        )
+
+        with django_assert_num_queries(1):
+            data: dict = service.get_many(task_ids=[uncached[0].id, 999999, cached["task_id"], uncached[1].id, 999999])
+
+        assert data == {
+            "timers": [
+                {"task_id": uncached[0].id, "time_left_in_seconds": 120, "time_left_in_milliseconds": 120000},
+                {"task_id": cached["task_id"], "time_left_in_seconds": 60, "time_left_in_milliseconds": 60000},
+                {"task_id": uncached[1].id, "time_left_in_seconds": 0, "time_left_in_milliseconds": 0},
+            ],
+            "missing": [999999],
+        }
+        with django_assert_num_queries(1):
+            service.get_many(task_ids=[cached["task_id"], uncached[0].id, uncached[1].id, 999999])
+        with django_assert_num_queries(0):
+            service.get_many(task_ids=[cached["task_id"], uncached[0].id, uncached[1].id])
+
     @patch("logging.Logger.error")
     def test_get_timer_id_not_found(self, mock_logger) -> None:
         service: TimerService = TimerService()
@@ -55,3 +183,194 @@ class TestTimerService:
             service.get(task_id=999999)
 
         assert mock_logger.call_count == 1
+
+
+class TestTimerServiceChanges:
+    """
+    Test case class for testing the rescheduling and cancellation of timers by the TimerService.
+    """
+
+    @pytest.fixture
+    def timer(self) -> Timer:
+        return Timer.objects.create(url="https://example.com", run_at=timezone.now() + timezone.timedelta(hours=1))
+
+    @pytest.fixture
+    def wheel(self, settings) -> MagicMock:
+        settings.TIMER_DISPATCH_BACKEND = "redis"
+        with patch("webtask_scheduler.scheduler.services.RedisTimerWheel") as wheel_class:
+            yield wheel_class.return_value
+
+    @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc), tick=False)
+    def test_reschedule_timer(self, timer: Timer, wheel: MagicMock, django_capture_on_commit_callbacks) -> None:
+        service: TimerService = TimerService()
+        with django_capture_on_commit_callbacks(execute=True):
+            data: dict = service.reschedule(task_id=str(timer.id), hours=0, minutes=5, seconds=0)
+
+        run_at: dt.datetime = dt.datetime(2024, 5, 31, 1, 29, tzinfo=pytz.utc)
+        assert data == {"task_id": timer.id, "time_left_in_seconds": 300, "time_left_in_milliseconds": 300000}
+        timer.refresh_from_db()
+        assert (timer.run_at, timer.status) == (run_at, Timer.Status.PENDING)
+        wheel.reschedule.assert_called_once_with(timer.id, run_at)
+        assert service.get(task_id=timer.id)["time_left_in_seconds"] == 300
+
+    def test_cancel_timer(self, timer: Timer, wheel: MagicMock, django_capture_on_commit_callbacks) -> None:
+        service: TimerService = TimerService()
+        service.get(task_id=timer.id)
+        with django_capture_on_commit_callbacks(execute=True):
+            service.cancel(task_id=timer.id)
+
+        timer.refresh_from_db()
+        assert timer.status == Timer.Status.CANCELED
+        assert timer.completed_at is not None
+        wheel.remove_many.assert_called_once_with([timer.id])
+        with pytest.raises(ValueError):
+            service.get(task_id=timer.id)
+        with pytest.raises(ValueError):
+            service.cancel(task_id=timer.id)
+
+    @pytest.mark.parametrize("status", [Timer.Status.SUCCEEDED, Timer.Status.FAILED])
+    def test_change_fired_timer(self, timer: Timer, status: Timer.Status) -> None:
+        Timer.objects.filter(id=timer.id).update(status=status)
+        service: TimerService = TimerService()
+
+        with pytest.raises(TimerNotPendingError):
+            service.cancel(task_id=timer.id)
+        with pytest.raises(TimerNotPendingError):
+            service.reschedule(task_id=timer.id, hours=1, minutes=0, seconds=0)
+
+    def test_change_queued_timer(self, timer: Timer) -> None:
+        Timer.objects.filter(id=timer.id).update(status=Timer.Status.QUEUED)
+        service: TimerService = TimerService()
+
+        with pytest.raises(TimerNotPendingError):
+            service.reschedule(task_id=timer.id, hours=1, minutes=0, seconds=0)
+        service.cancel(task_id=timer.id)
+
+        timer.refresh_from_db()
+        assert timer.status == Timer.Status.CANCELED
+
+    @pytest.mark.parametrize("task_id", [999999, "not-an-id"])
+    def test_change_timer_not_found(self, task_id: int | str) -> None:
+        with pytest.raises(ValueError, match="does not exist"):
+            TimerService().cancel(task_id=task_id)
+
+    def test_cancel_many_timers(self, settings, django_capture_on_commit_callbacks) -> None:
+        settings.TIMER_BULK_MAX_SIZE = 2
+        run_at: dt.datetime = timezone.now() + timezone.timedelta(hours=1)
+        timers: list[Timer] = Timer.objects.bulk_create(
+            [Timer(url=f"https://runaway.com/{i}", run_at=run_at) for i in range(3)]
+            + [
+                Timer(url="https://runaway.com/fired", run_at=run_at, status=Timer.Status.SUCCEEDED),
+                Timer(url="https://example.com", run_at=run_at),
+            ]
+        )
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            canceled: int = TimerService().cancel_many(url_prefix="https://runaway.com/")
+
+        assert canceled == 3
+        assert len(callbacks) == 2
+        assert list(Timer.objects.order_by("id").values_list("status", flat=True)) == [
+            Timer.Status.CANCELED,
+            Timer.Status.CANCELED,
+            Timer.Status.CANCELED,
+            Timer.Status.SUCCEEDED,
+            Timer.Status.PENDING,
+        ]
+        assert TimerService().cancel_many(created_before=timers[0].created_at) == 0
+
+
+class TestTimerServiceIdempotency:
+    """
+    Test case class for testing the idempotency keys of the TimerService.
+    """
+
+    def set_timer(self, idempotency_key: str, django_capture_on_commit_callbacks, user_id: int | None = None) -> dict:
+        with django_capture_on_commit_callbacks(execute=True):
+            return TimerService().set(
+                hours=0,
+                minutes=5,
+                seconds=0,
+                web_url="https://example.com",
+                user_id=user_id,
+                idempotency_key=idempotency_key,
+            )
+
+    def test_set_timer_replayed(self, django_assert_num_queries, django_capture_on_commit_callbacks) -> None:
+        data: dict = self.set_timer("order-1", django_capture_on_commit_callbacks)
+
+        with django_assert_num_queries(0):
+            replayed: dict = self.set_timer("order-1", django_capture_on_commit_callbacks)
+        cache.clear()
+        with django_assert_num_queries(1):
+            stored: dict = self.set_timer("order-1", django_capture_on_commit_callbacks)
+
+        assert "replayed" not in data
+        assert replayed["task_id"] == stored["task_id"] == data["task_id"]
+        assert replayed["replayed"] and stored["replayed"]
+        assert Timer.objects.count() == IdempotencyKey.objects.count() == 1
+        assert self.set_timer("order-2", django_capture_on_commit_callbacks)["task_id"] != data["task_id"]
+
+    def test_set_timer_concurrent_key(self, django_capture_on_commit_callbacks) -> None:
+        winner: Timer = Timer.objects.create(url="https://example.com", run_at=timezone.now())
+        IdempotencyKey.objects.create(key="order-1", task_id=winner.id, run_at=winner.run_at)
+
+        # The key was stored by a concurrent request after this one looked it up.
+        with patch.object(IdempotencyKeys, "get", side_effect=[None, (winner.id, winner.run_at)]):
+            data: dict = self.set_timer("order-1", django_capture_on_commit_callbacks)
+
+        assert data == {
+            "task_id": winner.id,
+            "time_left_in_seconds": 0,
+            "time_left_in_milliseconds": 0,
+            "replayed": True,
+        }
+        assert Timer.objects.count() == 1
+
+    def test_keys_are_scoped_by_user(self, django_capture_on_commit_callbacks) -> None:
+        users: list[User] = UserFactory.create_batch(2)
+
+        anonymous: dict = self.set_timer("order-1", django_capture_on_commit_callbacks)
+        first: dict = self.set_timer("order-1", django_capture_on_commit_callbacks, users[0].id)
+        second: dict = self.set_timer("order-1", django_capture_on_commit_callbacks, users[1].id)
+        replayed: dict = self.set_timer("order-1", django_capture_on_commit_callbacks, users[1].id)
+
+        assert len({anonymous["task_id"], first["task_id"], second["task_id"]}) == 3
+        assert "replayed" not in first and "replayed" not in second
+        assert replayed["task_id"] == second["task_id"]
+        assert IdempotencyKey.objects.count() == 3
+        cache.clear()
+        assert IdempotencyKeys().get("order-1", users[0].id)[0] == first["task_id"]
+
+    def test_replayed_timers_do_not_count_against_the_quota(self, settings, django_capture_on_commit_callbacks) -> None:
+        settings.TIMER_USER_QUOTA = 1
+        user: User = UserFactory()
+        winner: Timer = Timer.objects.create(url="https://example.com", run_at=timezone.now(), user_id=user.id)
+        IdempotencyKey.objects.create(key="order-1", user_id=user.id, task_id=winner.id, run_at=winner.run_at)
+
+        # The key was stored by a concurrent request after this one looked it up.
+        with patch.object(IdempotencyKeys, "get", side_effect=[None, (winner.id, winner.run_at)]):
+            data: dict = self.set_timer("order-1", django_capture_on_commit_callbacks, user.id)
+
+        assert data["replayed"]
+        # The quota counted for the replayed request was given back.
+        assert "replayed" not in self.set_timer("order-2", django_capture_on_commit_callbacks, user.id)
+
+    def test_expired_key_reused(self, settings, django_capture_on_commit_callbacks) -> None:
+        data: dict = self.set_timer("order-1", django_capture_on_commit_callbacks)
+        IdempotencyKey.objects.update(created_at=timezone.now() - timezone.timedelta(days=2))
+        cache.clear()
+
+        reused: dict = self.set_timer("order-1", django_capture_on_commit_callbacks)
+
+        assert reused["task_id"] != data["task_id"]
+        assert "replayed" not in reused
+        assert list(IdempotencyKey.objects.values_list("task_id", flat=True)) == [reused["task_id"]]
+
+    def test_delete_expired_keys(self) -> None:
+        IdempotencyKey.objects.create(key="fresh", task_id=1, run_at=timezone.now())
+        IdempotencyKey.objects.create(key="expired", task_id=2, run_at=timezone.now())
+        IdempotencyKey.objects.filter(key="expired").update(created_at=timezone.now() - timezone.timedelta(days=2))
+
+        assert expire_idempotency_keys() == 1
+        assert list(IdempotencyKey.objects.values_list("key", flat=True)) == ["fresh"]
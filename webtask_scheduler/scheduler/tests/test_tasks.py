@@ -1,77 +1,340 @@
+import json
+import time
 from unittest.mock import patch
 
 import pytest
-import requests
+from celery.exceptions import Retry
+from django.utils import timezone
 
+from webtask_scheduler.scheduler.delivery import DeliveryResult
+from webtask_scheduler.scheduler.delivery import WebhookRequest
+from webtask_scheduler.scheduler.models import DeadLetter
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.payloads import Payloads
 from webtask_scheduler.scheduler.tasks import send_request_to_url
+from webtask_scheduler.scheduler.tasks import send_requests_to_urls
+from webtask_scheduler.scheduler.throttle import Lease
 
 pytestmark = pytest.mark.django_db
 
 
-class MockResponse:
-    def __init__(self, json_data: dict = {}, status_code: int = 200, reason: str = None):
-        self.data = json_data
-        self.status_code = status_code
-        self.reason = reason or "dummy reason"
+class TestTasks:
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_success(self, engine_mock: patch) -> None:
+        """Test sending a request to a URL successfully."""
+        # Arrange
+        url = "https://webhook.com"
+        engine_mock.return_value.deliver.return_value = DeliveryResult(url, 200, '{"message": "Success"}', None, 0.1)
 
-    @property
-    def text(self) -> dict:
-        return self.data
+        # Act
+        result = send_request_to_url(url)
+
+        # Assert
+        assert result == '{"message": "Success"}'
+        engine_mock.return_value.deliver.assert_called_once_with(url, None)
 
-    def raise_for_status(self) -> None:
-        http_error_msg = ""
-        if 400 <= self.status_code < 500:
-            http_error_msg = f"{self.status_code} Error: {self.reason}"
-        elif 500 <= self.status_code < 600:
-            http_error_msg = f"{self.status_code} Server Error: {self.reason}"
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_with_payload(self, engine_mock: patch) -> None:
+        """Test the payload of the timer is loaded and sent, and kept on its dead letter."""
+        # Arrange
+        url = "https://webhook.com"
+        payload_id: int = Payloads().store("PUT", {"X-Token": "secret"}, {"id": 1})
+        engine_mock.return_value.deliver.return_value = DeliveryResult(url, 410, "", "410 Error", 0.1)
 
-        if http_error_msg:
-            raise requests.exceptions.HTTPError(http_error_msg, response=self)
+        # Act
+        send_request_to_url(url, payload_id=payload_id)
 
+        # Assert
+        ((_, request), _) = engine_mock.return_value.deliver.call_args
+        assert isinstance(request, WebhookRequest)
+        assert (request.method, request.headers, request.size) == ("PUT", {"X-Token": "secret"}, 8)
+        assert DeadLetter.objects.get().payload_id == payload_id
 
-class TestTasks:
-    @patch("webtask_scheduler.scheduler.tasks.requests.post")
-    def test_send_request_to_url_success(self, requests_mock: patch) -> None:
-        """Test sending a request to a URL successfully."""
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_records_outcome(self, engine_mock: patch) -> None:
+        """Test the outcome of the delivery is stored on the timer."""
         # Arrange
-        url = "https://webhook.com"
-        requests_mock.return_value = MockResponse(json_data={"message": "Success"}, status_code=200)
+        timer = Timer.objects.create(url="https://webhook.com", run_at=timezone.now(), status=Timer.Status.QUEUED)
+        engine_mock.return_value.deliver.return_value = DeliveryResult(timer.url, 204, "", None, 0.1)
 
         # Act
-        result = send_request_to_url(url)
+        send_request_to_url(timer.url, task_id=timer.id, attempt=2)
 
         # Assert
-        assert result == {"message": "Success"}
+        timer.refresh_from_db()
+        assert (timer.status, timer.attempts, timer.status_code, timer.error) == (Timer.Status.SUCCEEDED, 2, 204, "")
+        assert timer.completed_at is not None
+        assert (timer.response_ms, timer.response_digest) == (100, "")
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_keeps_recurring_timers_pending(self, engine_mock: patch) -> None:
+        """Test only the outcome of the last occurrence is stored on a recurring timer."""
+        # Arrange
+        timer = Timer.objects.create(url="https://webhook.com", run_at=timezone.now(), interval_seconds=60)
+        engine_mock.return_value.deliver.return_value = DeliveryResult(timer.url, 200, "", None, 0.1)
 
-    @patch("webtask_scheduler.scheduler.tasks.requests.post")
+        # Act
+        send_request_to_url(timer.url, task_id=timer.id)
+
+        # Assert
+        timer.refresh_from_db()
+        assert (timer.status, timer.attempts, timer.status_code) == (Timer.Status.PENDING, 1, 200)
+
+    def test_delivery_results_are_not_stored_in_the_backend(self) -> None:
+        """Test deliveries only record their outcome on the timer, see TIMER_DELIVERY_RESULTS."""
+        assert send_request_to_url.ignore_result
+        assert send_requests_to_urls.ignore_result
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_records_lateness(self, engine_mock: patch) -> None:
+        """Test the lateness of the first attempt is stored on the timer."""
+        # Arrange
+        timer = Timer.objects.create(url="https://webhook.com", run_at=timezone.now(), status=Timer.Status.QUEUED)
+        engine_mock.return_value.deliver.return_value = DeliveryResult(timer.url, 204, "", None, 0.1)
+
+        # Act
+        send_request_to_url(timer.url, task_id=timer.id, run_at=time.time() - 0.25)
+
+        # Assert
+        timer.refresh_from_db()
+        assert 250 <= timer.lateness_ms < 1000
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
     @patch("logging.Logger.error")
-    def test_send_request_to_url_failure(self, mock_logger: patch, requests_mock: patch) -> None:
-        """Test sending a request to a URL that returns an error."""
+    def test_send_request_to_url_failure(self, mock_logger: patch, engine_mock: patch) -> None:
+        """Test a request rejected by the URL is not retried and becomes a dead letter."""
         # Arrange
         url = "https://webhook.com"
-        expected_error = "Internal Server Error"
-        requests_mock.side_effect = requests.exceptions.HTTPError(expected_error)
+        expected_error = "404 Error: Not Found for url: https://webhook.com"
+        engine_mock.return_value.deliver.return_value = DeliveryResult(url, 404, "", expected_error, 0.1)
 
         # Act
-        result = send_request_to_url(url)
+        with patch.object(send_request_to_url, "retry") as retry_mock:
+            result = send_request_to_url(url, task_id=7)
 
         # Assert
         assert result == {"error": expected_error}
         mock_logger.assert_called_once()
+        retry_mock.assert_not_called()
+        dead_letter = DeadLetter.objects.get()
+        assert (dead_letter.task_id, dead_letter.url, dead_letter.attempts, dead_letter.status_code) == (7, url, 1, 404)
+        assert dead_letter.error == expected_error
+
+    @pytest.mark.parametrize(
+        "result",
+        [
+            DeliveryResult("https://webhook.com", 500, "", "500 Error", 0.1),
+            DeliveryResult("https://webhook.com", 429, "", "429 Error", 0.1),
+            DeliveryResult("https://webhook.com", None, None, "TimeoutError", 10),
+        ],
+    )
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_retries(self, engine_mock: patch, result: DeliveryResult, settings) -> None:
+        """Test server errors, throttling responses and timeouts are retried on the retry queue."""
+        # Arrange
+        settings.TIMER_RETRY_BACKOFF_BASE = 2
+        engine_mock.return_value.deliver.return_value = result
+
+        # Act
+        with patch.object(send_request_to_url, "retry", side_effect=Retry) as retry_mock, pytest.raises(Retry):
+            send_request_to_url("https://webhook.com", task_id=7, attempt=2)
+
+        # Assert
+        retry_mock.assert_called_once()
+        kwargs = retry_mock.call_args.kwargs
+        assert kwargs["kwargs"] == {
+            "task_id": 7,
+            "max_attempts": None,
+            "attempt": 3,
+            "lateness_ms": None,
+            "payload_id": None,
+        }
+        assert kwargs["queue"] == settings.TIMER_RETRY_QUEUE
+        assert kwargs["max_retries"] is None
+        assert 0 <= kwargs["countdown"] <= 4
+        assert not DeadLetter.objects.exists()
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_honours_retry_after(self, engine_mock: patch) -> None:
+        """Test the retry never comes sooner than the Retry-After of the response."""
+        engine_mock.return_value.deliver.return_value = DeliveryResult("https://webhook.com", 503, "", "503", 0.1, 120)
+
+        with patch.object(send_request_to_url, "retry", side_effect=Retry) as retry_mock, pytest.raises(Retry):
+            send_request_to_url("https://webhook.com")
 
-    @patch("webtask_scheduler.scheduler.tasks.requests.post")
+        assert retry_mock.call_args.kwargs["countdown"] >= 120
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
     @patch("logging.Logger.error")
-    def test_send_request_to_url_timeout(self, mock_logger: patch, requests_mock: patch) -> None:
-        """Test sending a request to a URL that times out."""
+    def test_send_request_to_url_attempts_exhausted(self, mock_logger: patch, engine_mock: patch) -> None:
+        """Test the last allowed attempt stores a dead letter instead of retrying."""
         # Arrange
         url = "https://webhook.com"
-        expected_error = "Request timed out"
-
-        requests_mock.side_effect = requests.exceptions.Timeout(expected_error)
+        expected_error = "TimeoutError"
+        engine_mock.return_value.deliver.return_value = DeliveryResult(url, None, None, expected_error, 10)
 
         # Act
-        result = send_request_to_url(url)
+        with patch.object(send_request_to_url, "retry") as retry_mock:
+            result = send_request_to_url(url, task_id=7, max_attempts=3, attempt=3)
 
         # Assert
         assert result == {"error": expected_error}
         mock_logger.assert_called_once()
+        retry_mock.assert_not_called()
+        dead_letter = DeadLetter.objects.get()
+        assert (dead_letter.attempts, dead_letter.status_code, dead_letter.error) == (3, None, expected_error)
+
+    @patch("webtask_scheduler.scheduler.tasks.send_request_to_url.apply_async")
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    @patch("logging.Logger.error")
+    def test_send_requests_to_urls(self, mock_logger: patch, engine_mock: patch, apply_async_mock: patch) -> None:
+        """Test sending a batch of requests concurrently."""
+        # Arrange
+        timers = [
+            [1, "https://webhook.com", None, None, None],
+            [2, "https://webhook.org", 4, None, None],
+            [3, "https://webhook.net", None, None, None],
+        ]
+        Timer.objects.bulk_create(
+            [
+                Timer(id=task_id, url=url, run_at=timezone.now(), status=Timer.Status.QUEUED)
+                for task_id, url, *_ in timers
+            ]
+        )
+        engine_mock.return_value.deliver_many.return_value = [
+            DeliveryResult("https://webhook.com", 200, "ok", None, 0.1),
+            DeliveryResult("https://webhook.org", None, None, "TimeoutError", 10),
+            DeliveryResult("https://webhook.net", 410, "", "410 Error", 0.1),
+        ]
+
+        # Act
+        result = send_requests_to_urls(timers)
+
+        # Assert
+        engine_mock.return_value.deliver_many.assert_called_once_with(
+            ["https://webhook.com", "https://webhook.org", "https://webhook.net"], [None, None, None]
+        )
+        assert result == [
+            {"task_id": 1, "status_code": 200, "error": None},
+            {"task_id": 2, "status_code": None, "error": "TimeoutError"},
+            {"task_id": 3, "status_code": 410, "error": "410 Error"},
+        ]
+        apply_async_mock.assert_called_once()
+        assert apply_async_mock.call_args.kwargs["args"] == ["https://webhook.org"]
+        assert apply_async_mock.call_args.kwargs["kwargs"] == {
+            "task_id": 2,
+            "max_attempts": 4,
+            "attempt": 2,
+            "lateness_ms": None,
+            "payload_id": None,
+        }
+        mock_logger.assert_called_once()
+        assert list(DeadLetter.objects.values_list("task_id", "status_code")) == [(3, 410)]
+        assert list(Timer.objects.order_by("id").values_list("status", "status_code")) == [
+            (Timer.Status.SUCCEEDED, 200),
+            (Timer.Status.QUEUED, None),
+            (Timer.Status.FAILED, 410),
+        ]
+        assert Timer.objects.values_list("response_ms", "response_digest").get(id=1) == (100, "2689367b205c16ce")
+
+
+class TestTasksWithHostThrottle:
+    @pytest.fixture(autouse=True)
+    def throttle_mock(self, settings):
+        settings.TIMER_HOST_THROTTLE = True
+        with patch("webtask_scheduler.scheduler.tasks.HostThrottle") as throttle_class:
+            yield throttle_class.return_value
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_releases_lease(self, engine_mock: patch, throttle_mock: patch) -> None:
+        """Test the host slot is given back with the response status."""
+        url = "https://webhook.com"
+        lease = Lease("webhook.com", "lease-id", 0)
+        throttle_mock.acquire.return_value = lease
+        engine_mock.return_value.deliver.return_value = DeliveryResult(url, 429, "", "429 Error", 0.1, 30)
+
+        with patch.object(send_request_to_url, "retry", side_effect=Retry), pytest.raises(Retry):
+            send_request_to_url(url)
+
+        throttle_mock.release.assert_called_once_with(lease, 429, 30)
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_throttled(self, engine_mock: patch, throttle_mock: patch) -> None:
+        """Test a throttled host delays the request instead of sending it."""
+        throttle_mock.acquire.return_value = Lease("webhook.com", None, 2.5)
+
+        with patch.object(send_request_to_url, "retry", side_effect=Retry) as retry_mock, pytest.raises(Retry):
+            send_request_to_url("https://webhook.com")
+
+        retry_mock.assert_called_once_with(countdown=2.5, max_retries=None)
+        engine_mock.return_value.deliver.assert_not_called()
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_request_to_url_without_throttle(self, engine_mock: patch, throttle_mock: patch) -> None:
+        """Test the throttle can be turned off for a request, whatever the setting."""
+        url = "https://webhook.com"
+        engine_mock.return_value.deliver.return_value = DeliveryResult(url, 200, "ok", None, 0.1)
+
+        assert send_request_to_url(url, host_throttle=False) == "ok"
+
+        throttle_mock.acquire.assert_not_called()
+        throttle_mock.release.assert_not_called()
+
+    @patch("webtask_scheduler.scheduler.tasks.send_requests_to_urls.apply_async")
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_requests_to_urls_defers_throttled_hosts(
+        self, engine_mock: patch, apply_async_mock: patch, throttle_mock: patch
+    ) -> None:
+        """Test timers of throttled hosts are sent back as a delayed batch."""
+        timers = [
+            [1, "https://webhook.com", None, None, None],
+            [2, "https://throttled.com", None, None, None],
+            [3, "https://throttled.com", None, None, None],
+        ]
+        granted = Lease("webhook.com", "lease-id", 0)
+        throttle_mock.acquire_many.return_value = [
+            granted,
+            Lease("throttled.com", None, 4),
+            Lease("throttled.com", None, 3),
+        ]
+        engine_mock.return_value.deliver_many.return_value = [
+            DeliveryResult("https://webhook.com", 200, "ok", None, 0.1)
+        ]
+
+        result = send_requests_to_urls(timers)
+
+        assert result == [{"task_id": 1, "status_code": 200, "error": None}]
+        engine_mock.return_value.deliver_many.assert_called_once_with(["https://webhook.com"], [None])
+        apply_async_mock.assert_called_once_with(
+            args=[[[2, "https://throttled.com", None, None, None], [3, "https://throttled.com", None, None, None]]],
+            countdown=3,
+        )
+        throttle_mock.release_many.assert_called_once_with([granted], [(200, None)])
+
+
+class TestTasksWithTimerEvents:
+    @pytest.fixture(autouse=True)
+    def redis_mock(self, settings):
+        settings.TIMER_EVENTS = True
+        with patch("webtask_scheduler.scheduler.events.get_redis") as get_redis:
+            yield get_redis.return_value
+
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_send_requests_to_urls_publishes_outcomes(self, engine_mock: patch, redis_mock: patch) -> None:
+        """Test the outcome of every delivered timer is announced on its channel."""
+        engine_mock.return_value.deliver_many.return_value = [
+            DeliveryResult("https://webhook.com", 200, "ok", None, 0.1),
+            DeliveryResult("https://webhook.org", 404, "", "404 Error", 0.1),
+        ]
+
+        send_requests_to_urls(
+            [[1, "https://webhook.com", None, None, None], [2, "https://webhook.org", None, None, None]]
+        )
+
+        pipeline = redis_mock.pipeline.return_value
+        assert [call.args[0] for call in pipeline.publish.call_args_list] == [
+            "scheduler:timer:1:events",
+            "scheduler:timer:2:events",
+        ]
+        assert json.loads(pipeline.publish.call_args_list[1].args[1])["status"] == Timer.Status.FAILED
+        pipeline.execute.assert_called_once()
@@ -1,16 +1,25 @@
 import datetime as dt
+import gzip
+import json
+import time
+from unittest.mock import MagicMock
+from unittest.mock import patch
 
 import pytest
 import pytz
 import time_machine
 from django.shortcuts import reverse
 from django.utils import timezone
-from django_celery_beat.models import ClockedSchedule
-from django_celery_beat.models import PeriodicTask
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.test import APIClient
 
+from webtask_scheduler.scheduler.models import DeadLetter
+from webtask_scheduler.scheduler.models import Payload
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.tasks import send_request_to_url
+from webtask_scheduler.scheduler.tasks import send_requests_to_urls
+
 pytestmark: pytest.mark = pytest.mark.django_db
 
 
@@ -25,17 +34,11 @@ class TestGetTimerAPIView:
 
     @time_machine.travel(dt.datetime(2024, 5, 30, 1, 24, tzinfo=pytz.utc))
     @pytest.fixture
-    def test_data(self) -> PeriodicTask:
+    def test_data(self) -> Timer:
         time_now: dt.datetime = timezone.now().replace(tzinfo=pytz.utc)
         run_at: dt.datetime = time_now + timezone.timedelta(hours=0, minutes=1, seconds=0)
-        task: PeriodicTask = PeriodicTask.objects.create(
-            clocked=ClockedSchedule.objects.create(clocked_time=run_at),
-            name="Get request to https://example.com at 2022-01-01 00:00:00",
-            task="webtask_scheduler.scheduler.tasks.send_request_to_url",
-            one_off=True,
-            args='["https://example.com"]',
-        )
-        return task
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=run_at)
+        return timer
 
     def test_get_timer_id_not_found(self, api_client: APIClient) -> None:
         url: str = reverse("api:scheduler:timer", kwargs={"task_id": 999999})
@@ -45,7 +48,7 @@ class TestGetTimerAPIView:
         assert response.json() == {"detail": "Task with ID 999999 does not exist"}
 
     @time_machine.travel(dt.datetime(2025, 6, 1, 1, 24, tzinfo=pytz.utc))
-    def test_get_expired_timer_returns_zero(self, api_client: APIClient, test_data: PeriodicTask) -> None:
+    def test_get_expired_timer_returns_zero(self, api_client: APIClient, test_data: Timer) -> None:
         url: str = reverse("api:scheduler:timer", kwargs={"task_id": test_data.id})
         response: Response = api_client.get(url)
 
@@ -53,17 +56,290 @@ class TestGetTimerAPIView:
         assert response.json() == {
             "task_id": test_data.id,
             "time_left_in_seconds": 0,
+            "time_left_in_milliseconds": 0,
         }
 
-    def test_get_timer_successfully(self, api_client: APIClient, test_data: PeriodicTask) -> None:
+    def test_get_timer_successfully(self, api_client: APIClient, test_data: Timer) -> None:
         url: str = reverse("api:scheduler:timer", kwargs={"task_id": test_data.id})
         response: Response = api_client.get(url)
-        time_left: float = round(
-            (test_data.clocked.clocked_time - timezone.now().replace(tzinfo=pytz.utc)).total_seconds(), 1
+        time_left: float = round((test_data.run_at - timezone.now().replace(tzinfo=pytz.utc)).total_seconds(), 1)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["task_id"] == test_data.id
+        assert response.json()["time_left_in_seconds"] == int(time_left)
+        assert abs(response.json()["time_left_in_milliseconds"] - time_left * 1000) < 1000
+
+
+class TestChangeTimerAPIView:
+    """
+    Test case class for testing the rescheduling and cancellation of timers through GetTimerAPIView.
+    """
+
+    @pytest.fixture
+    def api_client(self) -> APIClient:
+        return APIClient()
+
+    @pytest.fixture
+    def timer(self) -> Timer:
+        return Timer.objects.create(url="https://example.com", run_at=timezone.now() + dt.timedelta(hours=1))
+
+    def test_reschedule_timer(self, api_client: APIClient, timer: Timer) -> None:
+        url: str = reverse("api:scheduler:timer", kwargs={"task_id": timer.id})
+        response: Response = api_client.patch(url, {"hours": 0, "minutes": 2, "seconds": 0}, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "task_id": timer.id,
+            "time_left_in_seconds": 120,
+            "time_left_in_milliseconds": 120000,
+        }
+
+    def test_reschedule_timer_validation(self, api_client: APIClient, timer: Timer) -> None:
+        url: str = reverse("api:scheduler:timer", kwargs={"task_id": timer.id})
+        response: Response = api_client.patch(url, {"hours": 0, "minutes": -2, "seconds": 0}, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "minutes" in response.json()
+
+    def test_cancel_timer(self, api_client: APIClient, timer: Timer) -> None:
+        url: str = reverse("api:scheduler:timer", kwargs={"task_id": timer.id})
+        response: Response = api_client.delete(url)
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.delete(url).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_cancel_fired_timer(self, api_client: APIClient, timer: Timer) -> None:
+        Timer.objects.filter(id=timer.id).update(status=Timer.Status.SUCCEEDED)
+
+        url: str = reverse("api:scheduler:timer", kwargs={"task_id": timer.id})
+        response: Response = api_client.delete(url)
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.json() == {"detail": f"Task with ID {timer.id} already fired"}
+
+    @patch("webtask_scheduler.scheduler.services.publish_deliveries")
+    @patch("webtask_scheduler.scheduler.tasks.get_engine")
+    def test_cancel_short_timer(
+        self,
+        engine_mock: MagicMock,
+        publish_deliveries: MagicMock,
+        api_client: APIClient,
+        django_capture_on_commit_callbacks,
+    ) -> None:
+        # Short timers are handed to the broker with an ETA as soon as they are set.
+        with django_capture_on_commit_callbacks(execute=True):
+            response: Response = api_client.post(
+                reverse("api:scheduler:timer"), {"seconds": 1, "web_url": "https://example.com"}, format="json"
+            )
+        task_id: int = response.data["task_id"]
+        assert Timer.objects.get(id=task_id).status == Timer.Status.QUEUED
+
+        response = api_client.delete(reverse("api:scheduler:timer", kwargs={"task_id": task_id}))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        ((timers,), _) = publish_deliveries.call_args
+        send_requests_to_urls(timers)
+        send_request_to_url("https://example.com", task_id=task_id, attempt=2)
+        engine_mock.return_value.deliver_many.assert_called_once_with([], [])
+        engine_mock.return_value.deliver.assert_not_called()
+        assert Timer.objects.get(id=task_id).status == Timer.Status.CANCELED
+
+    def test_cancel_timers_require_admin(self, api_client: APIClient) -> None:
+        response: Response = api_client.post(reverse("api:scheduler:timer-cancel"), {}, format="json")
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_cancel_timers(self, api_client: APIClient, admin_user, timer: Timer) -> None:
+        api_client.force_authenticate(admin_user)
+        url: str = reverse("api:scheduler:timer-cancel")
+
+        assert api_client.post(url, {}, format="json").status_code == status.HTTP_400_BAD_REQUEST
+        response: Response = api_client.post(url, {"url_prefix": "https://example.com"}, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"canceled": 1}
+
+
+class TestGetTimerBulkAPIView:
+    """
+    Test case class for testing the GetTimerBulkAPIView.
+    """
+
+    @pytest.fixture
+    def api_client(self) -> APIClient:
+        return APIClient()
+
+    def test_get_timers_ids_validation(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer-lookup")
+        response: Response = api_client.post(url, {"ids": []}, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "ids" in response.json()
+
+    @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc), tick=False)
+    def test_get_timers_successfully(self, api_client: APIClient) -> None:
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=timezone.now() + dt.timedelta(minutes=1))
+
+        url: str = reverse("api:scheduler:timer-lookup")
+        response: Response = api_client.post(url, {"ids": [timer.id, 999999]}, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "timers": [{"task_id": timer.id, "time_left_in_seconds": 60, "time_left_in_milliseconds": 60000}],
+            "missing": [999999],
+        }
+
+
+class TestGetTimerResultAPIView:
+    """
+    Test case class for testing the GetTimerResultAPIView.
+    """
+
+    @pytest.fixture
+    def api_client(self) -> APIClient:
+        return APIClient()
+
+    def test_get_timer_result(self, api_client: APIClient) -> None:
+        timer: Timer = Timer.objects.create(
+            url="https://example.com",
+            run_at=dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc),
+            status=Timer.Status.SUCCEEDED,
+            attempts=1,
+            status_code=200,
+            response_ms=120,
+            response_digest="2cf24dba5fb0a30e",
+            lateness_ms=8,
         )
 
+        response: Response = api_client.get(reverse("api:scheduler:timer-result", kwargs={"task_id": timer.id}))
+
         assert response.status_code == status.HTTP_200_OK
-        assert response.json() == {"task_id": test_data.id, "time_left_in_seconds": int(time_left)}
+        assert response.json() == {
+            "task_id": timer.id,
+            "url": "https://example.com",
+            "run_at": "2024-05-31T01:24:00Z",
+            "interval_seconds": None,
+            "cron": "",
+            "max_lateness_seconds": None,
+            "lateness_policy": "fire",
+            "status": "succeeded",
+            "attempts": 1,
+            "status_code": 200,
+            "error": "",
+            "response_ms": 120,
+            "response_digest": "2cf24dba5fb0a30e",
+            "lateness_ms": 8,
+            "completed_at": None,
+        }
+
+    def test_get_timer_result_not_found(self, api_client: APIClient) -> None:
+        response: Response = api_client.get(reverse("api:scheduler:timer-result", kwargs={"task_id": 999999}))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestStreamTimerAPIView:
+    """
+    Test case class for testing the StreamTimerAPIView.
+    """
+
+    @pytest.fixture
+    def api_client(self) -> APIClient:
+        return APIClient()
+
+    @pytest.fixture
+    def pubsub(self, settings) -> MagicMock:
+        settings.TIMER_STREAM_TICK_SECONDS = 0.01
+        with patch("webtask_scheduler.scheduler.events.get_redis") as get_redis:
+            yield get_redis.return_value.pubsub.return_value
+
+    @staticmethod
+    def receive(*messages: dict | None):
+        """
+        Return a ``get_message`` side effect delivering ``messages`` in order, None waiting out the timeout.
+        """
+        queue = iter(messages)
+
+        def get_message(timeout: float) -> dict | None:
+            message = next(queue, None)
+            if message is None:
+                time.sleep(timeout)
+            return message
+
+        return get_message
+
+    def test_stream_countdown_until_fired(self, api_client: APIClient, pubsub: MagicMock) -> None:
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=timezone.now() + dt.timedelta(minutes=1))
+        fired: bytes = json.dumps({"task_id": timer.id, "status": "succeeded", "status_code": 200}).encode()
+        pubsub.get_message.side_effect = self.receive(None, {"type": "message", "data": fired})
+
+        response = api_client.get(reverse("api:scheduler:timer-stream", kwargs={"task_id": timer.id}))
+        events: list[str] = b"".join(response.streaming_content).decode().split("\n\n")[:-1]
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "text/event-stream"
+        pubsub.subscribe.assert_called_once_with(f"scheduler:timer:{timer.id}:events")
+        assert [event.split("\n")[0] for event in events] == ["event: countdown", "event: countdown", "event: fired"]
+        assert 59 <= json.loads(events[0].split("data: ")[1])["time_left_in_seconds"] <= 60
+        assert events[2] == f"event: fired\ndata: {fired.decode()}"
+        pubsub.close.assert_called_once()
+
+    def test_stream_canceled_timer(self, api_client: APIClient, pubsub: MagicMock) -> None:
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=timezone.now() + dt.timedelta(minutes=1))
+        canceled: bytes = json.dumps({"task_id": timer.id, "status": "canceled"}).encode()
+        pubsub.get_message.side_effect = self.receive({"type": "message", "data": canceled})
+
+        response = api_client.get(reverse("api:scheduler:timer-stream", kwargs={"task_id": timer.id}))
+        events: list[str] = b"".join(response.streaming_content).decode().split("\n\n")[:-1]
+
+        assert events[-1] == f"event: canceled\ndata: {canceled.decode()}"
+
+    def test_stream_completed_timer(self, api_client: APIClient, pubsub: MagicMock) -> None:
+        timer: Timer = Timer.objects.create(
+            url="https://example.com",
+            run_at=timezone.now(),
+            status=Timer.Status.FAILED,
+            attempts=5,
+            status_code=503,
+            error="503 Error",
+        )
+
+        response = api_client.get(reverse("api:scheduler:timer-stream", kwargs={"task_id": timer.id}))
+        (event,) = b"".join(response.streaming_content).decode().split("\n\n")[:-1]
+
+        assert event.startswith("event: fired\n")
+        assert json.loads(event.split("data: ")[1]) == {
+            "task_id": timer.id,
+            "status": "failed",
+            "attempts": 5,
+            "status_code": 503,
+            "error": "503 Error",
+            "completed_at": None,
+            "lateness_in_milliseconds": None,
+        }
+        pubsub.get_message.assert_not_called()
+
+    def test_stream_closes_after_max_duration(self, api_client: APIClient, pubsub: MagicMock, settings) -> None:
+        settings.TIMER_STREAM_MAX_SECONDS = 0.05
+        timer: Timer = Timer.objects.create(url="https://example.com", run_at=timezone.now() + dt.timedelta(hours=1))
+        pubsub.get_message.side_effect = self.receive()
+
+        response = api_client.get(reverse("api:scheduler:timer-stream", kwargs={"task_id": timer.id}))
+        events: list[str] = b"".join(response.streaming_content).decode().split("\n\n")[:-1]
+
+        assert events
+        assert all(event.startswith("event: countdown\n") for event in events)
+        pubsub.close.assert_called_once()
+
+    def test_stream_timer_not_found(self, api_client: APIClient, pubsub: MagicMock) -> None:
+        url: str = reverse("api:scheduler:timer-stream", kwargs={"task_id": 999999})
+
+        response: Response = api_client.get(url, HTTP_ACCEPT="text/event-stream")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.content.decode() == ('event: error\ndata: {"detail": "Task with ID 999999 does not exist"}\n\n')
+        pubsub.close.assert_called_once()
 
 
 class TestSetTimerAPIView:
@@ -116,12 +392,297 @@ class TestSetTimerAPIView:
         response: Response = api_client.post(url, payload)
         assert response.status_code == status.HTTP_201_CREATED
 
-        task: PeriodicTask = PeriodicTask.objects.last()
-        time_left: float = round(
-            (task.clocked.clocked_time - timezone.now().replace(tzinfo=pytz.utc)).total_seconds(), 1
+        timer: Timer = Timer.objects.last()
+        time_left: float = round((timer.run_at - timezone.now().replace(tzinfo=pytz.utc)).total_seconds(), 1)
+        assert response.json()["task_id"] == timer.id
+        assert response.json()["time_left_in_seconds"] == int(time_left)
+        assert timer.url == "https://example.com"
+        assert timer.status == Timer.Status.PENDING
+
+    def test_set_timer_with_max_attempts(self, api_client: APIClient, settings) -> None:
+        url: str = reverse("api:scheduler:timer")
+        payload: dict = {"hours": 1, "minutes": 0, "seconds": 0, "web_url": "https://example.com", "max_attempts": 3}
+
+        response: Response = api_client.post(url, payload)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Timer.objects.get(id=response.json()["task_id"]).max_attempts == 3
+
+        payload["max_attempts"] = settings.TIMER_RETRY_MAX_ATTEMPTS_LIMIT + 1
+        response = api_client.post(url, payload)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "max_attempts" in response.json()
+
+    @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc), tick=False)
+    def test_set_timer_in_milliseconds(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer")
+
+        response: Response = api_client.post(url, {"milliseconds": 90250, "web_url": "https://example.com"})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["time_left_in_milliseconds"] == 90250
+        timer: Timer = Timer.objects.get(id=response.json()["task_id"])
+        assert timer.run_at == dt.datetime(2024, 5, 31, 1, 25, 30, 250000, tzinfo=pytz.utc)
+
+    @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc), tick=False)
+    def test_set_timer_at_run_at(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer")
+        payload: dict = {"run_at": "2024-05-31T03:24:00.125+02:00", "web_url": "https://example.com"}
+
+        response: Response = api_client.post(url, payload)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["time_left_in_milliseconds"] == 125
+        assert Timer.objects.get(id=response.json()["task_id"]).run_at == dt.datetime(
+            2024, 5, 31, 1, 24, 0, 125000, tzinfo=pytz.utc
+        )
+
+    def test_set_timer_run_time_validation(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer")
+        both: dict = {"seconds": 1, "run_at": "2024-05-31T01:24:00Z", "web_url": "https://example.com"}
+
+        assert api_client.post(url, {"web_url": "https://example.com"}).json() == {
+            "non_field_errors": ["A delay or run_at is required."]
+        }
+        assert api_client.post(url, both).json() == {
+            "non_field_errors": ["Either a delay or run_at is accepted, not both."]
+        }
+
+    @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc), tick=False)
+    def test_set_recurring_timer(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer")
+
+        every_minute: Response = api_client.post(url, {"interval_seconds": 60, "web_url": "https://example.com"})
+        daily: Response = api_client.post(url, {"cron": "30 8 * * *", "web_url": "https://example.com"})
+        delayed: Response = api_client.post(url, {"seconds": 1, "cron": "30 8 * * *", "web_url": "https://example.com"})
+
+        assert every_minute.json()["time_left_in_seconds"] == 60
+        assert Timer.objects.get(id=daily.json()["task_id"]).run_at == dt.datetime(2024, 5, 31, 8, 30, tzinfo=pytz.utc)
+        # Recurring timers are never handed to the broker directly, however short their first delay.
+        timer: Timer = Timer.objects.get(id=delayed.json()["task_id"])
+        assert (timer.status, timer.cron, timer.recurring) == (Timer.Status.PENDING, "30 8 * * *", True)
+
+    def test_set_recurring_timer_validation(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer")
+        both: dict = {"interval_seconds": 60, "cron": "* * * * *", "web_url": "https://example.com"}
+
+        assert api_client.post(url, both).json() == {
+            "non_field_errors": ["Either interval_seconds or cron is accepted, not both."]
+        }
+        response: Response = api_client.post(url, {"cron": "0 25 * * *", "web_url": "https://example.com"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["cron"][0].startswith("Invalid cron expression '0 25 * * *'")
+
+    def test_set_timer_lateness_policy(self, api_client: APIClient, settings) -> None:
+        url: str = reverse("api:scheduler:timer")
+        data: dict = {"minutes": 5, "web_url": "https://example.com", "lateness_policy": "skip"}
+
+        response: Response = api_client.post(url, data)
+        assert response.json() == {
+            "non_field_errors": ["A lateness_policy other than fire requires max_lateness_seconds."]
+        }
+        response = api_client.post(url, {**data, "max_lateness_seconds": 1})
+        assert response.json() == {
+            "max_lateness_seconds": [
+                f"Ensure this value is greater than or equal to {settings.TIMER_CATCHUP_AFTER_SECONDS}."
+            ]
+        }
+        response = api_client.post(url, {**data, "max_lateness_seconds": 600})
+        timer: Timer = Timer.objects.get(id=response.json()["task_id"])
+        assert (timer.max_lateness_seconds, timer.lateness_policy) == (600, Timer.LatenessPolicy.SKIP)
+
+    def test_set_timer_with_payload(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer")
+        data: dict = {
+            "minutes": 5,
+            "web_url": "https://example.com",
+            "method": "PUT",
+            "headers": {"Authorization": "Bearer token"},
+            "body": {"order": 1, "lines": ["a"] * 100},
+        }
+
+        response: Response = api_client.post(url, data, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        timer: Timer = Timer.objects.get(id=response.json()["task_id"])
+        payload: Payload = Payload.objects.get(id=timer.payload_id)
+        assert (payload.method, payload.headers) == ("PUT", {"Authorization": "Bearer token"})
+        assert json.loads(gzip.decompress(payload.body)) == data["body"]
+
+    def test_set_timer_without_payload(self, api_client: APIClient) -> None:
+        response: Response = api_client.post(reverse("api:scheduler:timer"), {"minutes": 5, "web_url": "https://a.io"})
+
+        assert Timer.objects.get(id=response.json()["task_id"]).payload_id is None
+        assert not Payload.objects.exists()
+
+    def test_set_timer_payload_validation(self, api_client: APIClient, settings) -> None:
+        settings.TIMER_PAYLOAD_MAX_BYTES = 32
+        url: str = reverse("api:scheduler:timer")
+        data: dict = {"minutes": 5, "web_url": "https://example.com"}
+
+        response: Response = api_client.post(
+            url, {**data, "method": "TRACE", "headers": {"Host": "a", "Content-Length": "1"}}, format="json"
         )
-        assert response.json() == {"task_id": task.id, "time_left_in_seconds": int(time_left)}
-        assert task.name == f"Get request to https://example.com at {task.clocked.clocked_time}"
-        assert task.task == "webtask_scheduler.scheduler.tasks.send_request_to_url"
-        assert task.args == '["https://example.com"]'
-        assert task.one_off is True
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["method"] == ['"TRACE" is not a valid choice.']
+        assert response.json()["headers"] == ["These headers are set by the scheduler: Content-Length, Host."]
+        response = api_client.post(url, {**data, "body": {"text": "x" * 32}}, format="json")
+        assert response.json()["body"] == ["The body is larger than 32 bytes."]
+
+
+class TestSetTimerIdempotencyKey:
+    """
+    Test case class for testing the Idempotency-Key header of the SetTimerAPIView.
+    """
+
+    @pytest.fixture
+    def api_client(self) -> APIClient:
+        return APIClient()
+
+    def test_set_timer_replayed(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer")
+        payload: dict = {"hours": 0, "minutes": 5, "seconds": 0, "web_url": "https://example.com"}
+
+        first: Response = api_client.post(url, payload, format="json", HTTP_IDEMPOTENCY_KEY="order-1")
+        retry: Response = api_client.post(url, payload, format="json", HTTP_IDEMPOTENCY_KEY="order-1")
+
+        assert first.status_code == retry.status_code == status.HTTP_201_CREATED
+        assert retry.json()["task_id"] == first.json()["task_id"]
+        assert "Idempotent-Replayed" not in first
+        assert retry["Idempotent-Replayed"] == "true"
+        assert Timer.objects.count() == 1
+
+    def test_idempotency_key_too_long(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer")
+        payload: dict = {"hours": 0, "minutes": 5, "seconds": 0, "web_url": "https://example.com"}
+
+        response: Response = api_client.post(url, payload, format="json", HTTP_IDEMPOTENCY_KEY="k" * 256)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Timer.objects.exists()
+
+
+class TestSetTimerBulkAPIView:
+    """
+    Test case class for testing the SetTimerBulkAPIView.
+    """
+
+    @pytest.fixture
+    def api_client(self) -> APIClient:
+        return APIClient()
+
+    def test_set_timers_empty_batch_validation(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer-bulk")
+        response: Response = api_client.post(url, {"timers": []}, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {"timers": {"non_field_errors": ["This list may not be empty."]}}
+
+    def test_set_timers_item_validation(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer-bulk")
+        payload: dict = {
+            "timers": [
+                {"hours": 0, "minutes": 0, "seconds": 5, "web_url": "https://example.com"},
+                {"hours": 0, "minutes": 0, "seconds": 5, "web_url": "invalid url"},
+            ]
+        }
+        response: Response = api_client.post(url, payload, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {"timers": [{}, {"web_url": ["Enter a valid URL."]}]}
+        assert Timer.objects.count() == 0
+
+    @time_machine.travel(dt.datetime(2024, 5, 31, 1, 24, tzinfo=pytz.utc))
+    def test_set_timers_create_tasks_successfully(self, api_client: APIClient) -> None:
+        url: str = reverse("api:scheduler:timer-bulk")
+        payload: dict = {
+            "timers": [
+                {"hours": 1, "minutes": 0, "seconds": 0, "web_url": "https://example.com"},
+                {"hours": 0, "minutes": 2, "seconds": 0, "web_url": "https://example.org"},
+            ]
+        }
+
+        response: Response = api_client.post(url, payload, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+
+        timers: list[Timer] = list(Timer.objects.order_by("id"))
+        assert response.json() == {
+            "timers": [
+                {"task_id": timers[0].id, "time_left_in_seconds": 3600, "time_left_in_milliseconds": 3600000},
+                {"task_id": timers[1].id, "time_left_in_seconds": 120, "time_left_in_milliseconds": 120000},
+            ]
+        }
+        assert [timer.url for timer in timers] == ["https://example.com", "https://example.org"]
+
+
+class TestDeadLetterAPIViews:
+    """
+    Test case class for testing the dead letter list and replay views.
+    """
+
+    @pytest.fixture
+    def api_client(self, admin_user) -> APIClient:
+        client = APIClient()
+        client.force_authenticate(admin_user)
+        return client
+
+    @pytest.fixture
+    def dead_letters(self) -> list[DeadLetter]:
+        return DeadLetter.objects.bulk_create(
+            [
+                DeadLetter(task_id=1, url="https://example.com", attempts=5, status_code=503, error="503 Error"),
+                DeadLetter(task_id=2, url="https://example.org", attempts=1, status_code=404, error="404 Error"),
+                DeadLetter(
+                    task_id=3, url="https://example.net", attempts=5, error="TimeoutError", replayed_at=timezone.now()
+                ),
+            ]
+        )
+
+    def test_dead_letters_require_admin(self) -> None:
+        response: Response = APIClient().get(reverse("api:scheduler:dead-letters"))
+
+        assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+    def test_list_dead_letters_not_replayed(self, api_client: APIClient, dead_letters: list[DeadLetter]) -> None:
+        url: str = reverse("api:scheduler:dead-letters")
+        response: Response = api_client.get(url, {"replayed": "false"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["count"] == 2
+        assert {item["task_id"] for item in response.json()["results"]} == {1, 2}
+
+    @patch("webtask_scheduler.scheduler.services.publish_deliveries")
+    def test_replay_dead_letters(
+        self,
+        publish_deliveries: MagicMock,
+        api_client: APIClient,
+        dead_letters: list[DeadLetter],
+        django_capture_on_commit_callbacks,
+    ) -> None:
+        url: str = reverse("api:scheduler:dead-letters-replay")
+        with django_capture_on_commit_callbacks(execute=True):
+            response: Response = api_client.post(url, {"ids": [dead_letters[0].id, dead_letters[2].id]}, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"replayed": 1}
+        publish_deliveries.assert_called_once_with([(1, "https://example.com", None, None, None)])
+        assert list(DeadLetter.objects.filter(replayed_at__isnull=True).values_list("task_id", flat=True)) == [2]
+
+    @patch("webtask_scheduler.scheduler.services.publish_deliveries")
+    def test_replay_all_dead_letters(
+        self,
+        publish_deliveries: MagicMock,
+        api_client: APIClient,
+        dead_letters: list[DeadLetter],
+        django_capture_on_commit_callbacks,
+    ) -> None:
+        url: str = reverse("api:scheduler:dead-letters-replay")
+        with django_capture_on_commit_callbacks(execute=True):
+            response: Response = api_client.post(url, {}, format="json")
+
+        assert response.json() == {"replayed": 2}
+        ((timers,), _) = publish_deliveries.call_args
+        assert sorted(timers) == [
+            (1, "https://example.com", None, None, None),
+            (2, "https://example.org", None, None, None),
+        ]
+        assert not DeadLetter.objects.filter(replayed_at__isnull=True).exists()
@@ -0,0 +1,168 @@
+import logging
+import time
+import uuid
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from webtask_scheduler.scheduler.connections import get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS: token bucket hash, concurrency lease set, backoff marker
+# ARGV: now (ms), refill rate (tokens/s), burst, max concurrency, lease TTL (ms), lease id
+# Returns 0 when a lease was granted, otherwise the number of milliseconds to wait.
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local max_concurrency = tonumber(ARGV[4])
+local lease_ttl = tonumber(ARGV[5])
+
+local backoff = redis.call('PTTL', KEYS[3])
+if backoff > 0 then
+    return backoff
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[2]) >= max_concurrency then
+    local oldest = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+    return math.max(math.min(tonumber(oldest[2]) - now, 1000), 50)
+end
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - updated_at) * rate / 1000)
+if tokens < 1 then
+    return math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'updated_at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+redis.call('ZADD', KEYS[2], now + lease_ttl, ARGV[6])
+redis.call('PEXPIRE', KEYS[2], lease_ttl)
+return 0
+"""
+
+# KEYS: concurrency lease set, consecutive throttling responses counter, backoff marker
+# ARGV: lease id, status code (0 when the request failed without a response), Retry-After (ms),
+#       base backoff (ms), maximum backoff (ms)
+# Returns the backoff opened for the host in milliseconds, 0 when none.
+RELEASE_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+local status = tonumber(ARGV[2])
+if status == 429 or status == 503 then
+    local strikes = redis.call('INCR', KEYS[2])
+    redis.call('PEXPIRE', KEYS[2], ARGV[5])
+    local delay = tonumber(ARGV[3])
+    if delay <= 0 then
+        delay = math.min(tonumber(ARGV[4]) * 2 ^ (strikes - 1), tonumber(ARGV[5]))
+    end
+    delay = math.floor(delay)
+    redis.call('SET', KEYS[3], 1, 'PX', delay)
+    return delay
+elseif status > 0 and status < 500 then
+    redis.call('DEL', KEYS[2])
+end
+return 0
+"""
+
+
+class Lease(NamedTuple):
+    host: str
+    lease_id: str | None
+    wait: float
+
+    @property
+    def granted(self) -> bool:
+        return self.lease_id is not None
+
+
+def get_host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class HostThrottle:
+    """
+    Per-destination rate and concurrency limiter shared by every worker process through Redis.
+
+    Each host gets a token bucket (TIMER_HOST_RATE_LIMIT requests per second with bursts of up to
+    TIMER_HOST_BURST), a cap of TIMER_HOST_MAX_CONCURRENCY in-flight requests, and a backoff window
+    opened by 429/503 responses that honours ``Retry-After`` or else grows exponentially.
+    """
+
+    key_prefix = "scheduler:throttle"
+
+    def __init__(self) -> None:
+        self.redis = get_redis()
+        self._acquire = self.redis.register_script(ACQUIRE_SCRIPT)
+        self._release = self.redis.register_script(RELEASE_SCRIPT)
+        # A lease outlives the slowest possible request, so a crashed worker cannot leak a slot forever.
+        self.lease_ttl_ms: int = int(settings.TIMER_HTTP_TIMEOUT * 1000) + 5000
+
+    def _keys(self, host: str) -> list[str]:
+        return [
+            f"{self.key_prefix}:{host}:bucket",
+            f"{self.key_prefix}:{host}:leases",
+            f"{self.key_prefix}:{host}:backoff",
+        ]
+
+    def acquire_many(self, urls: list[str]) -> list[Lease]:
+        """
+        Try to get a delivery slot for every URL in one round trip.
+
+        Leases that are not granted tell how many seconds to wait before trying again.
+        """
+        now_ms: int = int(time.time() * 1000)
+        hosts: list[str] = [get_host(url) for url in urls]
+        lease_ids: list[str] = [uuid.uuid4().hex for _ in urls]
+        pipeline = self.redis.pipeline(transaction=False)
+        for host, lease_id in zip(hosts, lease_ids, strict=True):
+            self._acquire(
+                keys=self._keys(host),
+                args=[
+                    now_ms,
+                    settings.TIMER_HOST_RATE_LIMIT,
+                    settings.TIMER_HOST_BURST,
+                    settings.TIMER_HOST_MAX_CONCURRENCY,
+                    self.lease_ttl_ms,
+                    lease_id,
+                ],
+                client=pipeline,
+            )
+        waits: list[int] = pipeline.execute()
+        return [
+            Lease(host, lease_id if wait == 0 else None, wait / 1000)
+            for host, lease_id, wait in zip(hosts, lease_ids, waits, strict=True)
+        ]
+
+    def acquire(self, url: str) -> Lease:
+        return self.acquire_many([url])[0]
+
+    def release_many(self, leases: list[Lease], responses: list[tuple[int | None, float | None]]) -> None:
+        """
+        Give the slots back and adapt each host's backoff to the ``(status_code, retry_after)`` it answered.
+        """
+        pipeline = self.redis.pipeline(transaction=False)
+        for lease, (status_code, retry_after) in zip(leases, responses, strict=True):
+            _, leases_key, backoff_key = self._keys(lease.host)
+            self._release(
+                keys=[leases_key, f"{self.key_prefix}:{lease.host}:strikes", backoff_key],
+                args=[
+                    lease.lease_id,
+                    status_code or 0,
+                    int((retry_after or 0) * 1000),
+                    int(settings.TIMER_HOST_BACKOFF_BASE * 1000),
+                    int(settings.TIMER_HOST_BACKOFF_MAX * 1000),
+                ],
+                client=pipeline,
+            )
+        delays: list[int] = pipeline.execute()
+        for lease, (status_code, _), delay in zip(leases, responses, delays, strict=True):
+            if delay:
+                logger.warning(f"Backing off {lease.host} for {delay / 1000}s after a {status_code} response")
+
+    def release(self, lease: Lease, status_code: int | None, retry_after: float | None = None) -> None:
+        self.release_many([lease], [(status_code, retry_after)])
@@ -0,0 +1,122 @@
+import datetime as dt
+from collections.abc import Iterable
+
+import pytz
+from django.conf import settings
+from django.db.models import Min
+from django.db.models import QuerySet
+from django.db.models.functions import Mod
+
+from webtask_scheduler.scheduler.models import Timer
+from webtask_scheduler.scheduler.quotas import ANONYMOUS_TENANT
+from webtask_scheduler.scheduler.quotas import tenant_of
+from webtask_scheduler.scheduler.timer_wheel import DueTimer
+
+
+class DatabaseTimerQueue:
+    """
+    Due-time index of timers served straight from the Timer table.
+
+    Pending timers are read in run time order through the partial index on ``run_at``, so
+    there is no second store to keep in sync with the database. Due rows are claimed with
+    ``SELECT ... FOR UPDATE SKIP LOCKED``: the dispatcher publishes them and marks them queued
+    in the transaction holding the locks, so concurrent dispatchers never claim the same timer
+    and a dispatcher failing before its commit leaves its timers pending for the others.
+
+    The due timers of a single tenant are read through the partial index on ``(user_id, run_at)``,
+    so the dispatcher can pop each tenant in turn.
+    """
+
+    def __init__(self, shards: int | None = None) -> None:
+        self.shards: int = shards or settings.TIMER_DISPATCH_SHARDS
+
+    def _pending(self, shard: int) -> QuerySet:
+        pending: QuerySet = Timer.objects.filter(status=Timer.Status.PENDING)
+        if self.shards == 1:
+            return pending
+        return pending.alias(shard=Mod("id", self.shards)).filter(shard=shard)
+
+    def add_many(self, timers: Iterable[tuple]) -> None:
+        # Claims are rolled back with the transaction of a failed publish, and recurring timers are
+        # advanced on their row, so there is nothing to put back.
+        pass
+
+    def remove(self, task_id: int) -> None:
+        pass
+
+    def _due(self, now: float, shard: int, since: float | None = None, tenant: int | None = None) -> QuerySet:
+        due: QuerySet = self._pending(shard).filter(run_at__lte=dt.datetime.fromtimestamp(now, tz=pytz.utc))
+        if since is not None:
+            due = due.filter(run_at__gte=dt.datetime.fromtimestamp(since, tz=pytz.utc))
+        if tenant == ANONYMOUS_TENANT:
+            due = due.filter(user_id__isnull=True)
+        elif tenant is not None:
+            due = due.filter(user_id=tenant)
+        return due
+
+    def due_tenants(self, now: float, shard: int = 0, since: float | None = None) -> list[int]:
+        """
+        Return the tenants of ``shard`` with timers due at ``now`` and not before ``since``, the ones waiting
+        the longest first.
+        """
+        user_ids = (
+            self._due(now, shard, since)
+            .values("user_id")
+            .annotate(first_run_at=Min("run_at"))
+            .order_by("first_run_at")
+            .values_list("user_id", flat=True)
+        )
+        return [tenant_of(user_id) for user_id in user_ids]
+
+    def pop_due(
+        self, now: float, limit: int, shard: int = 0, since: float | None = None, tenant: int | None = None
+    ) -> list[DueTimer]:
+        """
+        Claim and return up to ``limit`` pending timers of ``shard`` due at ``now`` (a UNIX timestamp), earliest first.
+
+        Only the timers of ``tenant`` are claimed when it is given. Timers due before ``since`` are left to the
+        catch-up sweeper. Must run in a transaction, the claimed rows stay locked until it ends and are skipped
+        by the other dispatchers.
+        """
+        rows = (
+            self._due(now, shard, since, tenant)
+            .order_by("run_at")
+            .select_for_update(skip_locked=True)
+            .values_list("id", "run_at", "url", "max_attempts", "interval_seconds", "cron", "payload_id", "user_id")[
+                :limit
+            ]
+        )
+        return [
+            DueTimer(
+                task_id=task_id,
+                run_at=run_at.timestamp(),
+                url=url,
+                max_attempts=max_attempts,
+                interval_seconds=interval_seconds,
+                cron=cron,
+                payload_id=payload_id,
+                user_id=user_id,
+            )
+            for task_id, run_at, url, max_attempts, interval_seconds, cron, payload_id, user_id in rows
+        ]
+
+    def pop_overdue(self, before: float, limit: int, shard: int = 0, tenant: int | None = None) -> list[DueTimer]:
+        """
+        Claim and return up to ``limit`` pending timers of ``shard`` due before ``before``, earliest first.
+        """
+        return self.pop_due(now=before, limit=limit, shard=shard, tenant=tenant)
+
+    def due_count(self, now: float) -> int:
+        return Timer.objects.filter(
+            status=Timer.Status.PENDING, run_at__lte=dt.datetime.fromtimestamp(now, tz=pytz.utc)
+        ).count()
+
+    def next_run_at(self, shard: int = 0, since: float | None = None) -> float | None:
+        """
+        Return the UNIX timestamp of the earliest pending timer of ``shard`` due at or after ``since``, if any.
+        """
+        pending: QuerySet = self._pending(shard)
+        if since is not None:
+            pending = pending.filter(run_at__gte=dt.datetime.fromtimestamp(since, tz=pytz.utc))
+        run_at: dt.datetime | None = pending.order_by("run_at").values_list("run_at", flat=True).first()
+        return run_at.timestamp() if run_at is not None else None
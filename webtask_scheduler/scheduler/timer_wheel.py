@@ -0,0 +1,273 @@
+import datetime as dt
+import json
+import logging
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from django.conf import settings
+
+from webtask_scheduler.scheduler.connections import get_redis
+from webtask_scheduler.scheduler.quotas import tenant_of
+from webtask_scheduler.scheduler.shards import shard_of
+
+logger = logging.getLogger(__name__)
+
+# KEYS: lane of a tenant, delivery hash, tenant index
+# ARGV: now, limit, min score, tenant
+# Pops up to ARGV[2] members of the lane scored between ARGV[3] and ARGV[1] and their deliveries in one atomic step,
+# so concurrent dispatchers can never hand out the same timer twice. The tenant is then indexed at the earliest
+# timer left in its lane, or dropped from the index once its lane is empty.
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[3], ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+local result = {}
+if #due > 0 then
+    local members = {}
+    for i = 1, #due, 2 do
+        members[#members + 1] = due[i]
+    end
+    redis.call('ZREM', KEYS[1], unpack(members))
+    local deliveries = redis.call('HMGET', KEYS[2], unpack(members))
+    redis.call('HDEL', KEYS[2], unpack(members))
+    for i = 1, #members do
+        result[#result + 1] = members[i]
+        result[#result + 1] = due[i * 2]
+        result[#result + 1] = deliveries[i] or false
+    end
+end
+local head = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if #head == 0 then
+    redis.call('ZREM', KEYS[3], ARGV[4])
+else
+    redis.call('ZADD', KEYS[3], head[2], ARGV[4])
+end
+return result
+"""
+
+
+def parse_delivery(delivery: bytes | str) -> tuple[str, int | None, int | None, str, int | None, int | None]:
+    """
+    Return the ``(url, max_attempts, interval_seconds, cron, payload_id, user_id)`` of a delivery of the wheel.
+    """
+    url, max_attempts, interval_seconds, cron, payload_id, user_id = json.loads(delivery)
+    return url, max_attempts, interval_seconds, cron, payload_id, user_id
+
+
+class DueTimer(NamedTuple):
+    task_id: int
+    run_at: float
+    url: str
+    max_attempts: int | None = None
+    interval_seconds: int | None = None
+    cron: str = ""
+    payload_id: int | None = None
+    user_id: int | None = None
+
+    @property
+    def recurring(self) -> bool:
+        return bool(self.interval_seconds or self.cron)
+
+
+class RedisTimerWheel:
+    """
+    Due-time index of timers kept in Redis sorted sets scored by their run time.
+
+    Every tenant, the user who set the timers, has its own sorted set, its lane, and a tenant
+    index holds the tenants scored by the earliest timer of their lane. The dispatcher can then
+    pop the due timers of each tenant in turn, so the timers of one tenant never queue behind
+    a burst of another, see TimerDispatcher. The index may lag behind a lane whose timers were
+    removed or moved later, the next pop of the lane brings it up to date.
+
+    The delivery of each timer (URL and retry policy) lives in a companion hash so a
+    dispatcher can fire it without reading the database. The Timer row remains the durable record.
+
+    With TIMER_DISPATCH_SHARDS above one, timers are spread by ID over one set of keys per shard,
+    so every dispatcher only pops the shards it holds the lease of.
+    """
+
+    due_key = "scheduler:timers:due"
+    deliveries_key = "scheduler:timers:deliveries"
+    tenants_key = "scheduler:timers:tenants"
+
+    def __init__(self, shards: int | None = None) -> None:
+        self.redis = get_redis()
+        self.shards: int = shards or settings.TIMER_DISPATCH_SHARDS
+        self._pop_due = self.redis.register_script(POP_DUE_SCRIPT)
+
+    def keys(self, shard: int = 0) -> tuple[str, str]:
+        """
+        Return the tenant index and delivery hash keys of ``shard``.
+        """
+        if self.shards == 1:
+            return self.tenants_key, self.deliveries_key
+        # The hash tag keeps every key of a shard in the same Redis Cluster slot, as the pop script needs.
+        return f"{self.tenants_key}:{{{shard}}}", f"{self.deliveries_key}:{{{shard}}}"
+
+    def lane_key(self, shard: int, tenant: int) -> str:
+        """
+        Return the key of the sorted set holding the timers of ``tenant`` in ``shard``.
+        """
+        if self.shards == 1:
+            return f"{self.due_key}:{tenant}"
+        return f"{self.due_key}:{{{shard}}}:{tenant}"
+
+    def _by_shard(self, task_ids: Iterable[int]) -> dict[int, list[str]]:
+        members: dict[int, list[str]] = defaultdict(list)
+        for task_id in task_ids:
+            members[shard_of(task_id, self.shards)].append(str(task_id))
+        return members
+
+    def _tenants_of(self, shard: int, members: list[str]) -> dict[str, int]:
+        """
+        Return the tenant of every member of ``shard`` still in the wheel, read from its delivery.
+        """
+        _, deliveries_key = self.keys(shard)
+        deliveries: list[bytes | None] = self.redis.hmget(deliveries_key, members)
+        return {
+            member: tenant_of(parse_delivery(delivery)[5])
+            for member, delivery in zip(members, deliveries, strict=True)
+            if delivery is not None
+        }
+
+    def add(
+        self,
+        task_id: int,
+        url: str,
+        run_at: dt.datetime,
+        max_attempts: int | None = None,
+        interval_seconds: int | None = None,
+        cron: str = "",
+        payload_id: int | None = None,
+        user_id: int | None = None,
+    ) -> None:
+        self.add_many([(task_id, url, run_at, max_attempts, interval_seconds, cron, payload_id, user_id)])
+
+    def add_many(self, timers: Iterable[tuple]) -> None:
+        """
+        Add ``(task_id, url, run_at, max_attempts, interval_seconds, cron, payload_id, user_id)`` timers.
+        """
+        scores: dict[tuple[int, int], dict[str, float]] = defaultdict(dict)
+        deliveries: dict[int, dict[str, str]] = defaultdict(dict)
+        for task_id, url, run_at, max_attempts, interval_seconds, cron, payload_id, user_id in timers:
+            shard: int = shard_of(task_id, self.shards)
+            scores[shard, tenant_of(user_id)][str(task_id)] = run_at.timestamp()
+            deliveries[shard][str(task_id)] = json.dumps(
+                [url, max_attempts, interval_seconds, cron, payload_id, user_id]
+            )
+        if not scores:
+            return
+        pipeline = self.redis.pipeline()
+        for shard, shard_deliveries in deliveries.items():
+            pipeline.hset(self.keys(shard)[1], mapping=shard_deliveries)
+        for (shard, tenant), lane_scores in scores.items():
+            pipeline.zadd(self.lane_key(shard, tenant), lane_scores)
+            # Only ever move the tenant earlier, its lane may hold timers due before the new ones.
+            pipeline.zadd(self.keys(shard)[0], {str(tenant): min(lane_scores.values())}, lt=True)
+        pipeline.execute()
+
+    def remove(self, task_id: int) -> None:
+        self.remove_many([task_id])
+
+    def remove_many(self, task_ids: list[int]) -> None:
+        if not task_ids:
+            return
+        pipeline = self.redis.pipeline()
+        for shard, members in self._by_shard(task_ids).items():
+            lanes: dict[int, list[str]] = defaultdict(list)
+            for member, tenant in self._tenants_of(shard, members).items():
+                lanes[tenant].append(member)
+            for tenant, lane_members in lanes.items():
+                pipeline.zrem(self.lane_key(shard, tenant), *lane_members)
+            pipeline.hdel(self.keys(shard)[1], *members)
+        pipeline.execute()
+
+    def reschedule(self, task_id: int, run_at: dt.datetime) -> None:
+        shard: int = shard_of(task_id, self.shards)
+        member: str = str(task_id)
+        tenant: int | None = self._tenants_of(shard, [member]).get(member)
+        if tenant is None:
+            # The timer was popped meanwhile and is already firing.
+            return
+        pipeline = self.redis.pipeline()
+        pipeline.zadd(self.lane_key(shard, tenant), {member: run_at.timestamp()}, xx=True)
+        pipeline.zadd(self.keys(shard)[0], {str(tenant): run_at.timestamp()}, lt=True)
+        pipeline.execute()
+
+    def due_tenants(self, now: float, shard: int = 0, since: float | None = None) -> list[int]:
+        """
+        Return the tenants of ``shard`` with timers due at ``now``, the ones waiting the longest first.
+
+        Tenants whose only due timers are before ``since`` are returned as well, their pop comes back empty.
+        """
+        return [int(tenant) for tenant in self.redis.zrangebyscore(self.keys(shard)[0], "-inf", now)]
+
+    def pop_due(
+        self, now: float, limit: int, shard: int = 0, since: float | None = None, tenant: int | None = None
+    ) -> list[DueTimer]:
+        """
+        Atomically remove and return up to ``limit`` timers of ``shard`` due at ``now`` (a UNIX timestamp).
+
+        Only the timers of ``tenant`` are popped when it is given, otherwise the due tenants are popped in turn.
+        Timers due before ``since`` are left in the wheel for the catch-up sweeper.
+        """
+        if tenant is None:
+            due: list[DueTimer] = []
+            for due_tenant in self.due_tenants(now, shard):
+                if len(due) == limit:
+                    break
+                due += self.pop_due(now, limit - len(due), shard, since, due_tenant)
+            return due
+        min_score: float | str = since if since is not None else "-inf"
+        tenants_key, deliveries_key = self.keys(shard)
+        flat: list = self._pop_due(
+            keys=[self.lane_key(shard, tenant), deliveries_key, tenants_key], args=[now, limit, min_score, tenant]
+        )
+        due = []
+        for i in range(0, len(flat), 3):
+            task_id, run_at, delivery = flat[i : i + 3]
+            if delivery is None:
+                logger.error(f"Dropping due timer {task_id!r} without a delivery")
+                continue
+            url, max_attempts, interval_seconds, cron, payload_id, user_id = parse_delivery(delivery)
+            due.append(
+                DueTimer(
+                    task_id=int(task_id),
+                    run_at=float(run_at),
+                    url=url,
+                    max_attempts=max_attempts,
+                    interval_seconds=interval_seconds,
+                    cron=cron,
+                    payload_id=payload_id,
+                    user_id=user_id,
+                )
+            )
+        return due
+
+    def pop_overdue(self, before: float, limit: int, shard: int = 0, tenant: int | None = None) -> list[DueTimer]:
+        """
+        Atomically remove and return up to ``limit`` timers of ``shard`` due before ``before``, earliest first.
+        """
+        return self.pop_due(now=before, limit=limit, shard=shard, tenant=tenant)
+
+    def _lanes(self, shard: int) -> list[str]:
+        return [self.lane_key(shard, int(tenant)) for tenant in self.redis.zrange(self.keys(shard)[0], 0, -1)]
+
+    def due_count(self, now: float) -> int:
+        pipeline = self.redis.pipeline(transaction=False)
+        for shard in range(self.shards):
+            for lane_key in self._lanes(shard):
+                pipeline.zcount(lane_key, "-inf", now)
+        return sum(pipeline.execute())
+
+    def next_run_at(self, shard: int = 0, since: float | None = None) -> float | None:
+        """
+        Return the UNIX timestamp of the earliest pending timer of ``shard`` due at or after ``since``, if any.
+        """
+        if since is None:
+            first: list[tuple[bytes, float]] = self.redis.zrange(self.keys(shard)[0], 0, 0, withscores=True)
+            return first[0][1] if first else None
+        pipeline = self.redis.pipeline(transaction=False)
+        for lane_key in self._lanes(shard):
+            pipeline.zrangebyscore(lane_key, since, "+inf", start=0, num=1, withscores=True)
+        run_at_list: list[float] = [first[0][1] for first in pipeline.execute() if first]
+        return min(run_at_list, default=None)
@@ -1,17 +1,64 @@
+from django.conf import settings
 from django.urls import path
 
+from webtask_scheduler.scheduler import async_views
 from webtask_scheduler.scheduler import views
 
+# The ASGI deployment serves the hot timer endpoints with async views.
+if settings.TIMER_ASYNC_VIEWS:
+    set_timer_view = async_views.SetTimerAsyncView.as_view()
+    get_timer_view = async_views.GetTimerAsyncView.as_view()
+    stream_timer_view = async_views.StreamTimerAsyncView.as_view()
+else:
+    set_timer_view = views.SetTimerAPIView.as_view()
+    get_timer_view = views.GetTimerAPIView.as_view()
+    stream_timer_view = views.StreamTimerAPIView.as_view()
+
 app_name = "scheduler"
 urlpatterns = [
     path(
         "timer/",
-        view=views.SetTimerAPIView.as_view(),
+        view=set_timer_view,
         name="timer",
     ),
+    path(
+        "timer/bulk/",
+        view=views.SetTimerBulkAPIView.as_view(),
+        name="timer-bulk",
+    ),
+    path(
+        "timer/cancel/",
+        view=views.CancelTimersAPIView.as_view(),
+        name="timer-cancel",
+    ),
+    path(
+        "timer/lookup/",
+        view=views.GetTimerBulkAPIView.as_view(),
+        name="timer-lookup",
+    ),
+    path(
+        "dead-letters/",
+        view=views.DeadLetterListAPIView.as_view(),
+        name="dead-letters",
+    ),
+    path(
+        "dead-letters/replay/",
+        view=views.DeadLetterReplayAPIView.as_view(),
+        name="dead-letters-replay",
+    ),
+    path(
+        "timer/<str:task_id>/result/",
+        view=views.GetTimerResultAPIView.as_view(),
+        name="timer-result",
+    ),
+    path(
+        "timer/<str:task_id>/stream/",
+        view=stream_timer_view,
+        name="timer-stream",
+    ),
     path(
         "timer/<str:task_id>/",
-        view=views.GetTimerAPIView.as_view(),
+        view=get_timer_view,
         name="timer",
     ),
 ]
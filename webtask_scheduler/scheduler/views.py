@@ -1,23 +1,73 @@
+import hmac
+import json
 import logging
 
+from django.conf import settings
+from django.http import HttpRequest
+from django.http import HttpResponse
+from django.http import HttpResponseForbidden
+from django.http import StreamingHttpResponse
+from django.views import View
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
 from drf_spectacular.utils import extend_schema
+from prometheus_client import CONTENT_TYPE_LATEST
+from prometheus_client import generate_latest
 from rest_framework import permissions
 from rest_framework import status
 from rest_framework.generics import CreateAPIView
+from rest_framework.generics import ListAPIView
 from rest_framework.generics import RetrieveAPIView
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.renderers import BaseRenderer
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from webtask_scheduler.scheduler.events import server_sent_event
+from webtask_scheduler.scheduler.metrics import get_registry
+from webtask_scheduler.scheduler.models import DeadLetter
+from webtask_scheduler.scheduler.models import IdempotencyKey
+from webtask_scheduler.scheduler.quotas import QuotaExceededError
+from webtask_scheduler.scheduler.quotas import user_id_of
+from webtask_scheduler.scheduler.serializers import CancelTimersInputSerializer
+from webtask_scheduler.scheduler.serializers import CancelTimersOutputSerializer
+from webtask_scheduler.scheduler.serializers import DeadLetterReplayInputSerializer
+from webtask_scheduler.scheduler.serializers import DeadLetterReplayOutputSerializer
+from webtask_scheduler.scheduler.serializers import DeadLetterSerializer
+from webtask_scheduler.scheduler.serializers import GetTimerBulkInputSerializer
+from webtask_scheduler.scheduler.serializers import GetTimerBulkOutputSerializer
+from webtask_scheduler.scheduler.serializers import RescheduleTimerInputSerializer
+from webtask_scheduler.scheduler.serializers import SetTimerBulkInputSerializer
+from webtask_scheduler.scheduler.serializers import SetTimerBulkOutputSerializer
 from webtask_scheduler.scheduler.serializers import SetTimerInputSerializer
 from webtask_scheduler.scheduler.serializers import SetTimerOutputSerializer
+from webtask_scheduler.scheduler.serializers import TimerResultSerializer
+from webtask_scheduler.scheduler.services import DeadLetterService
+from webtask_scheduler.scheduler.services import TimerNotPendingError
 from webtask_scheduler.scheduler.services import TimerService
 
 logger = logging.getLogger(__name__)
 
 
+def quota_exceeded(error: QuotaExceededError) -> Response:
+    return Response(
+        {"detail": str(error)},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
 class SetTimerAPIView(CreateAPIView):
     """
     API view to schedule a task to send a POST request to a given URL after a specified amount of time.
 
+    Requests carrying an ``Idempotency-Key`` header already seen within TIMER_IDEMPOTENCY_KEY_TTL
+    schedule nothing and get the task of the first request back, with an ``Idempotent-Replayed`` header.
+
+    The task belongs to the authenticated user, requests over the quota of the user answer with a 429
+    status code and a ``Retry-After`` header.
+
     This view requires authentication to access.
 
     """
@@ -34,20 +84,71 @@ class SetTimerAPIView(CreateAPIView):
         tags=["scheduler"],
         request=SetTimerInputSerializer,
         responses=SetTimerOutputSerializer,
+        parameters=[
+            OpenApiParameter(
+                "Idempotency-Key",
+                str,
+                OpenApiParameter.HEADER,
+                description="Unique key of the request, retries carrying it do not schedule the task again.",
+            ),
+        ],
     )
     def post(self, request, *args, **kwargs) -> Response:
         input_serializer: SetTimerInputSerializer = self.input_serializer_class(
             data=request.data, context={"request": request}
         )
         input_serializer.is_valid(raise_exception=True)
-        hours: int = input_serializer.validated_data["hours"]
-        minutes: int = input_serializer.validated_data["minutes"]
-        seconds: int = input_serializer.validated_data["seconds"]
+        idempotency_key: str | None = request.headers.get("Idempotency-Key") or None
+        if idempotency_key and len(idempotency_key) > IdempotencyKey._meta.get_field("key").max_length:
+            return Response({"detail": "Idempotency-Key header is too long."}, status=status.HTTP_400_BAD_REQUEST)
         svc = TimerService()
-        data = svc.set(
-            hours=hours, minutes=minutes, seconds=seconds, web_url=input_serializer.validated_data["web_url"]
-        )
+        try:
+            data = svc.set(
+                **input_serializer.validated_data,
+                user_id=user_id_of(request.user),
+                idempotency_key=idempotency_key,
+            )
+        except QuotaExceededError as e:
+            return quota_exceeded(e)
         output_serializer: SetTimerOutputSerializer = self.output_serializer_class(data)
+        headers: dict = {"Idempotent-Replayed": "true"} if data.get("replayed") else {}
+        return Response(output_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+class SetTimerBulkAPIView(CreateAPIView):
+    """
+    API view to schedule a batch of tasks in a single request.
+
+    All timers of the batch are written with bulk inserts inside one transaction,
+    so either every timer is scheduled or none of them is. The whole batch must fit
+    in the quota of the user.
+
+    """
+
+    # Authentication and permission classes are set to allow access without authentication
+    # It's recommended to set appropriate authentication and permission classes based on the application's requirements
+    # But for the purpose of this example, we are allowing access without authentication
+    permission_classes = (permissions.AllowAny,)
+
+    input_serializer_class = SetTimerBulkInputSerializer
+    output_serializer_class = SetTimerBulkOutputSerializer
+
+    @extend_schema(
+        tags=["scheduler"],
+        request=SetTimerBulkInputSerializer,
+        responses=SetTimerBulkOutputSerializer,
+    )
+    def post(self, request, *args, **kwargs) -> Response:
+        input_serializer: SetTimerBulkInputSerializer = self.input_serializer_class(
+            data=request.data, context={"request": request}
+        )
+        input_serializer.is_valid(raise_exception=True)
+        svc = TimerService()
+        try:
+            data = svc.set_many(timers=input_serializer.validated_data["timers"], user_id=user_id_of(request.user))
+        except QuotaExceededError as e:
+            return quota_exceeded(e)
+        output_serializer: SetTimerBulkOutputSerializer = self.output_serializer_class({"timers": data})
         return Response(output_serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -59,6 +160,12 @@ class GetTimerAPIView(RetrieveAPIView):
     identified by its task ID. It calculates the time left for the task to execute
     based on the current time and the scheduled time.
 
+    A pending task can also be rescheduled with PATCH or canceled with DELETE, tasks that
+    already fired answer with a 409 status code.
+
+    Tasks set by another user answer with a 404 status code, like missing ones. Tasks set
+    anonymously can be read and changed by anyone.
+
     """
 
     # Authentication and permission classes are set to allow access without authentication
@@ -76,9 +183,273 @@ class GetTimerAPIView(RetrieveAPIView):
         task_id = self.kwargs["task_id"]
         svc = TimerService()
         try:
-            data = svc.get(task_id)
+            data = svc.get(task_id, user_id=user_id_of(request.user))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        output_serializer = self.output_serializer_class(data)
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        tags=["scheduler"],
+        request=RescheduleTimerInputSerializer,
+        responses=SetTimerOutputSerializer,
+    )
+    def patch(self, request, *args, **kwargs) -> Response:
+        input_serializer: RescheduleTimerInputSerializer = RescheduleTimerInputSerializer(
+            data=request.data, context={"request": request}
+        )
+        input_serializer.is_valid(raise_exception=True)
+        svc = TimerService()
+        try:
+            data: dict = svc.reschedule(
+                task_id=self.kwargs["task_id"], user_id=user_id_of(request.user), **input_serializer.validated_data
+            )
+        except TimerNotPendingError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
         except ValueError as e:
             return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
 
         output_serializer = self.output_serializer_class(data)
         return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        tags=["scheduler"],
+        responses={204: None},
+    )
+    def delete(self, request, *args, **kwargs) -> Response:
+        svc = TimerService()
+        try:
+            svc.cancel(task_id=self.kwargs["task_id"], user_id=user_id_of(request.user))
+        except TimerNotPendingError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CancelTimersAPIView(CreateAPIView):
+    """
+    API view to cancel every pending task matching a URL prefix and/or set before a given time.
+
+    Meant to clean up runaway jobs quickly. This view requires an admin user.
+
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    input_serializer_class = CancelTimersInputSerializer
+    output_serializer_class = CancelTimersOutputSerializer
+
+    @extend_schema(
+        tags=["scheduler"],
+        request=CancelTimersInputSerializer,
+        responses=CancelTimersOutputSerializer,
+    )
+    def post(self, request, *args, **kwargs) -> Response:
+        input_serializer: CancelTimersInputSerializer = self.input_serializer_class(
+            data=request.data, context={"request": request}
+        )
+        input_serializer.is_valid(raise_exception=True)
+        svc = TimerService()
+        canceled: int = svc.cancel_many(**input_serializer.validated_data)
+        output_serializer: CancelTimersOutputSerializer = self.output_serializer_class({"canceled": canceled})
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class GetTimerBulkAPIView(CreateAPIView):
+    """
+    API view to retrieve the remaining time of many scheduled tasks in a single request.
+
+    Timers are resolved from the cache, and the ones missing there with a single query.
+    IDs that match no timer are listed separately instead of failing the request.
+
+    """
+
+    # Authentication and permission classes are set to allow access without authentication
+    # It's recommended to set appropriate authentication and permission classes based on the application's requirements
+    # But for the purpose of this example, we are allowing access without authentication
+    permission_classes = (permissions.AllowAny,)
+
+    input_serializer_class = GetTimerBulkInputSerializer
+    output_serializer_class = GetTimerBulkOutputSerializer
+
+    @extend_schema(
+        tags=["scheduler"],
+        request=GetTimerBulkInputSerializer,
+        responses=GetTimerBulkOutputSerializer,
+    )
+    def post(self, request, *args, **kwargs) -> Response:
+        input_serializer: GetTimerBulkInputSerializer = self.input_serializer_class(
+            data=request.data, context={"request": request}
+        )
+        input_serializer.is_valid(raise_exception=True)
+        svc = TimerService()
+        data: dict = svc.get_many(task_ids=input_serializer.validated_data["ids"], user_id=user_id_of(request.user))
+        output_serializer: GetTimerBulkOutputSerializer = self.output_serializer_class(data)
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Negotiates ``text/event-stream`` for the clients of timer streams, rendering errors as an ``error`` event.
+    """
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> str:
+        return server_sent_event("error", json.dumps(data))
+
+
+class GetTimerResultAPIView(RetrieveAPIView):
+    """
+    API view to retrieve the outcome of the delivery of a scheduled task.
+
+    Outcomes are recorded on the task itself rather than in the Celery result backend: status
+    code, duration, digest of the response body, attempts and firing lateness. They stay empty
+    until the task fired.
+
+    """
+
+    # Authentication and permission classes are set to allow access without authentication
+    # It's recommended to set appropriate authentication and permission classes based on the application's requirements
+    # But for the purpose of this example, we are allowing access without authentication
+    permission_classes = (permissions.AllowAny,)
+
+    output_serializer_class = TimerResultSerializer
+
+    @extend_schema(
+        tags=["scheduler"],
+        responses=TimerResultSerializer,
+    )
+    def get(self, request, *args, **kwargs) -> Response:
+        svc = TimerService()
+        try:
+            timer = svc.get_result(self.kwargs["task_id"], user_id=user_id_of(request.user))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        output_serializer = self.output_serializer_class(timer)
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class StreamTimerAPIView(APIView):
+    """
+    API view to follow the remaining time of a scheduled task over Server-Sent Events.
+
+    Replaces polling GetTimerAPIView: a single connection receives a ``countdown`` event with the
+    remaining time every TIMER_STREAM_TICK_SECONDS, then a ``fired`` event with the outcome of the
+    delivery as soon as a worker publishes it. The stream closes after the ``fired`` event, or
+    after TIMER_STREAM_MAX_SECONDS, in which case the client reconnects.
+
+    """
+
+    # Authentication and permission classes are set to allow access without authentication
+    # It's recommended to set appropriate authentication and permission classes based on the application's requirements
+    # But for the purpose of this example, we are allowing access without authentication
+    permission_classes = (permissions.AllowAny,)
+    renderer_classes = (JSONRenderer, EventStreamRenderer)
+
+    @extend_schema(
+        tags=["scheduler"],
+        responses={(200, "text/event-stream"): OpenApiTypes.STR},
+    )
+    def get(self, request, *args, **kwargs):
+        task_id = self.kwargs["task_id"]
+        svc = TimerService()
+        try:
+            events = svc.stream(task_id, user_id=user_id_of(request.user))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(events, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Stop nginx from buffering the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class DeadLetterPagination(LimitOffsetPagination):
+    default_limit = 100
+    max_limit = 1000
+
+
+class DeadLetterListAPIView(ListAPIView):
+    """
+    API view to list the webhooks that could not be delivered, newest first.
+
+    Pass ``replayed=false`` to only list the dead letters that were not replayed yet.
+    This view requires an admin user, as dead letters expose the URLs of every user.
+
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+    serializer_class = DeadLetterSerializer
+    pagination_class = DeadLetterPagination
+
+    def get_queryset(self):
+        queryset = DeadLetter.objects.all()
+        replayed: str | None = self.request.query_params.get("replayed")
+        if replayed is not None:
+            queryset = queryset.filter(replayed_at__isnull=replayed.lower() in ("false", "0"))
+        return queryset
+
+    @extend_schema(tags=["scheduler"])
+    def get(self, request, *args, **kwargs) -> Response:
+        return super().get(request, *args, **kwargs)
+
+
+class DeadLetterReplayAPIView(CreateAPIView):
+    """
+    API view to deliver dead letters again.
+
+    Replays the given dead letters, or every dead letter not replayed yet when no IDs are given.
+    This view requires an admin user.
+
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    input_serializer_class = DeadLetterReplayInputSerializer
+    output_serializer_class = DeadLetterReplayOutputSerializer
+
+    @extend_schema(
+        tags=["scheduler"],
+        request=DeadLetterReplayInputSerializer,
+        responses=DeadLetterReplayOutputSerializer,
+    )
+    def post(self, request, *args, **kwargs) -> Response:
+        input_serializer: DeadLetterReplayInputSerializer = self.input_serializer_class(
+            data=request.data, context={"request": request}
+        )
+        input_serializer.is_valid(raise_exception=True)
+        svc = DeadLetterService()
+        replayed: int = svc.replay(ids=input_serializer.validated_data.get("ids"))
+        output_serializer: DeadLetterReplayOutputSerializer = self.output_serializer_class({"replayed": replayed})
+        return Response(output_serializer.data, status=status.HTTP_200_OK)
+
+
+class MetricsView(View):
+    """
+    Expose the scheduler metrics in the Prometheus text format.
+
+    Serves firing lateness, dispatch lag, webhook outcomes and durations, and the number of
+    timers due but not dispatched yet. The metrics tell the traffic and backlog of the scheduler,
+    so they are only served to scrapers sending METRICS_TOKEN as a bearer token and to admin users.
+
+    """
+
+    @staticmethod
+    def has_access(request: HttpRequest) -> bool:
+        if request.user.is_staff:
+            return True
+        token: str = settings.METRICS_TOKEN
+        authorization: str = request.headers.get("Authorization", "")
+        return bool(token) and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode())
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if not self.has_access(request):
+            return HttpResponseForbidden()
+        return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)